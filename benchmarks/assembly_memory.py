@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Peak memory of assembling a long job's audio, in memory vs streamed.
+
+A simulated engine yields --chunk-seconds of float32 audio per chunk. The
+in-memory path is what the engines did before: keep every chunk,
+concatenate, then convert to int16 for the WAV. The streamed path appends
+each chunk to a WavWriter. Peak memory is measured with tracemalloc, which
+sees numpy allocations, and excludes the engine itself.
+
+    python benchmarks/assembly_memory.py --minutes 10 60 240
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from scipy.io.wavfile import write
+
+from flasktts.tts.audio import WavWriter
+
+SAMPLE_RATE = 24000
+
+
+def chunks(minutes, chunk_seconds):
+    rng = np.random.default_rng(0)
+    for _ in range(int(minutes * 60 / chunk_seconds)):
+        yield rng.uniform(-0.5, 0.5, int(chunk_seconds * SAMPLE_RATE)).astype(
+            np.float32
+        )
+
+
+def in_memory(path, audio):
+    wavs = list(audio)
+    combined = np.concatenate(wavs)
+    write(path, SAMPLE_RATE, np.array(combined * 32767, dtype=np.int16))
+
+
+def streamed(path, audio):
+    with WavWriter(path, SAMPLE_RATE) as writer:
+        for wav in audio:
+            writer.write(wav)
+
+
+def measure(assemble, minutes, chunk_seconds, directory):
+    path = os.path.join(directory, f"{assemble.__name__}.wav")
+    tracemalloc.start()
+    start = time.perf_counter()
+    assemble(path, chunks(minutes, chunk_seconds))
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2**20, wall
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--minutes", type=float, nargs="+", default=[10, 60, 240])
+    parser.add_argument("--chunk-seconds", type=float, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for minutes in args.minutes:
+            for assemble in (in_memory, streamed):
+                peak, wall = measure(assemble, minutes, args.chunk_seconds, directory)
+                print(
+                    f"{minutes:6.0f} min {assemble.__name__:9s} "
+                    f"peak={peak:8.1f}MB wall={wall:6.2f}s"
+                )
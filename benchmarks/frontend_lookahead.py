@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Device utilization with the text front end inline vs running ahead.
+
+Traces when the device lock is held while a job's chunks are synthesized,
+for each --lookahead (0 phonemizes each chunk inline, right before its
+inference). Reports the share of the job's wall time the device was busy
+and the idle gaps between consecutive inferences. By default Style2TTS's
+chunk loop runs with a front end and an inference that sleep --frontend-ms
+and --inference-ms per chunk; with --engine the real engine synthesizes
+--chunks chunks of text. --json saves the busy intervals for plotting.
+
+    python benchmarks/frontend_lookahead.py --lookahead 0 1 2 4
+    python benchmarks/frontend_lookahead.py --engine kokoro --device cuda
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+PARAGRAPH = (
+    "The sky above the port was the color of television, tuned to a dead "
+    "channel. It was a Sprawl voice and a Sprawl joke. The Chatsubo was a bar "
+    "for professional expatriates; you could drink there for a week and never "
+    "hear two words in Japanese. "
+)
+
+
+class DeviceTrace:
+    """Stand-in for device_lock recording when the device is busy"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.intervals = []
+
+    @contextmanager
+    def __call__(self, device):
+        with self.lock:
+            start = time.perf_counter()
+            yield
+            self.intervals.append((start, time.perf_counter()))
+
+
+def simulated(trace, args):
+    """Style2TTS's chunk loop on a front end and a model that sleep"""
+    from flasktts.tts import style2tts
+    from flasktts.tts.session import SynthesisSession
+
+    def tokenize(text):
+        time.sleep(args.frontend_ms / 1000)
+        return [0, 1, 2]
+
+    def long_form_inference(tokens, s_prev, noise):
+        with trace("cpu"):
+            time.sleep(args.inference_ms / 1000)
+        return np.zeros(1), None
+
+    tts = style2tts.Style2TTS.__new__(style2tts.Style2TTS)
+    tts.device = "cpu"
+    tts.tokenize = tokenize
+    tts.long_form_inference = long_form_inference
+    chunks = [f"Chunk {i}." for i in range(args.chunks)]
+    return lambda: list(tts.tts_chunks(chunks, SynthesisSession("bench")))
+
+
+def engine(trace, args):
+    """The real engine, its device lock traced"""
+    from flasktts.tts.session import SynthesisSession
+
+    text = PARAGRAPH * args.chunks
+    if args.engine == "kokoro":
+        from flasktts.tts import kokorotts
+
+        kokorotts.device_lock = trace
+        tts = kokorotts.KokoroTTS("benchmark_output", device=args.device)
+        chunks = tts.chunks(text)
+        return lambda: list(tts.generate(chunks, "af_heart"))
+
+    from flasktts.tts import style2tts
+
+    style2tts.device_lock = trace
+    tts = style2tts.Style2TTS("benchmark_output", device=args.device)
+    chunks = style2tts.segment_text(
+        text, style2tts.CHUNK_TARGET_CHARS, style2tts.CHUNK_MAX_CHARS
+    )
+    return lambda: list(tts.tts_chunks(chunks, SynthesisSession("bench")))
+
+
+def measure(trace, synth):
+    """Utilization and idle gaps (ms) of one job"""
+    trace.intervals.clear()
+    start = time.perf_counter()
+    synth()
+    wall = time.perf_counter() - start
+    busy = sum(end - begin for begin, end in trace.intervals)
+    gaps = [
+        (begin - end) * 1000
+        for (_, end), (begin, _) in zip(trace.intervals, trace.intervals[1:])
+    ]
+    return {
+        "wall": wall,
+        "utilization": busy / wall,
+        "gap_mean_ms": statistics.mean(gaps) if gaps else 0.0,
+        "gap_max_ms": max(gaps, default=0.0),
+        "intervals": [(begin - start, end - start) for begin, end in trace.intervals],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--lookahead", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--chunks", type=int, default=40)
+    parser.add_argument("--frontend-ms", type=float, default=30)
+    parser.add_argument("--inference-ms", type=float, default=100)
+    parser.add_argument("--engine", choices=["kokoro", "style2tts"])
+    parser.add_argument("--device")
+    parser.add_argument("--json", help="Save the results with busy intervals")
+    args = parser.parse_args()
+
+    from flasktts.config import Config
+
+    trace = DeviceTrace()
+    synth = engine(trace, args) if args.engine else simulated(trace, args)
+    synth()  # warm-up
+    results = {}
+    for lookahead in args.lookahead:
+        Config.FRONTEND_LOOKAHEAD = lookahead
+        result = results[lookahead] = measure(trace, synth)
+        print(
+            f"lookahead {lookahead}: wall {result['wall']:6.2f}s  "
+            f"device busy {result['utilization']:6.1%}  "
+            f"gap mean {result['gap_mean_ms']:6.1f}ms max {result['gap_max_ms']:6.1f}ms"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Compare Kokoro on PyTorch with Kokoro on ONNX Runtime.
+
+Each backend runs in its own process so the peak RSS is its own. The RTF
+(real-time factor, wall time / audio time) is the median over --repeat runs
+after one warmup run. Export the ONNX graph first:
+
+    python -m flasktts.tts.kokoroonnx export Models/kokoro.onnx
+    python benchmarks/kokoro_backends.py --threads 1 4
+"""
+
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+SAMPLE = (
+    "The sky above the port was the color of television, tuned to a dead "
+    "channel. It was a Sprawl voice and a Sprawl joke. The Chatsubo was a bar "
+    "for professional expatriates; you could drink there for a week and never "
+    "hear two words in Japanese."
+)
+
+
+def measure(backend, text, threads, repeat, model_path):
+    """Run in the child process, print the result as JSON."""
+    import numpy as np
+    import torch
+
+    from flasktts.tts.kokorotts import KokoroTTS, SAMPLE_RATE
+    from flasktts.tts.segment import segment_text
+
+    start = time.perf_counter()
+    if backend == "onnx":
+        from flasktts.tts.kokoroonnx import KokoroOnnxTTS
+
+        tts = KokoroOnnxTTS(
+            "benchmark_output",
+            model_path=model_path,
+            intra_op_threads=threads,
+            inter_op_threads=1,
+        )
+    else:
+        torch.set_num_threads(threads)
+        tts = KokoroTTS("benchmark_output", device="cpu")
+    load = time.perf_counter() - start
+
+    chunks = segment_text(text, 300, 480, tts.phoneme_length)
+    timings = []
+    for i in range(repeat + 1):
+        start = time.perf_counter()
+        audio = np.concatenate(list(tts.generate(chunks, "af_heart")))
+        if i:
+            timings.append(time.perf_counter() - start)
+
+    wall = statistics.median(timings)
+    seconds = len(audio) / SAMPLE_RATE
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"load": load, "wall": wall, "audio": seconds, "rss": rss}))
+
+
+def run(text, threads, repeat, model_path):
+    for n in threads:
+        for backend in ("torch", "onnx"):
+            out = subprocess.run(
+                [
+                    sys.executable,
+                    __file__,
+                    "--child",
+                    backend,
+                    "--threads",
+                    str(n),
+                    "--repeat",
+                    str(repeat),
+                    "--model",
+                    model_path,
+                    "--text-inline",
+                    text,
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            r = json.loads(out.strip().splitlines()[-1])
+            print(
+                f"{backend:5s} threads={n:2d} load={r['load']:6.2f}s wall={r['wall']:7.2f}s "
+                f"audio={r['audio']:6.2f}s RTF={r['wall'] / r['audio']:.3f} "
+                f"peak_rss={r['rss']:7.0f}MB"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--text", help="File with text to synthesize (default: sample)")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--model", default="Models/kokoro.onnx", help="ONNX graph")
+    parser.add_argument("--child", choices=["torch", "onnx"], help=argparse.SUPPRESS)
+    parser.add_argument("--text-inline", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.child, args.text_inline, args.threads[0], args.repeat, args.model)
+    else:
+        text = open(args.text).read() if args.text else SAMPLE
+        run(text, args.threads, args.repeat, args.model)
@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""End-to-end load test of the API and a worker with simulated engines.
+
+Starts the real API (flasktts/run.py under waitress) and a real Huey consumer
+(flasktts.consumer running the tasks of flasktts.tasks.tasks) on a scratch
+database and work directory. The consumer's engine Highlanders hold
+simulated engines instead of models: they take the device lock, sleep for
+the time the text takes to speak times their RTF (--rtf) while holding
+working memory per second of audio (--work-mb), and write that much
+silence. Each engine allocates --weights-mb of weights when it is loaded.
+Everything else (queue, job index, batching, encoding, artifact store) is
+the production code, so scheduling and storage changes can be compared on a
+CPU box without models or network.
+
+Clients submit a mix of jobs (--mix), poll until they finish, download some
+(--download) and delete some (--delete). With --rate jobs arrive as a
+Poisson process (open loop), otherwise --clients each keep one job in
+flight (closed loop). Reports request latency percentiles, throughput, and
+per job the queue wait and service time from the job index. Settings of the
+API and the worker are passed as environment with --env.
+
+    python benchmarks/load_test.py --clients 8 --duration 60
+    python benchmarks/load_test.py --rate 2 --env WORKER_THREADS=2 \\
+        --env MICROBATCH_MAX_JOBS=8 --rtf kokoro=0.1 --json results.json
+
+Without ffmpeg, --encoder copy stores the WAV under the MP3's name.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import requests
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_RATE = 24000
+# Seconds of speech per character, about 15 characters per second
+AUDIO_PER_CHAR = 0.065
+
+SENTENCES = [
+    "Your package has been delivered to the front door.",
+    "The meeting starts in five minutes.",
+    "Motion detected in the backyard.",
+    "The sky above the port was the color of television, tuned to a dead channel.",
+    "It was a bright cold day in April, and the clocks were striking thirteen.",
+    "Far out in the uncharted backwaters of the unfashionable end of the "
+    "western spiral arm of the Galaxy lies a small unregarded yellow sun.",
+]
+
+# Job kinds of the traffic mix: request path, payloads and sentences per job
+KINDS = {
+    "short": ("/tts/synthesize", {"model": "kokoro", "voice": "af_heart"}, 1),
+    "long": ("/tts/synthesize", {"model": "kokoro", "voice": "af_heart"}, 40),
+    "qwen3": ("/tts/synthesize", {"model": "qwen3"}, 4),
+    "style2tts": ("/tts/synthesize", {"model": "style2tts"}, 4),
+    "batch": ("/tts/synthesize/batch", {"model": "kokoro", "voice": "af_heart"}, 1),
+}
+BATCH_SIZE = 5
+
+
+class SimulatedEngine:
+    """Stand-in for an engine: same interface, sleeps instead of inference"""
+
+    def __init__(
+        self,
+        name: str,
+        output_dir: str,
+        rtf: float,
+        weights_mb: float,
+        work_mb: float,
+        batch_overhead: float,
+    ):
+        """
+        Args:
+            name (str): Engine name, Kokoro writes a directory of WAVs
+            output_dir (str): Where the audio goes, as the engines' own
+            rtf (float): Seconds of synthesis per second of audio
+            weights_mb (float): Memory held for the engine's lifetime
+            work_mb (float): Memory held during synthesis per audio second
+            batch_overhead (float): Cost of each job of a batch after the
+                longest, relative to synthesizing it alone
+        """
+        self.name = name
+        self.output_dir = output_dir
+        self.rtf = rtf
+        self.work_mb = work_mb
+        self.batch_overhead = batch_overhead
+        # Touched, so the pages are resident
+        self.weights = np.ones(int(weights_mb * 2**20 / 8))
+
+    def _synthesize(self, texts, speeds) -> list[float]:
+        from flasktts.tts.device import device_lock
+
+        seconds = [
+            len(text) * AUDIO_PER_CHAR / (speed or 1)
+            for text, speed in zip(texts, speeds)
+        ]
+        longest = max(seconds)
+        compute = (longest + self.batch_overhead * (sum(seconds) - longest)) * self.rtf
+        with device_lock("cpu"):
+            work = np.ones(int(self.work_mb * sum(seconds) * 2**20 / 8))
+            time.sleep(compute)
+            del work
+        return seconds
+
+    def _write(self, uuid: str, seconds: float) -> str:
+        from flasktts.tts.audio import WavWriter
+
+        silence = np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+        if self.name == "kokoro":
+            path = os.path.join(self.output_dir, uuid)
+            os.makedirs(path, exist_ok=True)
+            wav = os.path.join(path, "00000.wav")
+        else:
+            path = wav = os.path.join(self.output_dir, f"{uuid}.wav")
+        with WavWriter(wav, SAMPLE_RATE) as writer:
+            writer.write(silence)
+        return path
+
+    def synth_text(self, text, uuid, voice=None, speed=1, writer=None):
+        (seconds,) = self._synthesize([text], [speed])
+        if writer is None:
+            return self._write(uuid, seconds)
+        writer.write(
+            np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32), SAMPLE_RATE
+        )
+        return writer.path
+
+    def synth_batch(self, texts, uuids, voice=None, speeds=None):
+        seconds = self._synthesize(texts, speeds or [1] * len(texts))
+        return [self._write(uuid, s) for uuid, s in zip(uuids, seconds)]
+
+
+def _copy_encode(path, tempo=1.0):
+    """--encoder copy: the WAV, the first of a directory, renamed to .mp3"""
+    if os.path.isdir(path):
+        wav, out_path = os.path.join(path, "00000.wav"), f"{path}.mp3"
+        shutil.move(wav, out_path)
+        shutil.rmtree(path)
+    else:
+        out_path = os.path.splitext(path)[0] + ".mp3"
+        shutil.move(path, out_path)
+    return out_path
+
+
+def _copy_encoder():
+    """--encoder copy for streamed jobs: a WAV written under the .mp3 name"""
+    import soundfile as sf
+
+    from flasktts.tts.audio import WavWriter
+
+    class CopyEncoder(WavWriter):
+        def __init__(self, out_path, tempo=1.0):
+            super().__init__(out_path)
+
+        def _open(self):
+            self._file = sf.SoundFile(
+                self.path, "w", self.sample_rate, 1, "PCM_16", format="WAV"
+            )
+
+    return CopyEncoder
+
+
+def run_consumer(profile: dict) -> int:
+    """Body of the consumer process: install the simulated engines and run
+    flasktts.consumer as python -m flasktts.consumer would"""
+    from flasktts import consumer
+    from flasktts.config import Config
+    from flasktts.tasks import tasks
+
+    for name, highlander in consumer.ENGINES.items():
+        highlander._instance = SimulatedEngine(
+            name,
+            Config.TTS_WORKDIR,
+            profile["rtf"][name],
+            profile["weights_mb"],
+            profile["work_mb"],
+            profile["batch_overhead"],
+        )
+    if profile["encoder"] == "copy":
+        tasks.convert_wav_to_mp3 = _copy_encode
+        tasks.convert_wav_dir_to_mp3 = _copy_encode
+        tasks.Mp3Encoder = _copy_encoder()
+    return consumer.main()
+
+
+def percentile(values: list, q: float):
+    """Nearest-rank percentile, None without values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[
+        min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    ]
+
+
+class Stats:
+    """Thread-safe collection of request latencies and job outcomes"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}  # operation -> latencies in seconds
+        self.errors = {}  # operation -> count
+        self.jobs = []  # dicts per finished or abandoned job
+        self.rejected = 0
+
+    def request(self, session, operation, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=30, **kwargs)
+        except requests.RequestException:
+            response = None
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.requests.setdefault(operation, []).append(elapsed)
+            if response is None or response.status_code >= 400:
+                if response is not None and response.status_code == 429:
+                    self.rejected += 1
+                else:
+                    self.errors[operation] = self.errors.get(operation, 0) + 1
+        return response
+
+
+def _text(rng, sentences):
+    return " ".join(rng.choice(SENTENCES) for _ in range(sentences))
+
+
+def run_job(base, stats, index, rng, kind, args):
+    """Submit one job of a kind, follow it to the end and record it"""
+    path, payload, sentences = KINDS[kind]
+    session = requests.Session()
+    if kind == "batch":
+        body = {
+            "jobs": [
+                {**payload, "text": _text(rng, sentences)} for _ in range(BATCH_SIZE)
+            ]
+        }
+    else:
+        body = {**payload, "text": _text(rng, sentences)}
+    submitted = time.time()
+    response = stats.request(session, "submit", "POST", base + path, json=body)
+    if response is None or response.status_code != 202:
+        return
+    job_ids = response.json().get("job_ids") or [response.json()["job_id"]]
+
+    statuses = {}
+    deadline = submitted + args.job_timeout
+    while time.time() < deadline:
+        time.sleep(args.poll_interval)
+        if kind == "batch":
+            response = stats.request(
+                session,
+                "poll",
+                "POST",
+                base + "/tts/jobs/status",
+                json={"job_ids": job_ids},
+            )
+            if response is not None and response.ok:
+                statuses = {j["job_id"]: j["status"] for j in response.json()["jobs"]}
+        else:
+            response = stats.request(
+                session, "poll", "GET", f"{base}/tts/jobs/{job_ids[0]}"
+            )
+            if response is not None and response.ok:
+                statuses = {job_ids[0]: response.json()["status"]}
+        if statuses and all(s in ("COMPLETED", "FAILED") for s in statuses.values()):
+            break
+    finished = time.time()
+
+    for job_id in job_ids:
+        status = statuses.get(job_id, "TIMEOUT")
+        job = index.job(job_id) or {}
+        record = {"kind": kind, "status": status, "latency": finished - submitted}
+        if job.get("started_at") and status in ("COMPLETED", "FAILED"):
+            record["queue_wait"] = job["started_at"] - job["created_at"]
+            record["service"] = job["updated_at"] - job["started_at"]
+            record["audio_seconds"] = job.get("audio_seconds")
+        if status == "COMPLETED" and rng.random() < args.download:
+            stats.request(
+                session, "download", "GET", f"{base}/tts/jobs/{job_id}/download"
+            )
+        if status in ("COMPLETED", "FAILED") and rng.random() < args.delete:
+            stats.request(session, "delete", "DELETE", f"{base}/tts/jobs/{job_id}")
+        with stats.lock:
+            stats.jobs.append(record)
+
+
+def drive(base, stats, index, args):
+    """Generate the traffic for --duration seconds, wait for it to finish"""
+    kinds, weights = zip(*args.mix.items())
+    stop = time.monotonic() + args.duration
+    threads = []
+
+    if args.rate:
+        rng = random.Random(args.seed)
+        number = 0
+        while time.monotonic() < stop:
+            time.sleep(rng.expovariate(args.rate))
+            job_rng = random.Random(args.seed * 7919 + number)
+            kind = job_rng.choices(kinds, weights)[0]
+            thread = threading.Thread(
+                target=run_job, args=(base, stats, index, job_rng, kind, args)
+            )
+            thread.start()
+            threads.append(thread)
+            number += 1
+    else:
+
+        def client(number):
+            rng = random.Random(args.seed * 7919 + number)
+            while time.monotonic() < stop:
+                run_job(base, stats, index, rng, rng.choices(kinds, weights)[0], args)
+
+        threads = [
+            threading.Thread(target=client, args=(i,)) for i in range(args.clients)
+        ]
+        for thread in threads:
+            thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def peak_rss(pid: int) -> int:
+    """Peak RSS in bytes of a process and its children (forked workers)"""
+    total = 0
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(child) for child in f.read().split()]
+    except OSError:
+        pass
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            pass
+    return total
+
+
+def report(stats, elapsed, memory) -> dict:
+    """Print the results, returned as a dict for --json"""
+    result = {"elapsed": elapsed, "requests": {}, "jobs": {}, "rejected": 0}
+    print(
+        f"\n{'request':10s} {'count':>7s} {'errors':>7s}"
+        + "".join(f" {name:>8s}" for name in ("p50 ms", "p95 ms", "p99 ms"))
+    )
+    for operation, latencies in sorted(stats.requests.items()):
+        row = {
+            "count": len(latencies),
+            "errors": stats.errors.get(operation, 0),
+            **{f"p{q}": percentile(latencies, q) for q in (50, 95, 99)},
+        }
+        result["requests"][operation] = row
+        print(
+            f"{operation:10s} {row['count']:7d} {row['errors']:7d}"
+            + "".join(f" {row[f'p{q}'] * 1000:8.1f}" for q in (50, 95, 99))
+        )
+
+    jobs = stats.jobs
+    completed = [job for job in jobs if job["status"] == "COMPLETED"]
+    # Unknown when ffprobe is missing
+    audio = sum(job.get("audio_seconds") or 0 for job in completed) or None
+    result["rejected"] = stats.rejected
+    result["jobs"] = {
+        status: sum(job["status"] == status for job in jobs)
+        for status in ("COMPLETED", "FAILED", "TIMEOUT")
+    }
+    result["throughput"] = len(completed) / elapsed
+    result["audio_per_second"] = audio / elapsed if audio else None
+    print(
+        f"\njobs: {len(completed)} completed, {result['jobs']['FAILED']} failed, "
+        f"{result['jobs']['TIMEOUT']} timed out, {stats.rejected} rejected (429)"
+    )
+    audio_rate = f"{result['audio_per_second']:.1f}" if audio else "unknown"
+    print(
+        f"throughput: {result['throughput']:.2f} jobs/s, "
+        f"{audio_rate} s of audio/s over {elapsed:.0f}s"
+    )
+    print(f"\n{'job (s)':20s}" + "".join(f" {q:>8s}" for q in ("p50", "p95", "p99")))
+    for kind in [None] + sorted({job["kind"] for job in completed}):
+        selected = [job for job in completed if kind is None or job["kind"] == kind]
+        for metric in ("queue_wait", "service", "latency"):
+            values = [job[metric] for job in selected if metric in job]
+            if not values:
+                continue
+            name = f"{kind or 'all'} {metric}"
+            result.setdefault("percentiles", {})[name] = {
+                f"p{q}": percentile(values, q) for q in (50, 95, 99)
+            }
+            print(
+                f"{name:20s}"
+                + "".join(f" {percentile(values, q):8.2f}" for q in (50, 95, 99))
+            )
+    result["consumer_peak_rss"] = memory
+    print(f"\nconsumer peak RSS: {memory / 2**20:.0f} MB")
+    return result
+
+
+def _wait_until_up(base: str, api: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if api.poll() is not None:
+            raise RuntimeError("The API exited while starting")
+        try:
+            if requests.get(base + "/health/check", timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("The API did not come up")
+
+
+def main(args) -> int:
+    scratch = tempfile.mkdtemp(prefix="flasktts-load-")
+    env = {
+        **os.environ,
+        "PYTHONPATH": REPO,
+        "FLASK_ENV": "production",
+        "PORT": str(args.port),
+        "HUEY_DB_PATH": os.path.join(scratch, "db", "huey.db"),
+        "STYLE_2_TTS_WORKDIR": os.path.join(scratch, "work"),
+        "ARTIFACT_DIR": os.path.join(scratch, "artifacts"),
+        "WORKER_NAME": "load-test",
+        **dict(item.split("=", 1) for item in args.env),
+    }
+    env.pop("MQTT_HOST", None)
+    # The harness reads the job index itself, with the same settings
+    os.environ.update(env)
+    from flasktts.app import jobs as index
+
+    profile = {
+        "rtf": args.rtf,
+        "weights_mb": args.weights_mb,
+        "work_mb": args.work_mb,
+        "batch_overhead": args.batch_overhead,
+        "encoder": args.encoder,
+    }
+    api = subprocess.Popen(
+        [sys.executable, os.path.join(REPO, "flasktts", "run.py")],
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    worker = subprocess.Popen(
+        [sys.executable, __file__, "--consumer", json.dumps(profile)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{args.port}"
+    try:
+        _wait_until_up(base, api)
+        stats = Stats()
+        start = time.monotonic()
+        drive(base, stats, index, args)
+        elapsed = time.monotonic() - start
+        result = report(stats, elapsed, peak_rss(worker.pid))
+    finally:
+        worker.send_signal(signal.SIGTERM)
+        api.send_signal(signal.SIGTERM)
+        worker.wait()
+        api.wait()
+        if not args.keep:
+            shutil.rmtree(scratch, ignore_errors=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), **result}, f, indent=2)
+    return 0
+
+
+def _pairs(items, convert=float) -> dict:
+    return {key: convert(value) for key, value in (i.split("=", 1) for i in items)}
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--consumer"]:
+        sys.exit(run_consumer(json.loads(sys.argv[2])))
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of load")
+    parser.add_argument("--clients", type=int, default=4, help="Closed loop clients")
+    parser.add_argument("--rate", type=float, default=0, help="Jobs/s, open loop")
+    parser.add_argument(
+        "--mix",
+        nargs="+",
+        default=["short=6", "long=1", "qwen3=1", "style2tts=1", "batch=1"],
+        help=f"Weights of the job kinds {list(KINDS)}",
+    )
+    parser.add_argument(
+        "--rtf",
+        nargs="+",
+        default=["style2tts=0.3", "kokoro=0.2", "qwen3=1.5"],
+        help="Simulated real-time factor per engine",
+    )
+    parser.add_argument("--weights-mb", type=float, default=300)
+    parser.add_argument("--work-mb", type=float, default=2, help="Per audio second")
+    parser.add_argument("--batch-overhead", type=float, default=0.3)
+    parser.add_argument("--encoder", choices=["ffmpeg", "copy"], default="ffmpeg")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--job-timeout", type=float, default=600)
+    parser.add_argument("--download", type=float, default=0.8, help="Fraction")
+    parser.add_argument("--delete", type=float, default=0.5, help="Fraction")
+    parser.add_argument("--env", nargs="*", default=[], help="KEY=VALUE settings")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch dir")
+    parser.add_argument("--verbose", action="store_true", help="Show worker logs")
+    args = parser.parse_args()
+    args.mix = _pairs(args.mix)
+    args.rtf = {"style2tts": 0.3, "kokoro": 0.2, "qwen3": 1.5, **_pairs(args.rtf)}
+    sys.exit(main(args))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Per-chunk cost of releasing memory after every chunk vs near a threshold.
+
+Qwen3 used to run gc.collect() and torch.cuda.empty_cache() after each
+chunk. With the engine libraries imported, as in a worker, a collection
+walks hundreds of thousands of objects, and on CUDA the emptied cache is
+allocated again by the next chunk. Runs --chunks chunks of a matmul
+workload on --device, releasing memory after each ("always") or only above
+MEMORY_RELEASE_FRACTION ("threshold"), and reports the time per chunk,
+the time spent releasing and the peak memory.
+
+    python benchmarks/memory_release.py --device cuda --size 4096
+"""
+
+import argparse
+import importlib
+import statistics
+import time
+
+import torch
+
+from flasktts.tts import memory
+
+
+def chunk(size, device):
+    """A model-like burst of allocations"""
+    x = torch.randn(size, size, device=device)
+    for _ in range(4):
+        x = torch.tanh(x @ x.T / size)
+    return x.sum().item()
+
+
+def run(policy, args):
+    times, releasing = [], 0.0
+    with memory.job_peak() as peak:
+        for _ in range(args.chunks):
+            start = time.perf_counter()
+            with memory.inference_peak(args.device):
+                chunk(args.size, args.device)
+            if args.device.startswith("cuda"):
+                torch.cuda.synchronize()
+            released = time.perf_counter()
+            if policy == "always":
+                memory.free_memory()
+            else:
+                memory.release_if_needed(args.device)
+            done = time.perf_counter()
+            releasing += done - released
+            times.append(done - start)
+    return statistics.mean(times), releasing, peak.bytes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--chunks", type=int, default=20)
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument(
+        "--imports",
+        nargs="*",
+        default=["kokoro", "qwen_tts"],
+        help="Libraries loaded first, for a worker-sized heap",
+    )
+    args = parser.parse_args()
+
+    for name in args.imports:
+        importlib.import_module(name)
+    chunk(args.size, args.device)  # warm-up
+    for policy in ("always", "threshold"):
+        per_chunk, releasing, peak = run(policy, args)
+        print(
+            f"{policy:10s} {per_chunk * 1000:8.1f} ms/chunk  "
+            f"releasing {releasing:6.2f}s total  peak {(peak or 0) / 2**20:8.0f} MB"
+        )
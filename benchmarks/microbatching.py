@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Throughput and latency of cross-job micro-batching.
+
+Replays a stream of short notification-style jobs arriving at --rate jobs
+per second through the worker's batching policy: a worker starting a job
+takes the jobs already queued, waits up to the window for more, and
+synthesizes at most --max-jobs of them as one batch. Synthesis runs for
+real on the engine; queueing is simulated on a virtual clock, so the
+reported latency (arrival to audio ready) is compute plus queueing time,
+without Huey and ffmpeg. Capacity is jobs per second of synthesis time, the
+throughput of a saturated worker.
+
+    python benchmarks/microbatching.py kokoro --max-jobs 1 4 8 --window-ms 0 50
+"""
+
+import argparse
+import random
+import shutil
+import statistics
+import time
+
+SENTENCES = [
+    "Your package has been delivered to the front door.",
+    "The meeting starts in five minutes.",
+    "Battery low, please connect the charger.",
+    "Motion detected in the backyard.",
+    "The washing machine has finished its cycle.",
+    "Reminder: take out the recycling tonight.",
+    "The garage door has been open for ten minutes.",
+    "Your timer is done.",
+]
+
+
+def load_engine(name, device):
+    if name == "kokoro":
+        from flasktts.tts.kokorotts import KokoroTTS
+
+        tts = KokoroTTS("benchmark_output", device=device)
+
+        def synth(texts, ids):
+            if len(texts) == 1:
+                return [tts.synth_text(texts[0], ids[0], "af_heart")]
+            return tts.synth_batch(texts, ids, "af_heart", [1.0] * len(texts))
+
+    else:
+        from flasktts.tts.qwen3tts import Qwen3TTS
+
+        tts = Qwen3TTS("benchmark_output", device=device)
+
+        def synth(texts, ids):
+            if len(texts) == 1:
+                return [tts.synth_text(texts[0], ids[0])]
+            return tts.synth_batch(texts, ids)
+
+    return synth
+
+
+def simulate(synth, texts, arrivals, max_jobs, window, run=""):
+    """Run the jobs through the batching policy.
+
+    Returns:
+        tuple[float, list[float], list[int]]: Time spent synthesizing, the
+        latency of each job and the size of each batch
+    """
+    clock, busy, latencies, sizes = 0.0, 0.0, [], []
+    first = 0
+    while first < len(texts):
+        clock = max(clock, arrivals[first])
+        last = min(first + max_jobs, len(texts))
+        if arrivals[last - 1] > clock:
+            # Wait for the batch to fill up, at most until the window closes
+            clock = min(clock + window, arrivals[last - 1])
+        batch = [i for i in range(first, last) if arrivals[i] <= clock]
+        start = time.perf_counter()
+        synth([texts[i] for i in batch], [f"bench{run}-{i}" for i in batch])
+        elapsed = time.perf_counter() - start
+        clock += elapsed
+        busy += elapsed
+        latencies.extend(clock - arrivals[i] for i in batch)
+        sizes.append(len(batch))
+        first = batch[-1] + 1
+    return busy, latencies, sizes
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("engine", choices=["kokoro", "qwen3"])
+    parser.add_argument("--jobs", type=int, default=32)
+    parser.add_argument("--rate", type=float, default=4.0, help="Arrivals per second")
+    parser.add_argument("--max-jobs", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--window-ms", type=int, nargs="+", default=[0, 50, 200])
+    parser.add_argument("--device", default=None)
+    args = parser.parse_args()
+
+    synth = load_engine(args.engine, args.device)
+    rng = random.Random(0)
+    texts = [rng.choice(SENTENCES) for _ in range(args.jobs)]
+    arrivals, t = [], 0.0
+    for _ in texts:
+        t += rng.expovariate(args.rate)
+        arrivals.append(t)
+
+    synth(texts[:1], ["warmup"])
+    for max_jobs in args.max_jobs:
+        for window in args.window_ms if max_jobs > 1 else [0]:
+            busy, latencies, sizes = simulate(
+                synth, texts, arrivals, max_jobs, window / 1000, f"-{max_jobs}-{window}"
+            )
+            print(
+                f"max_jobs={max_jobs} window={window:4d}ms "
+                f"capacity={len(texts) / busy:6.2f} jobs/s "
+                f"mean_batch={statistics.mean(sizes):4.1f} "
+                f"p50={percentile(latencies, 0.5):6.2f}s "
+                f"p95={percentile(latencies, 0.95):6.2f}s"
+            )
+    shutil.rmtree("benchmark_output", ignore_errors=True)
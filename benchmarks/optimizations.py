@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Compare the inference optimizations of an engine with its plain fp32 path.
+
+Each optimization set gets a fresh engine instance. The RTF (real-time
+factor, wall time / audio time) is the median over --repeat runs after one
+warmup run. Quality is measured against the fp32 output: the log-mel
+spectral distance in dB (lower is better, below ~1 dB is hard to hear) and
+the duration ratio, which shows drift from bf16 or int8 duration prediction.
+The audio of every variant is kept in --output for listening.
+
+    python benchmarks/optimizations.py kokoro
+    python benchmarks/optimizations.py style2tts --modes "" cpu cpu,bf16
+"""
+
+import argparse
+import glob
+import os
+import statistics
+import time
+
+import librosa
+import numpy as np
+import soundfile as sf
+import torch
+
+from flasktts.tts.kokorotts import KokoroTTS
+from flasktts.tts.qwen3tts import Qwen3TTS
+from flasktts.tts.style2tts import Style2TTS
+
+SAMPLE = (
+    "The sky above the port was the color of television, tuned to a dead "
+    "channel. It was a Sprawl voice and a Sprawl joke. The Chatsubo was a bar "
+    "for professional expatriates; you could drink there for a week and never "
+    "hear two words in Japanese."
+)
+
+MODES = [
+    "",
+    "inference_mode",
+    "int8",
+    "bf16",
+    "inference_mode,int8",
+    "inference_mode,int8,bf16",
+    "inference_mode,compile",
+]
+
+
+def make_engine(engine, output_dir, optimize):
+    if engine == "kokoro":
+        tts = KokoroTTS(output_dir, device="cpu", optimize=optimize)
+        return lambda text, uuid: tts.synth_text(text, uuid, "af_heart")
+    if engine == "qwen3":
+        tts = Qwen3TTS(output_dir, device="cpu", optimize=optimize)
+        return tts.synth_text
+    tts = Style2TTS(output_dir, device="cpu", optimize=optimize)
+    return tts.synth_text
+
+
+def load_audio(output):
+    """Read an engine's output, a WAV file or a directory of WAV parts."""
+    paths = sorted(glob.glob(os.path.join(output, "*.wav"))) or [output]
+    parts = [sf.read(path, dtype="float32") for path in paths]
+    return np.concatenate([audio for audio, _ in parts]), parts[0][1]
+
+
+def mel_distance(audio, reference, sr):
+    """Log-mel spectral distance in dB over the common length."""
+    n = min(len(audio), len(reference))
+    mels = [
+        librosa.power_to_db(librosa.feature.melspectrogram(y=a[:n], sr=sr))
+        for a in (audio, reference)
+    ]
+    return float(np.mean(np.abs(mels[0] - mels[1])))
+
+
+def run(engine, text, modes, repeat, output_dir):
+    print(f"{engine}: torch {torch.__version__}, {torch.get_num_threads()} threads")
+    reference = None
+    for optimize in modes:
+        name = optimize or "fp32"
+        synth = make_engine(engine, output_dir, optimize)
+
+        synth(text, f"{engine}-{name}-warmup")
+        timings = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            output = synth(text, f"{engine}-{name}-{i}")
+            timings.append(time.perf_counter() - start)
+
+        audio, sr = load_audio(output)
+        if reference is None:
+            reference = audio
+        wall = statistics.median(timings)
+        seconds = len(audio) / sr
+        print(
+            f"  {name:28s} wall={wall:7.2f}s audio={seconds:6.2f}s "
+            f"RTF={wall / seconds:.3f} mel_dist={mel_distance(audio, reference, sr):5.2f}dB "
+            f"duration={len(audio) / len(reference):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("engine", choices=["kokoro", "qwen3", "style2tts"])
+    parser.add_argument("--text", help="File with text to synthesize (default: sample)")
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=MODES,
+        help="Optimization sets to compare. The first one is the quality "
+        'reference, so start with "" (plain fp32)',
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark_output")
+    args = parser.parse_args()
+
+    text = open(args.text).read() if args.text else SAMPLE
+    run(args.engine, text, args.modes, args.repeat, args.output)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Job wall time with MP3 encoding after synthesis vs pipelined with it.
+
+"sequential" is the flow before pipelining: the engine writes a WAV, then
+ffmpeg encodes it. "pipelined" hands each chunk to an Mp3Encoder as it is
+generated, as the tasks now do. The tail is the time from the last chunk to
+a complete MP3. By default the engine is simulated: it sleeps
+--chunk-seconds times --rtf per chunk, like inference on a GPU that leaves
+the CPU free for ffmpeg. With --engine the real engine synthesizes a text of
+about the same length. Needs ffmpeg.
+
+    python benchmarks/pipelined_encoding.py --minutes 1 10 30 --rtf 0.05 0.2
+    python benchmarks/pipelined_encoding.py --engine kokoro --minutes 1 5
+"""
+
+import argparse
+import os
+import shutil
+import time
+
+import numpy as np
+
+from flasktts.tasks.ffmpeg import Mp3Encoder, convert_wav_dir_to_mp3, convert_wav_to_mp3
+from flasktts.tts.audio import WavWriter
+
+SAMPLE_RATE = 24000
+OUTPUT = "benchmark_output"
+PARAGRAPH = (
+    "The sky above the port was the color of television, tuned to a dead "
+    "channel. It was a Sprawl voice and a Sprawl joke. The Chatsubo was a bar "
+    "for professional expatriates; you could drink there for a week and never "
+    "hear two words in Japanese. "
+)
+
+
+class SimulatedEngine:
+    """Chunks of audio at a fixed real-time factor"""
+
+    def __init__(self, rtf, chunk_seconds):
+        self.rtf = rtf
+        self.chunk_seconds = chunk_seconds
+        self.minutes = 0
+
+    def synth_text(self, text, uuid, writer=None):
+        output = writer or WavWriter(os.path.join(OUTPUT, f"{uuid}.wav"))
+        rng = np.random.default_rng(0)
+        for _ in range(int(self.minutes * 60 / self.chunk_seconds)):
+            time.sleep(self.chunk_seconds * self.rtf)
+            samples = int(self.chunk_seconds * SAMPLE_RATE)
+            output.write(
+                rng.uniform(-0.3, 0.3, samples).astype(np.float32), SAMPLE_RATE
+            )
+        if writer is None:
+            output.close()
+        return output.path
+
+
+def load_engine(name):
+    if name == "kokoro":
+        from flasktts.tts.kokorotts import KokoroTTS
+
+        tts = KokoroTTS(OUTPUT, device="cpu")
+        return lambda text, uuid, writer=None: tts.synth_text(
+            text, uuid, "af_heart", 1, writer
+        )
+    if name == "qwen3":
+        from flasktts.tts.qwen3tts import Qwen3TTS
+
+        tts = Qwen3TTS(OUTPUT)
+        return tts.synth_text
+    from flasktts.tts.style2tts import Style2TTS
+
+    tts = Style2TTS(OUTPUT)
+    return tts.synth_text
+
+
+class LastWrite:
+    """Writer wrapper noting when the engine produced its last chunk"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.path = writer.path
+        self.at = None
+
+    def write(self, audio, sample_rate=None):
+        self.writer.write(audio, sample_rate)
+        self.at = time.perf_counter()
+
+
+def sequential(synth, text, uuid):
+    """Returns wall and tail seconds"""
+    start = time.perf_counter()
+    output = synth(text, uuid)
+    synthesized = time.perf_counter()
+    if os.path.isdir(output):
+        convert_wav_dir_to_mp3(output)
+    else:
+        convert_wav_to_mp3(output)
+    done = time.perf_counter()
+    return done - start, done - synthesized
+
+
+def pipelined(synth, text, uuid):
+    """Returns wall and tail seconds"""
+    start = time.perf_counter()
+    with Mp3Encoder(os.path.join(OUTPUT, f"{uuid}.mp3")) as encoder:
+        writer = LastWrite(encoder)
+        synth(text, uuid, writer=writer)
+    done = time.perf_counter()
+    return done - start, done - writer.at
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10, 30])
+    parser.add_argument("--rtf", type=float, nargs="+", default=[0.05, 0.2])
+    parser.add_argument("--chunk-seconds", type=float, default=15)
+    parser.add_argument("--engine", choices=["kokoro", "qwen3", "style2tts"])
+    args = parser.parse_args()
+
+    # ffmpeg won't overwrite the MP3s of an interrupted run
+    shutil.rmtree(OUTPUT, ignore_errors=True)
+    os.makedirs(OUTPUT)
+    if args.engine:
+        engines = [(args.engine, load_engine(args.engine))]
+    else:
+        engines = [
+            (f"rtf={rtf}", SimulatedEngine(rtf, args.chunk_seconds)) for rtf in args.rtf
+        ]
+    for label, engine in engines:
+        for minutes in args.minutes:
+            text = PARAGRAPH * max(1, round(minutes * 60 / 0.065 / len(PARAGRAPH)))
+            if isinstance(engine, SimulatedEngine):
+                engine.minutes = minutes
+                synth = engine.synth_text
+            else:
+                synth = engine
+            results = {}
+            for flow in (sequential, pipelined):
+                uuid = f"{flow.__name__}-{label}-{minutes}"
+                results[flow.__name__] = flow(synth, text, uuid)
+            (seq_wall, seq_tail), (pipe_wall, pipe_tail) = results.values()
+            print(
+                f"{label:10s} {minutes:5.0f} min  sequential wall={seq_wall:7.2f}s "
+                f"tail={seq_tail:6.2f}s  pipelined wall={pipe_wall:7.2f}s "
+                f"tail={pipe_tail:5.2f}s  saved {1 - pipe_wall / seq_wall:5.1%}"
+            )
+    shutil.rmtree(OUTPUT, ignore_errors=True)
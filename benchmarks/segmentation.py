@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""Compare the unified segmenter with the splitting each engine used before.
+
+Without arguments only the text side is measured: number of chunks, chunk
+length spread, chunks over the engine limit and segmentation time. With
+--synthesize ENGINE the engine is run once with each splitting and the
+real-time factor (RTF, wall time / audio time) is reported.
+
+    python benchmarks/segmentation.py
+    python benchmarks/segmentation.py --synthesize kokoro --repeat 3
+"""
+
+import argparse
+import glob
+import os
+import re
+import statistics
+import tempfile
+import time
+from unittest.mock import patch
+
+import soundfile as sf
+
+from flasktts.tts import kokorotts, qwen3tts, style2tts
+from flasktts.tts.segment import segment_text
+
+SAMPLE = """The sky above the port was the color of television, tuned to a dead channel. "It's not like I'm using," Case heard someone say, as he shouldered his way through the crowd around the door of the Chat. "It's like my body's developed this massive drug deficiency." It was a Sprawl voice and a Sprawl joke. The Chatsubo was a bar for professional expatriates; you could drink there for a week and never hear two words in Japanese.
+These were to have an enormous impact, not only because they were associated with Constantine, but also because, as in so many other areas, the decisions taken by Constantine (or in his name) were to have great significance for centuries to come. One of the main issues was the shape that Christian churches were to take, since there was not, apparently, a tradition of monumental church buildings when Constantine decided to help the Christian church build a series of truly spectacular structures. The main form that these churches took was that of the basilica, a multipurpose rectangular structure, based ultimately on the earlier Greek stoa, which could be found in most of the great cities of the empire.
+"""
+
+
+def legacy_qwen3(text, *_):
+    """Qwen3TTS._chunk_text: sentences packed to 500 characters, no hard limit."""
+    sentences = re.split(r"(?<=[.!?])\s+", text.strip())
+    chunks, current = [], ""
+    for sentence in sentences:
+        if not sentence:
+            continue
+        if not current:
+            current = sentence
+        elif len(current) + 1 + len(sentence) <= 500:
+            current = f"{current} {sentence}"
+        else:
+            chunks.append(current)
+            current = sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def legacy_style2tts(text, *_):
+    """Style2TTS.tts_line: every comma and sentence end starts a new chunk."""
+    return [
+        f"{piece.strip()}."
+        for line in text.splitlines()
+        for piece in re.split("[?.,!]", line)
+        if piece.strip()
+    ]
+
+
+def legacy_kokoro(text, *_):
+    """KokoroTTS: one chunk per line."""
+    return [line.strip() for line in re.split(r"\n+", text) if line.strip()]
+
+
+# Character budgets for the text-only comparison. At runtime Kokoro and Qwen3
+# budget in phonemes/tokens, which needs their models loaded; these are the
+# character equivalents.
+CHAR_BUDGETS = {"qwen3": (500, 600), "style2tts": (200, 300), "kokoro": (300, 400)}
+
+ENGINES = {
+    "qwen3": (qwen3tts, legacy_qwen3),
+    "style2tts": (style2tts, legacy_style2tts),
+    "kokoro": (kokorotts, legacy_kokoro),
+}
+
+
+def describe(name, chunks, limit, elapsed):
+    lengths = [len(c) for c in chunks]
+    over = sum(1 for n in lengths if n > limit)
+    print(
+        f"  {name:8s} chunks={len(chunks):5d} mean={statistics.mean(lengths):6.1f} "
+        f"stdev={statistics.pstdev(lengths):6.1f} max={max(lengths):5d} "
+        f"over_limit={over:3d} time={elapsed * 1000:7.2f}ms"
+    )
+
+
+def compare_text(text, repeat):
+    for engine, (_, legacy) in ENGINES.items():
+        target, limit = CHAR_BUDGETS[engine]
+        print(f"{engine} (max {limit} chars)")
+        for name, split in (
+            ("legacy", legacy),
+            ("unified", segment_text),
+        ):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                chunks = split(text, target, limit)
+            elapsed = (time.perf_counter() - start) / repeat
+            describe(name, chunks, limit, elapsed)
+
+
+def synthesize(engine, text, repeat):
+    module, legacy = ENGINES[engine]
+    with tempfile.TemporaryDirectory() as output_dir:
+        if engine == "kokoro":
+            tts = module.KokoroTTS(output_dir)
+            synth = lambda uuid: tts.synth_text(text, uuid, "af_heart")
+        elif engine == "qwen3":
+            tts = module.Qwen3TTS(output_dir)
+            synth = lambda uuid: tts.synth_text(text, uuid)
+        else:
+            tts = module.Style2TTS(output_dir)
+            synth = lambda uuid: tts.synth_text(text, uuid)
+
+        synth("warmup")
+        for name, split in (("legacy", legacy), ("unified", segment_text)):
+            timings = []
+            for i in range(repeat):
+                with patch.object(module, "segment_text", split):
+                    start = time.perf_counter()
+                    output = synth(f"{name}-{i}")
+                    timings.append(time.perf_counter() - start)
+            audio_seconds = _audio_seconds(output)
+            wall = statistics.median(timings)
+            print(
+                f"{engine} {name:8s} wall={wall:7.2f}s audio={audio_seconds:7.2f}s "
+                f"RTF={wall / audio_seconds:.3f}"
+            )
+
+
+def _audio_seconds(output):
+    paths = sorted(glob.glob(os.path.join(output, "*.wav"))) or [output]
+    return sum(sf.info(path).duration for path in paths)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--text", help="File with text to segment (default: sample)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--synthesize", choices=sorted(ENGINES))
+    args = parser.parse_args()
+
+    text = open(args.text).read() if args.text else SAMPLE
+    if args.synthesize:
+        synthesize(args.synthesize, text, args.repeat)
+    else:
+        compare_text(text, args.repeat)
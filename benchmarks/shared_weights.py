@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Memory and startup time of CPU worker processes, with and without shared
+weights.
+
+"separate" starts each worker as a fresh process that loads its own copy of
+the engine, as independent consumers would. "fork" loads the engine once and
+forks the workers from it, as flasktts.consumer does with PRELOAD_ENGINES.
+Each worker synthesizes a sentence, so its working memory is counted too,
+then reports ready. RSS counts shared pages in every process that maps
+them; PSS splits them between the processes, so the PSS total is the RAM the
+workers really use. Linux only (/proc/<pid>/smaps_rollup).
+
+    python benchmarks/shared_weights.py kokoro --workers 1 2 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import time
+
+import torch
+
+SENTENCE = "The sky above the port was the color of television."
+
+
+def load_engine(name):
+    if name == "kokoro":
+        from flasktts.tts.kokorotts import KokoroTTS
+
+        tts = KokoroTTS("benchmark_output", device="cpu")
+        return lambda uuid: tts.synth_text(SENTENCE, uuid, "af_heart")
+    if name == "qwen3":
+        from flasktts.tts.qwen3tts import Qwen3TTS
+
+        tts = Qwen3TTS("benchmark_output", device="cpu")
+        return lambda uuid: tts.synth_text(SENTENCE, uuid)
+    from flasktts.tts.style2tts import Style2TTS
+
+    tts = Style2TTS("benchmark_output")
+    return lambda uuid: tts.synth_text(SENTENCE, uuid)
+
+
+def memory(pid: int) -> tuple[int, int]:
+    """RSS and PSS of a process in bytes"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0]) * 1024
+    return values["Rss"], values["Pss"]
+
+
+def _worker(load, engine, synth, number, ready, done):
+    torch.set_num_threads(1)
+    if synth is None:
+        synth = load(engine)
+    synth(f"shared-{os.getpid()}-{number}")
+    ready.put(os.getpid())
+    done.wait()
+
+
+def measure(load, engine: str, workers: int, mode: str) -> dict:
+    """Start workers, wait until all of them synthesized once and measure them
+
+    Runs in a fresh process, which plays the consumer: in "fork" mode it
+    loads the engine and is counted with the workers.
+
+    Args:
+        load (callable): Module level function loading an engine by name,
+            returns a function synthesizing one sentence to the job id it
+            is given
+        engine (str): Engine name passed to load
+        workers (int): Number of worker processes
+        mode (str): "fork" or "separate"
+
+    Returns:
+        dict: startup seconds, RSS and PSS totals of the processes holding
+        weights, and the load time in the parent for "fork"
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    coordinator = context.Process(
+        target=_coordinate, args=(load, engine, workers, mode, results)
+    )
+    coordinator.start()
+    result = results.get()
+    coordinator.join()
+    return result
+
+
+def _coordinate(load, engine, workers, mode, results):
+    context = multiprocessing.get_context("fork" if mode == "fork" else "spawn")
+    ready, done = context.Queue(), context.Event()
+    start = time.perf_counter()
+    synth, pids = None, []
+    if mode == "fork":
+        synth = load(engine)
+        pids.append(os.getpid())
+    parent_load = time.perf_counter() - start
+    processes = [
+        context.Process(target=_worker, args=(load, engine, synth, i, ready, done))
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    pids.extend(ready.get() for _ in processes)
+    startup = time.perf_counter() - start
+    rss, pss = map(sum, zip(*(memory(pid) for pid in pids)))
+    done.set()
+    for process in processes:
+        process.join()
+    results.put(
+        {"startup": startup, "parent_load": parent_load, "rss": rss, "pss": pss}
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("engine", choices=["kokoro", "qwen3", "style2tts"])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    for mode in ("separate", "fork"):
+        previous = None
+        for workers in args.workers:
+            result = measure(load_engine, args.engine, workers, mode)
+            line = (
+                f"{mode:8s} workers={workers} startup={result['startup']:6.1f}s "
+                f"rss={result['rss'] / 2**20:7.0f}MB pss={result['pss'] / 2**20:7.0f}MB"
+            )
+            if previous:
+                added = workers - previous[0]
+                line += (
+                    f" per added worker: pss +"
+                    f"{(result['pss'] - previous[1]['pss']) / added / 2**20:.0f}MB"
+                    f" startup +{(result['startup'] - previous[1]['startup']) / added:.1f}s"
+                )
+            print(line)
+            previous = (workers, result)
+    shutil.rmtree("benchmark_output", ignore_errors=True)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Latency of POST /tts/speak by text length and response format.
+
+Starts the speak worker's server in this process with the resident Kokoro
+and sends --requests requests per text length through the API, the Flask
+app forwarding to it as it does in production. Reports the median and 95th
+percentile latency next to the seconds of audio returned. The target is
+under a second on CPU for a sentence. With --rtf the engine is simulated,
+sleeping RTF times the audio it returns, to measure the overhead of the
+endpoint alone.
+
+    python benchmarks/speak_latency.py --lengths 20 60 100 --formats wav mp3
+    python benchmarks/speak_latency.py --rtf 0.1
+"""
+
+import argparse
+import statistics
+import time
+from unittest.mock import patch
+
+import numpy as np
+
+SENTENCE = "The next train to the airport leaves from platform four. "
+
+
+class SimulatedKokoro:
+    """Fifteen characters a second of speech, generated in RTF times that"""
+
+    def __init__(self, rtf):
+        self.rtf = rtf
+
+    def chunks(self, text):
+        return [text]
+
+    def generate(self, chunks, voice, speed=1):
+        from flasktts.tts.kokorotts import SAMPLE_RATE
+
+        for chunk in chunks:
+            seconds = len(chunk) / 15 / speed
+            time.sleep(seconds * self.rtf)
+            yield np.zeros(int(seconds * SAMPLE_RATE), dtype=np.float32)
+
+
+def measure(client, text, fmt, requests):
+    """Latencies (s) and seconds of audio of one text"""
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.post("/tts/speak", json={"text": text, "format": fmt})
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code}: {response.data[:200]}")
+    seconds = None
+    if fmt == "wav":
+        seconds = (len(response.data) - 44) / 2 / 24000
+    return latencies, seconds
+
+
+def main(args):
+    from flasktts import speak
+    from flasktts.app import create_app
+    from flasktts.config import Config
+
+    server = speak.make_server("127.0.0.1", 0)
+    Config.SPEAK_URL = f"http://127.0.0.1:{server.server_address[1]}/speak"
+    Config.SPEAK_MAX_CHARS = max(args.lengths)
+    client = create_app().test_client()
+
+    start = time.perf_counter()
+    speak.synthesize(speak.WARM_UP_TEXT)
+    print(f"engine loaded and warmed up in {time.perf_counter() - start:.1f}s")
+    speak.start(server)
+
+    for length in args.lengths:
+        text = (SENTENCE * (length // len(SENTENCE) + 1))[:length]
+        for fmt in args.formats:
+            latencies, seconds = measure(client, text, fmt, args.requests)
+            p95 = np.percentile(latencies, 95)
+            audio = f"  audio {seconds:5.2f}s" if seconds is not None else ""
+            print(
+                f"{length:4d} chars {fmt}: "
+                f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+                f"p95 {p95 * 1000:7.1f} ms{audio}"
+            )
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[20, 60, 100])
+    parser.add_argument("--formats", nargs="+", default=["wav", "mp3"])
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--rtf", type=float, help="Simulate Kokoro at this RTF")
+    args = parser.parse_args()
+
+    if args.rtf is None:
+        main(args)
+    else:
+        from flasktts.tts.kokorotts import KokoroTTSHighlander
+
+        engine = SimulatedKokoro(args.rtf)
+        with patch.object(KokoroTTSHighlander, "get_instance", return_value=engine):
+            main(args)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Cost of a blended voice mixed per request vs taken from the cache.
+
+Presets are loaded like KPipeline.load_single_voice does, from a .pt file
+per preset (random packs of Kokoro's shape here, or the real ones from the
+Hugging Face cache with --real), and mixed for a --presets preset recipe.
+Reports the time to get the blended pack mixing it every time, from the
+in-memory LRU and from a blend persisted to disk as after a restart.
+
+    python benchmarks/voice_blending.py --presets 3
+    python benchmarks/voice_blending.py --real af_heart af_bella am_adam
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import torch
+
+from flasktts.tts.voices import VoiceCache
+
+
+def preset_loader(directory, names, real):
+    """load_single_voice without its in-memory cache, as on a cold start"""
+    if real:
+        from huggingface_hub import hf_hub_download
+
+        from flasktts.tts.kokorotts import REPO_ID
+
+        paths = {name: hf_hub_download(REPO_ID, f"voices/{name}.pt") for name in names}
+    else:
+        paths = {}
+        for name in names:
+            paths[name] = os.path.join(directory, f"{name}.pt")
+            torch.save(torch.randn(510, 1, 256), paths[name])
+    return lambda name: torch.load(paths[name], weights_only=True)
+
+
+def timed(get, recipe, requests):
+    times = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        get(recipe)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--presets", type=int, default=3)
+    parser.add_argument("--real", nargs="+", help="Real Kokoro presets to mix")
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    names = args.real or [f"af_voice{i}" for i in range(args.presets)]
+    recipe = ",".join(f"{name}:{i + 1}" for i, name in enumerate(names))
+    with tempfile.TemporaryDirectory() as directory:
+        load = preset_loader(directory, names, args.real)
+        blends = os.path.join(directory, "blends")
+
+        every_time = VoiceCache(load, size=0)
+        cached = VoiceCache(load, size=8)
+        VoiceCache(load, size=8, directory=blends).get(recipe)
+        restarted = lambda r: VoiceCache(load, size=8, directory=blends).get(r)
+
+        print(f"recipe {recipe}")
+        print(
+            f"mixed every time  {timed(every_time.get, recipe, args.requests):8.3f} ms"
+        )
+        print(f"LRU cache         {timed(cached.get, recipe, args.requests):8.3f} ms")
+        print(f"persisted blend   {timed(restarted, recipe, args.requests):8.3f} ms")
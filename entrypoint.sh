@@ -2,7 +2,8 @@
 
 set -e
 python3 flasktts/run.py &
-huey_consumer.py flasktts.tasks.tasks.huey -w 1 &
+# One consumer per GPU (or a single CPU consumer), see flasktts/worker.py
+python3 -m flasktts.worker &
 # Exit if any child process dies so docker restart policy brings us back up
 wait -n
 exit $?
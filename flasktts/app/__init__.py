@@ -1,17 +1,32 @@
 import paho.mqtt.client as mqtt
 from flask import Flask
 from flask_restx import Api
-from huey import SqliteHuey
+from huey import RedisHuey, SqliteHuey
 
 from flasktts.config import Config
+from flasktts.tasks.artifacts import create_artifact_store
+from flasktts.tasks.jobs import create_job_index
+from flasktts.tts.voices import NamedVoices
 
 # Initialize API
 api = Api(
     title="TTS API", version="1.0", description="Text to Speech API with job queuing"
 )
 
-# Initialize Huey with SQLite storage
-huey = SqliteHuey("tts_tasks", filename=Config.HUEY_DB_PATH)
+# Initialize Huey with SQLite storage, or Redis when workers run on other hosts
+if Config.QUEUE_BACKEND == "redis":
+    huey = RedisHuey("tts_tasks", url=Config.REDIS_URL)
+else:
+    huey = SqliteHuey("tts_tasks", filename=Config.HUEY_DB_PATH)
+
+# Per-job status index, kept in the same database as the queue
+jobs = create_job_index(huey.storage)
+
+# Storage for finished audio files
+artifacts = create_artifact_store()
+
+# Kokoro voice blends saved under a name
+named_voices = NamedVoices(Config.VOICE_DIR)
 
 # Only setup MQTT if host is configured
 # This is a temporory fix until I figure out SSEs
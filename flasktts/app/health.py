@@ -1,9 +1,42 @@
 import torch
 from flask_restx import Namespace, Resource
 
+from flasktts.app import huey
+from flasktts.tasks.jobs import running_key
+from flasktts.tts.device import device_worker_name, worker_devices
+
 api = Namespace("health", description="Health check endpoints")
 
 
+def _nvml(stat, index):
+    """Read an NVML backed statistic, None when NVML (pynvml) is unavailable."""
+    try:
+        return stat(index)
+    except Exception:
+        return None
+
+
+def _device_status(device: str) -> dict:
+    """Utilization of a device and the jobs its pinned worker is running."""
+    running = huey.get(running_key(device_worker_name(device)), peek=True) or []
+    status = {
+        "device": device,
+        "worker": device_worker_name(device),
+        "running_jobs": [running] if isinstance(running, str) else running,
+    }
+    if device.startswith("cuda:") and torch.cuda.is_available():
+        index = int(device.split(":", 1)[1])
+        status.update(
+            {
+                "name": torch.cuda.get_device_name(index),
+                "utilization": _nvml(torch.cuda.utilization, index),
+                "memory_used": _nvml(torch.cuda.device_memory_used, index),
+                "memory_total": torch.cuda.get_device_properties(index).total_memory,
+            }
+        )
+    return status
+
+
 @api.route("/check")
 class HealthCheck(Resource):
     @api.doc(responses={200: "API is healthy"})
@@ -26,4 +59,5 @@ class GPUCheck(Resource):
             "gpu_name": torch.cuda.get_device_name(0) if cuda else "",
             "n_gpus": torch.cuda.device_count() if cuda else 0,
             "mps": torch.backends.mps.is_available(),
+            "devices": [_device_status(device) for device in worker_devices()],
         }
@@ -1,11 +1,22 @@
-import os
-from glob import glob
-
-from flask import send_file
-from flask_restx import Namespace, Resource, fields
+import json
+import urllib.error
+import urllib.request
+import uuid
+
+from flask import Response, request, send_file
+from flask_restx import Namespace, Resource, fields, inputs
+from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import (
+    GatewayTimeout,
+    RequestEntityTooLarge,
+    ServiceUnavailable,
+    TooManyRequests,
+)
 
-from flasktts.app import huey
+from flasktts.app import artifacts, huey, jobs, named_voices
 from flasktts.config import Config
+from flasktts.tasks.admission import QueueFull, admit, limits, workload
+from flasktts.tasks.estimate import estimate_times
 from flasktts.tasks.tasks import (
     cleanup,
     get_tasks_pending_failed_complete_running,
@@ -13,6 +24,7 @@ from flasktts.tasks.tasks import (
     qwen3_tts_task,
     style2_tts_task,
 )
+from flasktts.tts.document import FORMATS, detect_format, split_chapters
 
 
 class JobStatus(fields.String):
@@ -20,11 +32,18 @@ class JobStatus(fields.String):
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
     RUNNING = "RUNNING"
+    NOT_FOUND = "NOT_FOUND"
 
     def format(self, value):
         return str(value)
 
 
+# Speech rate range; a single ffmpeg atempo filter covers it on every version
+RATE_MIN = 0.5
+RATE_MAX = 2.0
+# Audio formats of POST /tts/speak
+SPEAK_FORMATS = ["wav", "mp3"]
+
 api = Namespace("tts", description="Text-to-Speech conversion endpoints")
 
 # Request model
@@ -43,18 +62,117 @@ tts_request = api.model(
             required=False,
         ),
         "voice": fields.String(
-            description="Voice to use for text-to-speech (kokoro only, e.g. af_heart; qwen3 uses a pre-baked Kokoro-cloned voice and ignores this field)",
+            description="Voice to use for text-to-speech (kokoro only: a voice such as af_heart, a blend such as af_heart:0.7,af_bella:0.3, or a named voice; qwen3 uses a pre-baked Kokoro-cloned voice and ignores this field)",
             example="af_heart",
             default=None,
         ),
+        "rate": fields.Float(
+            description=f"Speech rate, >1 is faster ({RATE_MIN} to {RATE_MAX})",
+            example=1.0,
+            default=1.0,
+            min=RATE_MIN,
+            max=RATE_MAX,
+        ),
+    },
+)
+
+batch_request = api.model(
+    "BatchTTSRequest",
+    {
+        "jobs": fields.List(
+            fields.Nested(tts_request),
+            required=True,
+            description="Text-to-speech jobs to enqueue",
+        ),
+    },
+)
+
+speak_request = api.model(
+    "SpeakRequest",
+    {
+        "text": fields.String(
+            required=True,
+            description=f"Text to speak, at most {Config.SPEAK_MAX_CHARS} characters",
+            example="Your order is ready.",
+        ),
+        "voice": fields.String(
+            description="Kokoro voice, blend or named voice",
+            example="af_heart",
+            default="af_heart",
+        ),
+        "rate": fields.Float(
+            description=f"Speech rate, >1 is faster ({RATE_MIN} to {RATE_MAX})",
+            example=1.0,
+            default=1.0,
+            min=RATE_MIN,
+            max=RATE_MAX,
+        ),
+        "format": fields.String(
+            description="Audio format of the response",
+            enum=SPEAK_FORMATS,
+            default="wav",
+        ),
+    },
+)
+
+voice_recipe = api.model(
+    "VoiceRecipe",
+    {
+        "recipe": fields.String(
+            required=True,
+            description="Kokoro voices and their weights, weights default to 1 and are normalized",
+            example="af_heart:0.7,af_bella:0.3",
+        ),
+    },
+)
+
+named_voice = api.model(
+    "NamedVoice",
+    {
+        "name": fields.String(description="Name to use as a request's voice"),
+        "recipe": fields.String(description="Normalized recipe"),
+    },
+)
+
+named_voices_response = api.model(
+    "NamedVoices", {"voices": fields.List(fields.Nested(named_voice))}
+)
+
+status_request = api.model(
+    "JobsStatusRequest",
+    {
+        "job_ids": fields.List(
+            fields.String,
+            required=True,
+            description="Job identifiers to look up",
+        ),
     },
 )
 
 # Response models
+job_estimate = {
+    "estimated_start": fields.Float(
+        description="Estimated UNIX time the job starts, null once finished"
+    ),
+    "estimated_completion": fields.Float(
+        description="Estimated UNIX time the job finishes, null once finished"
+    ),
+}
+
 job_response = api.model(
     "JobResponse",
     {
         "job_id": fields.String(description="Unique job identifier"),
+        **job_estimate,
+    },
+)
+
+batch_response = api.model(
+    "BatchJobResponse",
+    {
+        "job_ids": fields.List(
+            fields.String, description="Job identifiers, in request order"
+        ),
     },
 )
 
@@ -62,26 +180,253 @@ job_status = api.model(
     "JobStatus",
     {
         "status": JobStatus(description="Current job status"),
+        **job_estimate,
     },
 )
 
-jobs_list = api.model(
-    "JobsList",
+job = api.model(
+    "Job",
     {
-        "jobs": fields.List(
-            fields.Nested(
-                api.model(
-                    "Job",
-                    {
-                        "job_id": fields.String(description="Job identifier"),
-                        "status": JobStatus(description="Job status"),
-                    },
-                )
+        "job_id": fields.String(description="Job identifier"),
+        "status": JobStatus(description="Job status"),
+    },
+)
+
+jobs_list = api.model("JobsList", {"jobs": fields.List(fields.Nested(job))})
+
+job_details = api.inherit(
+    "JobDetails",
+    job,
+    {
+        "model": fields.String(description="Model used for synthesis"),
+        "voice": fields.String(description="Voice used for synthesis"),
+        "characters": fields.Integer(description="Length of the input text"),
+        "audio_seconds": fields.Float(description="Duration of the output audio"),
+        "output_bytes": fields.Integer(description="Size of the output file"),
+        "peak_memory": fields.Integer(
+            description="Peak memory of the job's inference in bytes: CUDA memory "
+            "allocated, or the worker process's resident memory on CPU"
+        ),
+        "created_at": fields.Float(description="UNIX timestamp of submission"),
+        "updated_at": fields.Float(description="UNIX timestamp of last update"),
+        "parent_id": fields.String(
+            description="Document this job is a chapter of, null for other jobs"
+        ),
+    },
+)
+
+chapter_job = api.inherit(
+    "ChapterJob", job, {"title": fields.String(description="Chapter title")}
+)
+
+document_response = api.model(
+    "DocumentResponse",
+    {
+        "job_id": fields.String(description="Document job identifier"),
+        "chapter_ids": fields.List(
+            fields.String, description="Chapter job identifiers, in reading order"
+        ),
+    },
+)
+
+workload_fields = {
+    "characters": fields.Integer(description="Characters of unfinished jobs"),
+    "seconds": fields.Float(description="Estimated seconds to work them off"),
+    "max_characters": fields.Integer(description="Limit on characters, 0 for none"),
+    "max_seconds": fields.Float(description="Limit on seconds, 0 for none"),
+}
+
+backlog = api.model(
+    "Backlog",
+    {
+        "queue": fields.Nested(api.model("QueueWorkload", workload_fields)),
+        "client": fields.Nested(
+            api.model(
+                "ClientWorkload",
+                {"id": fields.String(description="Client identity"), **workload_fields},
             )
-        )
+        ),
+    },
+)
+
+document_details = api.inherit(
+    "DocumentDetails",
+    job_details,
+    {
+        "chapters": fields.Integer(description="Number of chapters"),
+        "chapters_done": fields.Integer(description="Chapters synthesized so far"),
+        "chapter_jobs": fields.List(fields.Nested(chapter_job)),
     },
 )
 
+document_parser = api.parser()
+document_parser.add_argument(
+    "file",
+    type=FileStorage,
+    location="files",
+    required=True,
+    help="Markdown, HTML, EPUB or plain text document",
+)
+document_parser.add_argument(
+    "format",
+    choices=FORMATS,
+    location="form",
+    help="Document format, by default taken from the file name",
+)
+document_parser.add_argument(
+    "model",
+    choices=["style2tts", "kokoro", "qwen3"],
+    default="style2tts",
+    location="form",
+    help="Model to use for every chapter",
+)
+document_parser.add_argument("voice", location="form", help="Voice (kokoro only)")
+document_parser.add_argument(
+    "rate",
+    type=float,
+    location="form",
+    help=f"Speech rate ({RATE_MIN} to {RATE_MAX})",
+)
+
+jobs_page = api.model(
+    "JobsPage",
+    {
+        "jobs": fields.List(fields.Nested(job_details)),
+        "next_cursor": fields.String(
+            description="Pass as 'cursor' to get the next page, null on the last page"
+        ),
+    },
+)
+
+jobs_parser = api.parser()
+jobs_parser.add_argument(
+    "cursor", location="args", help="Cursor returned with the previous page"
+)
+jobs_parser.add_argument(
+    "limit",
+    type=inputs.int_range(1, Config.JOBS_PAGE_MAX),
+    default=Config.JOBS_PAGE_SIZE,
+    location="args",
+    help="Maximum number of jobs to return",
+)
+jobs_parser.add_argument(
+    "status",
+    choices=[
+        JobStatus.PENDING,
+        JobStatus.RUNNING,
+        JobStatus.COMPLETED,
+        JobStatus.FAILED,
+    ],
+    location="args",
+    help="Only return jobs with this status",
+)
+jobs_parser.add_argument(
+    "model",
+    choices=["style2tts", "kokoro", "qwen3"],
+    location="args",
+    help="Only return jobs for this model",
+)
+jobs_parser.add_argument(
+    "created_after",
+    type=float,
+    location="args",
+    help="Only return jobs created after this UNIX timestamp",
+)
+
+
+def _voice(voice):
+    """A request's Kokoro voice as the engine takes it: named voices are
+    replaced by their recipe, recipes normalized. Aborts with 400 on a
+    malformed recipe."""
+    try:
+        return named_voices.resolve(voice)
+    except ValueError as exc:
+        api.abort(400, str(exc))
+
+
+def _task_signature(payload: dict):
+    """Build an un-enqueued task for a TTS request payload.
+
+    Returns:
+        tuple: (task, model, voice, characters), or aborts with 400 on invalid input
+    """
+    text = payload.get("text")
+    if not text:
+        api.abort(400, "Missing or empty 'text' parameter")
+
+    model = payload.get("model")
+    voice = payload.get("voice")
+    rate = payload.get("rate")
+    if rate is None:
+        # QWEN3_SPEECH_RATE only sets the default of qwen3 requests now
+        rate = Config.QWEN3_SPEECH_RATE if model == "qwen3" else 1.0
+    if (
+        isinstance(rate, bool)
+        or not isinstance(rate, (int, float))
+        or not RATE_MIN <= rate <= RATE_MAX
+    ):
+        api.abort(400, f"'rate' must be a number from {RATE_MIN} to {RATE_MAX}")
+
+    if model == "style2tts":
+        return style2_tts_task.s(text, rate), model, None, len(text)
+    elif model == "kokoro":
+        voice = _voice(voice)
+        return kokoro_tts_task.s(text, voice, rate), model, voice, len(text)
+    elif model == "qwen3":
+        return qwen3_tts_task.s(text, rate), model, None, len(text)
+    api.abort(400, "Invalid 'model' parameter")
+
+
+def _client() -> str:
+    """Identity of the requesting client, for per-client admission limits"""
+    return request.headers.get(Config.CLIENT_ID_HEADER) or request.remote_addr
+
+
+def _admit(signatures: list[tuple]) -> str:
+    """Check that jobs fit in the queue, or abort with 429 and Retry-After
+    (413 if they never would)
+
+    Returns:
+        str: The client submitting them
+    """
+    client = _client()
+    try:
+        admit(jobs, signatures, client)
+    except QueueFull as exc:
+        if exc.retry_after is None:
+            raise RequestEntityTooLarge(str(exc))
+        raise TooManyRequests(str(exc), retry_after=exc.retry_after)
+    return client
+
+
+def _estimate(job_id: str) -> dict:
+    """Estimated start and completion of an indexed job, empty otherwise"""
+    job = jobs.job(job_id)
+    if not job:
+        return {}
+    start, completion = estimate_times(jobs, job)
+    return {"estimated_start": start, "estimated_completion": completion}
+
+
+def _unindexed_statuses(job_ids: list[str]) -> dict[str, str]:
+    """Statuses of jobs only known to Huey, enqueued before the job index
+    existed and not yet backfilled by a worker restart.
+
+    Scans the whole queue, so only call it for ids the index doesn't know.
+    """
+    pending, failed, completed, running = get_tasks_pending_failed_complete_running()
+    wanted = set(job_ids)
+    statuses = {}
+    for status, ids in (
+        (JobStatus.PENDING, pending),
+        (JobStatus.COMPLETED, completed),
+        (JobStatus.FAILED, failed),
+        (JobStatus.RUNNING, running),
+    ):
+        for job_id in wanted.intersection(ids):
+            statuses.setdefault(job_id, status)
+    return statuses
+
 
 @api.route("/synthesize")
 class TextToSpeechJob(Resource):
@@ -90,6 +435,8 @@ class TextToSpeechJob(Resource):
         responses={
             202: "Job created successfully",
             400: "Invalid request parameters",
+            413: "Text exceeds a queue limit on its own",
+            429: "Queue limit reached, retry after Retry-After seconds",
         },
     )
     @api.expect(tts_request)
@@ -98,25 +445,182 @@ class TextToSpeechJob(Resource):
         """
         Create a new text-to-speech conversion job
 
-        Returns a job ID that can be used to check status and retrieve the result
+        Returns a job ID that can be used to check status and retrieve the
+        result, and when the job is estimated to start and finish given the
+        jobs queued ahead of it
+        """
+        signatures = [_task_signature(api.payload)]
+        (job_id,) = jobs.enqueue(huey, signatures, client=_admit(signatures))
+        return {"job_id": job_id, **_estimate(job_id)}, 202
+
+
+@api.route("/synthesize/batch")
+class TextToSpeechBatch(Resource):
+    @api.doc(
+        "create_tts_jobs",
+        responses={
+            202: "Jobs created successfully",
+            400: "Invalid request parameters",
+            413: "Jobs exceed a queue limit on their own",
+            429: "Queue limit reached, retry after Retry-After seconds",
+        },
+    )
+    @api.expect(batch_request)
+    @api.marshal_with(batch_response)
+    def post(self):
+        """
+        Create several text-to-speech conversion jobs at once
+
+        All jobs are enqueued in a single transaction; either every job is
+        accepted or none are. Returns the job IDs in request order.
+        """
+        requests = api.payload.get("jobs")
+        if not requests:
+            api.abort(400, "Missing or empty 'jobs' parameter")
+        if len(requests) > Config.BATCH_MAX_JOBS:
+            api.abort(400, f"At most {Config.BATCH_MAX_JOBS} jobs per batch")
+
+        signatures = [_task_signature(request) for request in requests]
+        client = _admit(signatures)
+        return {"job_ids": jobs.enqueue(huey, signatures, client=client)}, 202
+
+
+def _speak(payload: dict) -> Response:
+    """Forward a speak request to the speak worker and relay its audio
+
+    Aborts with the worker's 4xx/5xx, 503 if it can't be reached and 504 if
+    it doesn't answer within Config.SPEAK_TIMEOUT.
+    """
+    forward = urllib.request.Request(
+        Config.SPEAK_URL,
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urllib.request.urlopen(forward, timeout=Config.SPEAK_TIMEOUT) as reply:
+            return Response(reply.read(), mimetype=reply.headers.get_content_type())
+    except urllib.error.HTTPError as exc:
+        api.abort(exc.code, exc.read().decode(errors="replace"))
+    except urllib.error.URLError as exc:
+        if isinstance(exc.reason, TimeoutError):
+            raise GatewayTimeout("The speak worker did not answer in time")
+        raise ServiceUnavailable(f"The speak worker is not reachable: {exc.reason}")
+    except TimeoutError:
+        raise GatewayTimeout("The speak worker did not answer in time")
+
+
+@api.route("/speak")
+class TextToSpeechSpeak(Resource):
+    @api.doc(
+        "speak",
+        responses={
+            200: "Audio of the text",
+            400: "Invalid request parameters",
+            413: "Text longer than SPEAK_MAX_CHARS, submit a job instead",
+            503: "The speak worker is disabled or not running",
+            504: "The speak worker did not answer in time",
+        },
+        produces=["audio/wav", "audio/mpeg"],
+    )
+    @api.expect(speak_request)
+    def post(self):
+        """
+        Synthesize a short text right away, the audio in the response
+
+        Skips the queue: a resident Kokoro in the worker synthesizes the text
+        as soon as the device is free between the queued jobs' chunks, and
+        the WAV (or MP3) is returned in the response body. Only for texts of
+        at most SPEAK_MAX_CHARS characters, longer ones are jobs.
         """
-        text = api.payload.get("text")
-        if not text:
+        payload = api.payload or {}
+        text = payload.get("text")
+        if not text or not isinstance(text, str):
             api.abort(400, "Missing or empty 'text' parameter")
+        if len(text) > Config.SPEAK_MAX_CHARS:
+            raise RequestEntityTooLarge(
+                f"/tts/speak takes at most {Config.SPEAK_MAX_CHARS} characters, "
+                "submit longer texts to /tts/synthesize"
+            )
+        rate = payload.get("rate")
+        if rate is None:
+            rate = 1.0
+        if (
+            isinstance(rate, bool)
+            or not isinstance(rate, (int, float))
+            or not RATE_MIN <= rate <= RATE_MAX
+        ):
+            api.abort(400, f"'rate' must be a number from {RATE_MIN} to {RATE_MAX}")
+        fmt = payload.get("format") or "wav"
+        if fmt not in SPEAK_FORMATS:
+            api.abort(400, f"'format' must be one of {SPEAK_FORMATS}")
+        if not Config.SPEAK_URL:
+            raise ServiceUnavailable("/tts/speak is disabled, set SPEAK_PORT")
+        return _speak(
+            {
+                "text": text,
+                "voice": _voice(payload.get("voice")),
+                "rate": rate,
+                "format": fmt,
+            }
+        )
 
-        model = api.payload.get("model")
 
-        if model == "style2tts":
-            result = style2_tts_task(text)
-        elif model == "kokoro":
-            voice = api.payload.get("voice")
-            result = kokoro_tts_task(text, voice)
-        elif model == "qwen3":
-            result = qwen3_tts_task(text)
-        else:
-            api.abort(400, "Invalid 'model' parameter")
+@api.route("/voices")
+class TextToSpeechVoices(Resource):
+    @api.doc("list_voices")
+    @api.marshal_with(named_voices_response)
+    def get(self):
+        """List the named Kokoro voices"""
+        return {
+            "voices": [
+                {"name": name, "recipe": recipe}
+                for name, recipe in named_voices.all().items()
+            ]
+        }
+
+
+@api.route("/voices/<string:name>")
+@api.param("name", "The voice name")
+class TextToSpeechVoice(Resource):
+    @api.doc("get_voice", responses={200: "Voice found", 404: "Voice not found"})
+    @api.marshal_with(named_voice)
+    def get(self, name):
+        """Get the recipe of a named Kokoro voice"""
+        recipe = named_voices.recipe(name)
+        if not recipe:
+            api.abort(404, "Voice not found")
+        return {"name": name, "recipe": recipe}
+
+    @api.doc(
+        "define_voice",
+        responses={200: "Voice saved", 400: "Invalid name or recipe"},
+    )
+    @api.expect(voice_recipe)
+    @api.marshal_with(named_voice)
+    def put(self, name):
+        """
+        Save a blend of Kokoro voices under a name
 
-        return {"job_id": result.id}, 202
+        The name can then be a Kokoro request's voice. Requests take the
+        recipe the name has when they are submitted, redefining a voice
+        doesn't change jobs already queued. Names can't look like a Kokoro
+        voice (af_heart).
+        """
+        recipe = (api.payload or {}).get("recipe")
+        if not recipe or not isinstance(recipe, str):
+            api.abort(400, "Missing or empty 'recipe' parameter")
+        try:
+            recipe = named_voices.define(name, recipe)
+        except ValueError as exc:
+            api.abort(400, str(exc))
+        return {"name": name, "recipe": recipe}
+
+    @api.doc("delete_voice", responses={204: "Voice deleted", 404: "Voice not found"})
+    def delete(self, name):
+        """Delete a named Kokoro voice"""
+        if not named_voices.delete(name):
+            api.abort(404, "Voice not found")
+        return "Voice deleted", 204
 
 
 @api.route("/jobs/<string:job_id>")
@@ -127,42 +631,153 @@ class TextToSpeechStatus(Resource):
     )
     @api.marshal_with(job_status)
     def get(self, job_id):
-        """Get the status of a text-to-speech job"""
+        """Get the status of a text-to-speech job, with its estimated start
+        and completion while it is pending or running"""
+        job = jobs.job(job_id)
+        if job:
+            start, completion = estimate_times(jobs, job)
+            return {
+                "status": job["status"],
+                "estimated_start": start,
+                "estimated_completion": completion,
+            }
+        status = _unindexed_statuses([job_id]).get(job_id)
+        if not status:
+            api.abort(404, "Job not found")
+        return {"status": status}
+
+    @api.doc("delete_job", responses={204: "Job deleted successfully", 400: "Error"})
+    def delete(self, job_id):
+        """Delete a text-to-speech job, a document with all its chapters"""
         pending, failed, completed, running = (
             get_tasks_pending_failed_complete_running()
         )
+        document = jobs.document(job_id)
+        job_ids = [job_id]
+        if document:
+            job_ids += [chapter["job_id"] for chapter in document["chapter_jobs"]]
+        if set(job_ids).intersection(running):
+            return "Cancel not supported", 400
+        for target in job_ids:
+            if target in (failed + completed):
+                result = huey.get(target, peek=False)
+                if isinstance(result, str):
+                    artifacts.delete(result)
+            elif target in pending:
+                huey.revoke_by_id(target)
+        jobs.delete(job_id)
+        return "Job deleted", 204
 
-        if job_id in pending:
-            return {"status": JobStatus.PENDING}
 
-        if job_id in completed:
-            return {"status": JobStatus.COMPLETED}
+@api.route("/documents")
+class TextToSpeechDocument(Resource):
+    @api.doc(
+        "create_document_job",
+        responses={
+            202: "Document accepted",
+            400: "Invalid request parameters",
+            413: "Document too large",
+            429: "Queue limit reached, retry after Retry-After seconds",
+        },
+    )
+    @api.expect(document_parser)
+    @api.marshal_with(document_response)
+    def post(self):
+        """
+        Synthesize a long document (Markdown, HTML, EPUB) as one audio file
+
+        The document is split into chapters at its top level headings and
+        every chapter becomes a job of its own, so several workers synthesize
+        the document in parallel. Once the last chapter is done the chapters
+        are joined into one MP3 with a chapter marker each, downloaded from
+        /jobs/<job_id>/download like any job. Progress is reported by
+        /documents/<job_id>.
+        """
+        args = document_parser.parse_args()
+        upload = args["file"]
+        fmt = args["format"] or detect_format(upload.filename)
+        if not fmt:
+            api.abort(400, f"Unknown document type, set 'format' to one of {FORMATS}")
+        data = upload.read(Config.DOCUMENT_MAX_BYTES + 1)
+        if len(data) > Config.DOCUMENT_MAX_BYTES:
+            api.abort(
+                413, f"Documents are limited to {Config.DOCUMENT_MAX_BYTES} bytes"
+            )
 
-        if job_id in failed:
-            return {"status": JobStatus.FAILED}
+        try:
+            chapters = split_chapters(data, fmt)
+        except ValueError as exc:
+            api.abort(400, str(exc))
+        if not chapters:
+            api.abort(400, "The document has no text")
+        if len(chapters) > Config.DOCUMENT_MAX_CHAPTERS:
+            api.abort(
+                400, f"At most {Config.DOCUMENT_MAX_CHAPTERS} chapters per document"
+            )
 
-        if job_id in running:
-            return {"status": JobStatus.RUNNING}
+        request = {key: args[key] for key in ("model", "voice", "rate")}
+        signatures = [
+            _task_signature({**request, "text": chapter.text}) for chapter in chapters
+        ]
+        client = _admit(signatures)
+        document_id = str(uuid.uuid4())
+        chapter_ids = jobs.enqueue_document(
+            huey,
+            document_id,
+            signatures,
+            [chapter.title for chapter in chapters],
+            client=client,
+        )
+        return {"job_id": document_id, "chapter_ids": chapter_ids}, 202
 
-        api.abort(404, "Job not found")
 
-    @api.doc("delete_job", responses={204: "Job deleted successfully", 400: "Error"})
-    def delete(self, job_id):
-        """Delete a text-to-speech job"""
-        pending, failed, completed, running = (
-            get_tasks_pending_failed_complete_running()
-        )
-        if job_id in (failed + completed):
-            huey.get(job_id, peek=False)
+@api.route("/documents/<string:job_id>")
+@api.param("job_id", "The document job identifier")
+class TextToSpeechDocumentStatus(Resource):
+    @api.doc(
+        "get_document",
+        responses={200: "Document progress", 404: "Document not found"},
+    )
+    @api.marshal_with(document_details)
+    def get(self, job_id):
+        """Get the progress of a document and the status of its chapters"""
+        document = jobs.document(job_id)
+        if not document:
+            api.abort(404, "Document not found")
+        return document
 
-            for file in glob(f"{Config.TTS_WORKDIR}/{job_id}.*"):
-                os.remove(file)
 
-        elif job_id in pending:
-            huey.revoke_by_id(job_id)
-        elif job_id in running:
-            return "Cancel not supported", 400
-        return "Job deleted", 204
+@api.route("/jobs/status")
+class TextToSpeechStatuses(Resource):
+    @api.doc(
+        "get_jobs_status",
+        responses={200: "Job statuses retrieved", 400: "Invalid request parameters"},
+    )
+    @api.expect(status_request)
+    @api.marshal_with(jobs_list)
+    def post(self):
+        """
+        Get the status of several text-to-speech jobs
+
+        Job IDs unknown to both the job index and the queue are reported
+        with status NOT_FOUND, the same jobs GET /jobs/<id> answers 404 for
+        """
+        job_ids = api.payload.get("job_ids")
+        if not job_ids:
+            api.abort(400, "Missing or empty 'job_ids' parameter")
+        if len(job_ids) > Config.BATCH_MAX_JOBS:
+            api.abort(400, f"At most {Config.BATCH_MAX_JOBS} job IDs per request")
+
+        statuses = jobs.statuses(job_ids)
+        missing = [job_id for job_id in job_ids if job_id not in statuses]
+        if missing:
+            statuses.update(_unindexed_statuses(missing))
+        return {
+            "jobs": [
+                {"job_id": job_id, "status": statuses.get(job_id, JobStatus.NOT_FOUND)}
+                for job_id in job_ids
+            ]
+        }
 
 
 @api.route("/jobs/<string:job_id>/download")
@@ -185,55 +800,71 @@ class TextToSpeechDownload(Resource):
         if job_id not in completed:
             api.abort(404, "Job not found")
 
+        # Downloaded jobs are the last the retention manager evicts
+        jobs.touch(job_id)
         return send_file(
-            huey.get(job_id, peek=True),
+            artifacts.fetch(huey.get(job_id, peek=True)),
             mimetype="audio/mpeg",
             as_attachment=True,
             download_name=f"{job_id}.mp3",
         )
 
 
-@api.route("/jobs")
-class TextToSpeechJobs(Resource):
-    @api.doc("get_jobs", responses={200: "List of all jobs"})
-    @api.marshal_with(jobs_list)
+@api.route("/backlog")
+class TextToSpeechBacklog(Resource):
+    @api.doc("get_backlog", responses={200: "Queued workload"})
+    @api.marshal_with(backlog)
     def get(self):
-        """Get a list of all text-to-speech jobs"""
-        pending, failed, completed, running = (
-            get_tasks_pending_failed_complete_running()
-        )
+        """
+        Get the queued workload and its limits, in total and of the caller
 
+        Work counts from submission until the job finishes, in characters
+        and in estimated seconds to work it off. Submissions that would take
+        either over a limit are rejected with 429.
+        """
+        rates = jobs.rates()
+        client = _client()
+        queue_limits, client_limits = limits(None), limits(client)
         return {
-            "jobs": [
-                {
-                    "job_id": task.id,
-                    "status": JobStatus.PENDING,
-                }
-                for task in pending
-            ]
-            + [
-                {
-                    "job_id": job_id,
-                    "status": JobStatus.COMPLETED,
-                }
-                for job_id in completed
-            ]
-            + [
-                {
-                    "job_id": job_id,
-                    "status": JobStatus.FAILED,
-                }
-                for job_id in failed
-            ]
-            + [
-                {
-                    "job_id": job_id,
-                    "status": JobStatus.RUNNING,
-                }
-                for job_id in running
-            ]
+            "queue": {
+                **workload(jobs, rates),
+                "max_characters": queue_limits[0],
+                "max_seconds": queue_limits[1],
+            },
+            "client": {
+                "id": client,
+                **workload(jobs, rates, client),
+                "max_characters": client_limits[0],
+                "max_seconds": client_limits[1],
+            },
         }
 
+
+@api.route("/jobs")
+class TextToSpeechJobs(Resource):
+    @api.doc("get_jobs", responses={200: "Page of jobs", 400: "Invalid filter"})
+    @api.expect(jobs_parser)
+    @api.marshal_with(jobs_page)
+    def get(self):
+        """
+        List text-to-speech jobs, newest first
+
+        Results are paginated; follow 'next_cursor' to fetch further pages
+        """
+        args = jobs_parser.parse_args()
+        try:
+            page, next_cursor = jobs.list_jobs(
+                args["limit"],
+                cursor=args["cursor"],
+                status=args["status"],
+                model=args["model"],
+                created_after=args["created_after"],
+            )
+        except ValueError as exc:
+            api.abort(400, str(exc))
+
+        return {"jobs": page, "next_cursor": next_cursor}
+
     def delete(self):
         """Delete all text-to-speech jobs"""
         cleanup()
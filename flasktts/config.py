@@ -1,4 +1,5 @@
 import os
+import socket
 
 
 class Config:
@@ -10,9 +11,71 @@ class Config:
     if not os.path.exists(TTS_WORKDIR):
         os.makedirs(TTS_WORKDIR)
 
+    # Queue backend: "sqlite" (single host) or "redis" (shared by several hosts)
+    QUEUE_BACKEND = os.getenv("QUEUE_BACKEND", "sqlite")
+    REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+    # Where finished audio is kept: "local" directory or "s3" bucket
+    ARTIFACT_STORE = os.getenv("ARTIFACT_STORE", "local")
+    ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", TTS_WORKDIR)
+    S3_BUCKET = os.getenv("S3_BUCKET")
+    # Must be non-empty: flushing the store deletes everything under it
+    S3_PREFIX = os.getenv("S3_PREFIX", "flasktts/")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+
+    # Name of this worker node. Nodes sharing a queue need distinct names so
+    # each one records its own running jobs, hence the host name by default.
+    WORKER_NAME = os.getenv("WORKER_NAME") or socket.gethostname()
+
+    # Devices the worker launcher starts one consumer for: "auto" (every CUDA
+    # device, or the CPU) or a comma separated list such as "cuda:0,cuda:1"
+    WORKER_DEVICES = os.getenv("WORKER_DEVICES", "auto")
+    # Jobs each consumer runs at a time. They share the consumer's models and
+    # take turns on its device, so one job's text processing and MP3 encoding
+    # overlap another's inference.
+    WORKER_THREADS = int(os.getenv("WORKER_THREADS", 1))
+    # Above 1, each consumer forks this many worker processes instead of
+    # running threads. Engines in PRELOAD_ENGINES (comma separated: style2tts,
+    # kokoro, qwen3) are loaded before the fork and their weights shared
+    # between the processes. CPU only, a CUDA context can't be forked.
+    WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", 1))
+    PRELOAD_ENGINES = os.getenv("PRELOAD_ENGINES", "")
+
+    # Device override for the engines, e.g. "cpu" or "cuda:1"
+    TTS_DEVICE = os.getenv("TTS_DEVICE")
+    # Engines release cached memory (gc, the CUDA caching allocator's blocks)
+    # only once the device's memory, or the host's on CPU, is this full
+    MEMORY_RELEASE_FRACTION = float(os.getenv("MEMORY_RELEASE_FRACTION", 0.9))
+    # Chunks whose text front end (phonemization, tokenization) a background
+    # thread prepares ahead of the one on the device. 0 runs it inline.
+    FRONTEND_LOOKAHEAD = int(os.getenv("FRONTEND_LOOKAHEAD", 2))
+
+    # Kokoro backend: "torch" (KPipeline) or "onnx" (ONNX Runtime, CPU)
+    KOKORO_BACKEND = os.getenv("KOKORO_BACKEND", "torch")
+    # Graph exported with: python -m flasktts.tts.kokoroonnx export <path>
+    KOKORO_ONNX_MODEL = os.getenv("KOKORO_ONNX_MODEL", "Models/kokoro.onnx")
+    # ONNX Runtime thread pools, 0 lets ONNX Runtime decide
+    ORT_INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", 0))
+    ORT_INTER_OP_THREADS = int(os.getenv("ORT_INTER_OP_THREADS", 0))
+    # Kokoro voice blends such as "af_heart:0.7,af_bella:0.3": the engine
+    # keeps the VOICE_CACHE_SIZE most recently used blended voices, and saves
+    # them to VOICE_BLEND_DIR if set so they aren't mixed again after a restart
+    VOICE_CACHE_SIZE = int(os.getenv("VOICE_CACHE_SIZE", 32))
+    VOICE_BLEND_DIR = os.getenv("VOICE_BLEND_DIR", "")
+
+    # Inference optimizations per engine, see flasktts/tts/optimize.py.
+    # e.g. "cpu" or "inference_mode,int8,bf16,compile"; empty keeps plain fp32
+    TTS_OPTIMIZE = os.getenv("TTS_OPTIMIZE", "")
+    STYLE2TTS_OPTIMIZE = os.getenv("STYLE2TTS_OPTIMIZE", TTS_OPTIMIZE)
+    KOKORO_OPTIMIZE = os.getenv("KOKORO_OPTIMIZE", TTS_OPTIMIZE)
+    QWEN3_OPTIMIZE = os.getenv("QWEN3_OPTIMIZE", TTS_OPTIMIZE)
+
     huey_db_dir = os.path.dirname(HUEY_DB_PATH)
     if not os.path.exists(huey_db_dir):
         os.makedirs(huey_db_dir)
+    # Named voices (PUT /tts/voices/<name>), next to the queue rather than in
+    # the workdir, which the artifact store may flush
+    VOICE_DIR = os.getenv("VOICE_DIR", os.path.join(huey_db_dir, "voices"))
 
     # Get MQTT config from environment
     MQTT_HOST = os.getenv("MQTT_HOST")
@@ -24,8 +87,59 @@ class Config:
     FLASK_ENV = os.getenv("FLASK_ENV")
     PORT = int(os.getenv("PORT", 5001))
 
+    # Synchronous POST /tts/speak: texts of at most SPEAK_MAX_CHARS characters
+    # are synthesized right away by a resident Kokoro in the consumer of the
+    # first device, listening on SPEAK_HOST:SPEAK_PORT (0 disables it). The
+    # API forwards to SPEAK_URL, by default that port on this host.
+    SPEAK_MAX_CHARS = int(os.getenv("SPEAK_MAX_CHARS", 100))
+    SPEAK_HOST = os.getenv("SPEAK_HOST", "127.0.0.1")
+    SPEAK_PORT = int(os.getenv("SPEAK_PORT", 0))
+    SPEAK_URL = os.getenv("SPEAK_URL") or (
+        f"http://127.0.0.1:{SPEAK_PORT}/speak" if SPEAK_PORT else ""
+    )
+    SPEAK_TIMEOUT = float(os.getenv("SPEAK_TIMEOUT", 10))
+
+    # Maximum number of jobs accepted by a single batch submit or status lookup
+    BATCH_MAX_JOBS = int(os.getenv("BATCH_MAX_JOBS", 100))
+
+    # Limits of uploaded documents (POST /tts/documents)
+    DOCUMENT_MAX_BYTES = int(os.getenv("DOCUMENT_MAX_BYTES", 50 * 1024 * 1024))
+    DOCUMENT_MAX_CHAPTERS = int(os.getenv("DOCUMENT_MAX_CHAPTERS", 500))
+
+    # Page size of the jobs listing
+    JOBS_PAGE_SIZE = int(os.getenv("JOBS_PAGE_SIZE", 50))
+    JOBS_PAGE_MAX = int(os.getenv("JOBS_PAGE_MAX", 500))
+
+    # Micro-batching: a Kokoro or Qwen3 worker starting a job of at most
+    # MICROBATCH_MAX_CHARS characters takes up to MICROBATCH_MAX_JOBS - 1 more
+    # short jobs of the same model and voice off the queue, waiting up to
+    # MICROBATCH_WINDOW_MS for them, and synthesizes them as one batch.
+    # MICROBATCH_MAX_JOBS=1 disables it.
+    MICROBATCH_MAX_JOBS = int(os.getenv("MICROBATCH_MAX_JOBS", 8))
+    MICROBATCH_WINDOW_MS = int(os.getenv("MICROBATCH_WINDOW_MS", 0))
+    MICROBATCH_MAX_CHARS = int(os.getenv("MICROBATCH_MAX_CHARS", 500))
+
+    # Jobs all worker nodes run at the same time, the queue is estimated to
+    # drain this many jobs at a time when predicting completion times
+    ETA_WORKERS = int(os.getenv("ETA_WORKERS", 1))
+
+    # Admission control: limits on the queued work, in characters and in
+    # estimated seconds to work it off (see ETA_WORKERS), in total and per
+    # client. 0 disables a limit. Clients are told apart by the
+    # CLIENT_ID_HEADER request header, or by address without one.
+    QUEUE_MAX_CHARS = int(os.getenv("QUEUE_MAX_CHARS", 0))
+    QUEUE_MAX_SECONDS = float(os.getenv("QUEUE_MAX_SECONDS", 0))
+    CLIENT_MAX_CHARS = int(os.getenv("CLIENT_MAX_CHARS", 0))
+    CLIENT_MAX_SECONDS = float(os.getenv("CLIENT_MAX_SECONDS", 0))
+    CLIENT_ID_HEADER = os.getenv("CLIENT_ID_HEADER", "X-Client-Id")
+
+    # Retention of finished jobs: a periodic task evicts the least recently
+    # used (finished or downloaded) jobs once unused for CLEANUP_TASKS_AFTER_SEC
+    # or while their output exceeds RETENTION_MAX_BYTES (0 for no quota)
     CLEANUP_TASKS_AFTER_SEC = int(os.getenv("CLEANUP_TASKS_AFTER_SEC", 172800))
+    RETENTION_MAX_BYTES = int(os.getenv("RETENTION_MAX_BYTES", 0))
+    RETENTION_INTERVAL_MIN = int(os.getenv("RETENTION_INTERVAL_MIN", 10))
 
-    # Qwen3 speech rate: >1.0 = faster, <1.0 = slower, 1.0 = unchanged.
-    # Applied via pitch-preserving time stretch after generation.
+    # Default speech rate of qwen3 requests without a "rate": >1.0 = faster,
+    # <1.0 = slower, 1.0 = unchanged. Applied by ffmpeg atempo while encoding.
     QWEN3_SPEECH_RATE = float(os.getenv("QWEN3_SPEECH_RATE", 1.0))
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Huey consumer of one device, optionally sharing model weights between
+forked worker processes.
+
+By default the consumer runs Config.WORKER_THREADS worker threads on one set
+of models. With Config.WORKER_PROCESSES above 1 it forks that many worker
+processes instead, for CPU boxes where threads contend on the GIL between
+inference calls. The engines in Config.PRELOAD_ENGINES are then loaded
+before the fork, so the workers share their weights copy-on-write rather
+than each loading its own copy: inference never writes the weights, so their
+pages stay shared and every additional worker only costs its working memory.
+
+    WORKER_PROCESSES=4 PRELOAD_ENGINES=kokoro python -m flasktts.consumer
+
+With Config.SPEAK_PORT set, the consumer also answers POST /tts/speak, see
+flasktts.speak.
+"""
+
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+import torch
+from huey.consumer_options import ConsumerConfig
+
+from flasktts import speak
+from flasktts.config import Config
+from flasktts.tasks.tasks import huey, startup
+from flasktts.tts.device import select_device
+from flasktts.tts.kokorotts import KokoroTTSHighlander
+from flasktts.tts.qwen3tts import Qwen3TTSHighlander
+from flasktts.tts.style2tts import Style2TTSHighlander
+
+# Engines by the model name jobs are indexed under
+ENGINES = {
+    "style2tts": Style2TTSHighlander,
+    "kokoro": KokoroTTSHighlander,
+    "qwen3": Qwen3TTSHighlander,
+}
+
+
+def preload_engines(names: list[str]) -> dict[str, float]:
+    """Load engines in this process, so forked workers inherit them
+
+    Args:
+        names (list[str]): Engine names, keys of ENGINES
+
+    Raises:
+        ValueError: If a name is not an engine
+
+    Returns:
+        dict[str, float]: Seconds each engine took to load
+    """
+    unknown = set(names) - set(ENGINES)
+    if unknown:
+        raise ValueError(
+            f"Unknown engines {sorted(unknown)}, expected some of {list(ENGINES)}"
+        )
+    seconds = {}
+    for name in names:
+        start = time.perf_counter()
+        ENGINES[name].get_instance()
+        seconds[name] = time.perf_counter() - start
+        print(f"Preloaded {name} in {seconds[name]:.1f}s")
+    return seconds
+
+
+def consumer_config() -> ConsumerConfig:
+    """Huey consumer options from Config"""
+    if Config.WORKER_PROCESSES > 1:
+        return ConsumerConfig(workers=Config.WORKER_PROCESSES, worker_type="process")
+    return ConsumerConfig(workers=Config.WORKER_THREADS, worker_type="thread")
+
+
+def main() -> int:
+    config = consumer_config()
+    config.validate()
+    config.setup_logger(logging.getLogger("huey"))
+
+    # Recover the previous run's jobs before any worker can start one
+    startup()
+
+    names = [n.strip() for n in Config.PRELOAD_ENGINES.split(",") if n.strip()]
+    if config.worker_type == "process":
+        # Sharing needs fork, whatever the platform's default start method
+        multiprocessing.set_start_method("fork", force=True)
+        if names and select_device().type == "cuda":
+            # A CUDA context does not survive fork
+            print("PRELOAD_ENGINES needs CPU workers, loading per process instead")
+            names = []
+        # Split the cores between the workers rather than oversubscribing them
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // config.workers))
+    preload_engines(names)
+    if Config.SPEAK_PORT:
+        speak.start(
+            speak.make_server(Config.SPEAK_HOST, Config.SPEAK_PORT),
+            process=config.worker_type == "process",
+        )
+    # Workers open their own connections, a forked SQLite connection is unsafe
+    huey.storage.close()
+
+    huey.create_consumer(**config.values).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Low-latency synthesis of short texts, the worker side of POST /tts/speak.
+
+A job goes through the queue, the database, a worker picking it up, an MP3
+file and the client polling for it, which dominates the latency of a few
+words. The consumer of the first device instead answers short texts right
+away from a small HTTP server on Config.SPEAK_HOST:Config.SPEAK_PORT, which
+the API forwards /tts/speak requests to. Kokoro stays loaded and warmed up,
+and the audio is generated and encoded in memory into the response.
+
+With worker threads the server runs in the consumer process: the engine is
+the jobs' own, and its inference takes turns with theirs under the same
+device lock. With worker processes it is forked as one more process before
+the job workers, sharing Kokoro's weights if it is in PRELOAD_ENGINES.
+"""
+
+import io
+import json
+import multiprocessing
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from numbers import Number
+from typing import Union
+
+import numpy as np
+import soundfile as sf
+
+from flasktts.tasks.ffmpeg import encode_mp3
+from flasktts.tts.kokorotts import SAMPLE_RATE, KokoroTTSHighlander
+
+# Response formats and their content types
+FORMATS = {"wav": "audio/wav", "mp3": "audio/mpeg"}
+DEFAULT_VOICE = "af_heart"
+WARM_UP_TEXT = "Ready."
+
+
+def synthesize(
+    text: str, voice: str = DEFAULT_VOICE, rate: Number = 1.0, fmt: str = "wav"
+) -> bytes:
+    """Audio of text from the resident Kokoro, encoded in memory
+
+    Args:
+        text (str): Text to synthesize, short enough to hold its audio in memory
+        voice (str, optional): Kokoro voice. Defaults to DEFAULT_VOICE.
+        rate (Number, optional): Speech rate, Kokoro's speed. Defaults to 1.0.
+        fmt (str, optional): A key of FORMATS. Defaults to "wav".
+
+    Returns:
+        bytes: The WAV or MP3 file
+    """
+    engine = KokoroTTSHighlander.get_instance()
+    parts = list(engine.generate(engine.chunks(text), voice, rate))
+    audio = np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+    if fmt == "mp3":
+        return encode_mp3(audio, SAMPLE_RATE)
+    buffer = io.BytesIO()
+    sf.write(
+        buffer,
+        np.clip(audio, -1.0, 1.0),
+        SAMPLE_RATE,
+        format="WAV",
+        subtype="PCM_16",
+    )
+    return buffer.getvalue()
+
+
+def _request(body: bytes) -> dict:
+    """Arguments of synthesize from a request body
+
+    Raises:
+        ValueError: If the body is not a valid request
+    """
+    payload = json.loads(body)
+    if not isinstance(payload, dict) or not isinstance(payload.get("text"), str):
+        raise ValueError("Expected a JSON object with a 'text'")
+    fmt = payload.get("format") or "wav"
+    if fmt not in FORMATS:
+        raise ValueError(f"'format' must be one of {list(FORMATS)}")
+    return {
+        "text": payload["text"],
+        "voice": payload.get("voice") or DEFAULT_VOICE,
+        "rate": float(payload.get("rate") or 1.0),
+        "fmt": fmt,
+    }
+
+
+class SpeakHandler(BaseHTTPRequestHandler):
+    """POST a JSON {text, voice, rate, format}, get the audio back"""
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            args = _request(self.rfile.read(length))
+        except (ValueError, TypeError) as exc:
+            self._reply(400, str(exc).encode(), "text/plain")
+            return
+        try:
+            audio = synthesize(**args)
+        except Exception as exc:
+            traceback.print_exc()
+            self._reply(500, f"Synthesis failed: {exc}".encode(), "text/plain")
+            return
+        self._reply(200, audio, FORMATS[args["fmt"]])
+
+    def _reply(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Every request would be logged, only errors are
+        pass
+
+
+def make_server(host: str, port: int) -> ThreadingHTTPServer:
+    """Bind the speak server, port 0 picks a free one"""
+    server = ThreadingHTTPServer((host, port), SpeakHandler)
+    server.daemon_threads = True
+    return server
+
+
+def _serve(server: ThreadingHTTPServer):
+    """Load Kokoro and run it once so the first request doesn't pay for it,
+    then answer requests"""
+    start = time.perf_counter()
+    try:
+        synthesize(WARM_UP_TEXT)
+    except Exception:
+        # Serve anyway, requests then report the error rather than time out
+        traceback.print_exc()
+    host, port = server.server_address[:2]
+    print(
+        f"Speak worker ready on {host}:{port} "
+        f"after {time.perf_counter() - start:.1f}s"
+    )
+    server.serve_forever()
+
+
+def start(
+    server: ThreadingHTTPServer, process: bool = False
+) -> Union[threading.Thread, multiprocessing.Process]:
+    """Serve in the background, on a thread or a forked process
+
+    Args:
+        server (ThreadingHTTPServer): From make_server
+        process (bool, optional): Fork a process, for consumers running worker
+            processes. Defaults to False, a thread of this process.
+
+    Returns:
+        threading.Thread | multiprocessing.Process: The daemon serving
+    """
+    if not process:
+        worker = threading.Thread(
+            target=_serve, args=(server,), name="speak", daemon=True
+        )
+        worker.start()
+        return worker
+    worker = multiprocessing.Process(
+        target=_serve, args=(server,), name="speak", daemon=True
+    )
+    worker.start()
+    # The socket is the child's now
+    server.server_close()
+    return worker
@@ -0,0 +1,113 @@
+"""Admission control on the queued workload.
+
+A submission is accepted while the work queued in total, and by the client
+submitting it, stays within the configured limits once the new jobs are
+added. Work is measured in characters and in estimated seconds to work it
+off at Config.ETA_WORKERS jobs at a time, see flasktts.tasks.estimate; a
+queued job counts until it finishes. A rejected submission is told how long
+to wait, the time the queue needs to shed the excess.
+
+The check and the enqueue are separate transactions, so concurrent
+submissions can overshoot a limit by a request each.
+"""
+
+import math
+from typing import Optional
+
+from flasktts.config import Config
+from flasktts.tasks.estimate import job_cost, work_seconds
+
+
+class QueueFull(Exception):
+    """A submission would take the queued work over a limit.
+
+    Attributes:
+        retry_after (int): Seconds until the submission is expected to fit,
+            None if it exceeds the limit on its own
+    """
+
+    def __init__(self, message: str, retry_after: Optional[int]):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def workload(
+    index, rates: dict, client: Optional[str] = None, now: Optional[float] = None
+) -> dict:
+    """Work queued in total, or by client, that is not finished yet
+
+    Args:
+        index (SqliteJobIndex | RedisJobIndex): Job index
+        rates (dict): Averages from the job index's rates()
+        client (str, optional): Only count the jobs of this client
+        now (float, optional): Current UNIX time
+
+    Returns:
+        dict: characters and seconds (to work them off) of the pending and
+        running jobs
+    """
+    pending = index.pending_characters(client=client)
+    running = index.running_jobs(client=client)
+    return {
+        "characters": sum(pending.values())
+        + sum(job["characters"] or 0 for job in running),
+        "seconds": work_seconds(rates, pending, running, now),
+    }
+
+
+def limits(client: Optional[str]) -> tuple[int, float]:
+    """Characters and seconds limits in total or of a client, 0 for none"""
+    if client is None:
+        return Config.QUEUE_MAX_CHARS, Config.QUEUE_MAX_SECONDS
+    return Config.CLIENT_MAX_CHARS, Config.CLIENT_MAX_SECONDS
+
+
+def admit(
+    index, signatures: list[tuple], client: Optional[str], now: Optional[float] = None
+):
+    """Check that jobs fit in the queue before they are enqueued
+
+    Args:
+        index (SqliteJobIndex | RedisJobIndex): Job index
+        signatures (list[tuple]): (task, model, voice, characters) of the jobs
+        client (str): Who submits the jobs, None to only check the total
+        now (float, optional): Current UNIX time
+
+    Raises:
+        QueueFull: If the jobs would take the queue over a limit
+    """
+    scopes = [None] if client is None else [None, client]
+    scopes = [scope for scope in scopes if any(limits(scope))]
+    if not scopes:
+        return
+    rates = index.rates()
+    characters = sum(characters or 0 for *_, characters in signatures)
+    seconds = sum(
+        job_cost(rates, model, voice, characters)
+        for _, model, voice, characters in signatures
+    ) / max(Config.ETA_WORKERS, 1)
+    for scope in scopes:
+        queued = workload(index, rates, scope, now)
+        who = "the queue" if scope is None else f"client {scope}"
+        for unit, limit, new in zip(
+            ("characters", "seconds"), limits(scope), (characters, seconds)
+        ):
+            excess = queued[unit] + new - limit
+            if not limit or excess <= 0:
+                continue
+            if new > limit:
+                raise QueueFull(
+                    f"The request's {new:.0f} {unit} of work exceed the limit of "
+                    f"{limit:.0f} of {who}",
+                    None,
+                )
+            # Seconds of work drain in as many seconds, characters at the
+            # pace of the queued ones
+            wait = excess
+            if unit == "characters":
+                wait = excess / queued[unit] * queued["seconds"]
+            raise QueueFull(
+                f"Too much work queued for {who}: {queued[unit]:.0f} {unit}, "
+                f"at most {limit:.0f} are accepted",
+                max(1, math.ceil(wait)),
+            )
@@ -0,0 +1,157 @@
+import os
+import shutil
+from typing import Optional
+
+from flasktts.config import Config
+
+# A job's timestamp index is stored next to its audio under this suffix
+TIMESTAMPS_SUFFIX = ".timestamps.json"
+
+
+def create_artifact_store():
+    """Create the artifact store selected by Config.ARTIFACT_STORE."""
+    if Config.ARTIFACT_STORE == "s3":
+        return S3ArtifactStore(
+            Config.S3_BUCKET, Config.S3_PREFIX, endpoint_url=Config.S3_ENDPOINT_URL
+        )
+    if Config.ARTIFACT_STORE == "local":
+        return LocalArtifactStore(Config.ARTIFACT_DIR)
+    raise ValueError(f"Unknown ARTIFACT_STORE: {Config.ARTIFACT_STORE}")
+
+
+def timestamps_key(key: str) -> str:
+    """Key of the timestamp index stored with the audio of key"""
+    return os.path.splitext(key)[0] + TIMESTAMPS_SUFFIX
+
+
+class LocalArtifactStore:
+    """Finished audio kept in a directory visible to the API and the workers.
+
+    Files are sharded into subdirectories named after the first two
+    characters of the job id, so no directory grows with the number of jobs
+    kept and every lookup or deletion touches one small directory.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        if not os.path.exists(self.root):
+            os.makedirs(self.root)
+
+    def _path(self, key: str) -> str:
+        # Results stored before the artifact store existed are absolute paths
+        return key if os.path.isabs(key) else os.path.join(self.root, key)
+
+    def put(self, path: str) -> str:
+        """Take ownership of a finished output file.
+
+        Args:
+            path (str): Local path of the generated file
+
+        Returns:
+            str: Key to fetch the artifact with
+        """
+        name = os.path.basename(path)
+        key = f"{name[:2]}/{name}"
+        target = self._path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.abspath(path) != os.path.abspath(target):
+            shutil.move(path, target)
+        return key
+
+    def fetch(self, key: str):
+        """Return something ``flask.send_file`` can serve, here a path."""
+        return self._path(key)
+
+    def download(self, key: str, path: str):
+        """Copy an artifact to a local file."""
+        shutil.copyfile(self._path(key), path)
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def delete(self, key: str):
+        path = self._path(key)
+        if os.path.isfile(path):
+            os.remove(path)
+
+    def flush(self):
+        for entry in os.listdir(self.root):
+            path = os.path.join(self.root, entry)
+            if os.path.isfile(path):
+                os.remove(path)
+            elif os.path.isdir(path):
+                shutil.rmtree(path)
+
+
+class S3ArtifactStore:
+    """Finished audio kept in an S3-compatible bucket (AWS, MinIO, ...).
+
+    Lets worker nodes hand results to the API without a shared filesystem.
+    Credentials come from the usual boto3 sources (AWS_ACCESS_KEY_ID, ...).
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "flasktts/",
+        endpoint_url: Optional[str] = None,
+    ):
+        """
+        Args:
+            bucket (str): Bucket name
+            prefix (str): Key prefix for all artifacts, e.g. "flasktts/". The
+                store owns everything under it, so it can't be empty.
+            endpoint_url (str, optional): Endpoint of a non-AWS S3 service
+        """
+        import boto3
+
+        if not bucket:
+            raise ValueError("S3_BUCKET must be set to use the s3 artifact store")
+        if not prefix:
+            raise ValueError(
+                "S3_PREFIX must not be empty, flush would empty the bucket"
+            )
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def put(self, path: str) -> str:
+        """Upload a finished output file and delete the local copy.
+
+        Returns:
+            str: Key to fetch the artifact with
+        """
+        key = f"{self.prefix}{os.path.basename(path)}"
+        self.client.upload_file(path, self.bucket, key)
+        os.remove(path)
+        return key
+
+    def fetch(self, key: str):
+        """Return something ``flask.send_file`` can serve, here a stream."""
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"]
+
+    def download(self, key: str, path: str):
+        """Copy an artifact to a local file."""
+        self.client.download_file(self.bucket, key, path)
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError:
+            return False
+        return True
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def flush(self):
+        """Delete every artifact under the prefix, nothing else in the bucket."""
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            objects = [{"Key": obj["Key"]} for obj in page.get("Contents", [])]
+            if objects:
+                self.client.delete_objects(
+                    Bucket=self.bucket, Delete={"Objects": objects}
+                )
@@ -0,0 +1,122 @@
+"""Job cost and completion time estimates.
+
+Workers record the speech rate (audio seconds per character) and real-time
+factor (compute seconds per audio second) of every job they finish, as
+moving averages per model and voice in the job index. A job's cost is its
+characters times both. A pending job starts once the jobs queued ahead of it
+and what is left of the running ones are worked off, Config.ETA_WORKERS jobs
+at a time. The estimate takes one grouped query of the pending jobs and a
+read of the running ones, cheap enough for every request.
+
+Queue priorities are not taken into account, jobs are assumed to start in
+submission order.
+"""
+
+import time
+from typing import Optional
+
+from flasktts.config import Config
+from flasktts.tasks.jobs import PENDING, RUNNING
+
+# Rough priors until a model has history: audio seconds per character
+# (about 15 characters per second of speech) and RTF
+DEFAULT_AUDIO_PER_CHAR = 0.065
+DEFAULT_RTF = {"style2tts": 0.3, "kokoro": 0.2, "qwen3": 1.5}
+
+
+def _rate(rates: dict, model: Optional[str], voice: Optional[str]) -> tuple:
+    """(audio seconds per character, RTF) of a model and voice, falling back
+    to the model's other voices, then to the priors"""
+    rate = rates.get((model, voice))
+    if rate:
+        return rate["audio_per_char"], rate["rtf"]
+    voices = [rate for (m, _), rate in rates.items() if m == model]
+    samples = sum(rate["samples"] for rate in voices)
+    if samples:
+        return (
+            sum(rate["audio_per_char"] * rate["samples"] for rate in voices) / samples,
+            sum(rate["rtf"] * rate["samples"] for rate in voices) / samples,
+        )
+    return DEFAULT_AUDIO_PER_CHAR, DEFAULT_RTF.get(model, max(DEFAULT_RTF.values()))
+
+
+def job_cost(
+    rates: dict, model: Optional[str], voice: Optional[str], characters: int
+) -> float:
+    """Estimated compute seconds of a job
+
+    Args:
+        rates (dict): Averages from the job index's rates()
+        model (str): Model of the job
+        voice (str): Voice of the job, None for models without voices
+        characters (int): Length of the job's text
+
+    Returns:
+        float: Seconds a worker is expected to spend on the job
+    """
+    audio_per_char, rtf = _rate(rates, model, voice)
+    return (characters or 0) * audio_per_char * rtf
+
+
+def work_seconds(
+    rates: dict, pending: dict, running: list[dict], now: Optional[float] = None
+) -> float:
+    """Compute seconds left of pending and running jobs, divided between
+    Config.ETA_WORKERS workers
+
+    Args:
+        rates (dict): Averages from the job index's rates()
+        pending (dict): Pending characters from the index's pending_characters()
+        running (list[dict]): Jobs from the index's running_jobs()
+        now (float, optional): Current UNIX time
+    """
+    now = time.time() if now is None else now
+    seconds = sum(
+        job_cost(rates, model, voice, characters)
+        for (model, voice), characters in pending.items()
+    )
+    for job in running:
+        cost = job_cost(rates, job["model"], job["voice"], job["characters"])
+        started_at = now if job["started_at"] is None else job["started_at"]
+        seconds += max(cost - (now - started_at), 0.0)
+    return seconds / max(Config.ETA_WORKERS, 1)
+
+
+def backlog_seconds(
+    index, rates: dict, before: Optional[float] = None, now: Optional[float] = None
+) -> float:
+    """Compute seconds of work ahead of a job created at before, all queued
+    work if before is None, see work_seconds"""
+    return work_seconds(
+        rates,
+        index.pending_characters(before=before),
+        index.running_jobs(),
+        now,
+    )
+
+
+def estimate_times(
+    index, job: dict, now: Optional[float] = None
+) -> tuple[Optional[float], Optional[float]]:
+    """Estimated start and completion time of a job
+
+    Args:
+        index (SqliteJobIndex | RedisJobIndex): Job index
+        job (dict): The job as returned by the index's job()
+        now (float, optional): Current UNIX time
+
+    Returns:
+        tuple[Optional[float], Optional[float]]: UNIX timestamps of the start
+        and the completion, None for finished jobs and documents
+    """
+    if job["status"] not in (PENDING, RUNNING) or job.get("chapters") is not None:
+        return None, None
+    now = time.time() if now is None else now
+    rates = index.rates()
+    cost = job_cost(rates, job["model"], job["voice"], job["characters"])
+    if job["status"] == RUNNING:
+        start = now if job["started_at"] is None else job["started_at"]
+        # A job running past its estimate is expected to finish any moment
+        return start, max(start + cost, now)
+    start = now + backlog_seconds(index, rates, before=job["created_at"], now=now)
+    return start, start + cost
@@ -1,17 +1,28 @@
 import glob
 import os
+import queue
+import re
+import subprocess
+import threading
 
 import ffmpeg
+import numpy as np
 
 
-def convert_wav_to_mp3(wav_path):
+def convert_wav_to_mp3(wav_path, tempo=1.0):
     """Convert WAV audio file to MP3 and delete the source WAV.
 
-    Runs the equivalent of: ffmpeg -i wav_path -ac 1 -ar 22050 -o out_path"""
+    A tempo other than 1 changes the speech rate without changing the pitch,
+    streamed by ffmpeg while encoding.
+
+    Runs the equivalent of: ffmpeg -i wav_path [-af atempo=tempo] -ac 1 -ar 22050 -o out_path"""
 
     out_path = os.path.splitext(wav_path)[0] + ".mp3"
 
-    ffmpeg.input(wav_path).output(out_path, ac=1, ar=22050).run()
+    stream = ffmpeg.input(wav_path)
+    if tempo != 1.0:
+        stream = stream.filter("atempo", tempo)
+    stream.output(out_path, ac=1, ar=22050).run()
     os.remove(wav_path)
     return out_path
 
@@ -38,3 +49,218 @@ def convert_wav_dir_to_mp3(wav_dir):
         os.remove(wav_file)
     os.rmdir(wav_dir)
     return out_path
+
+
+class Mp3Encoder:
+    """MP3 file encoded while its audio is still being generated.
+
+    Takes chunks like a WavWriter does, engines write to either. A feeder
+    thread hands them to an ffmpeg process through a bounded queue, so the
+    chunks are encoded while the engine generates the next ones and the MP3
+    is complete moments after the last chunk. When ffmpeg falls behind the
+    queue fills up and write() blocks, which bounds the memory held.
+
+    Runs the equivalent of: ffmpeg -f s16le -ac 1 -ar rate -i pipe:
+    [-af atempo=tempo] -ac 1 -ar 22050 out_path"""
+
+    def __init__(self, out_path, tempo=1.0, max_pending=16):
+        """
+        Args:
+            out_path (str): Output MP3
+            tempo (float): Speech rate applied while encoding (default: 1.0)
+            max_pending (int): Chunks queued for ffmpeg before write() blocks
+        """
+        self.path = out_path
+        self.tempo = tempo
+        self.sample_rate = None
+        self.frames = 0
+        self._queue = queue.Queue(max_pending)
+        self._process = None
+        self._thread = None
+        self._error = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    @property
+    def duration(self):
+        """Seconds of audio written so far"""
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+    def write(self, audio, sample_rate=None):
+        """Queue float audio in [-1, 1] for encoding, values outside are clipped
+
+        Raises:
+            ValueError: If sample_rate differs from the first chunk's
+            ffmpeg.Error: If ffmpeg stopped taking audio
+        """
+        if sample_rate is not None:
+            if self.sample_rate is None:
+                self.sample_rate = sample_rate
+            elif sample_rate != self.sample_rate:
+                raise ValueError(
+                    f"Sample rate {sample_rate} does not match {self.sample_rate}"
+                )
+        if self._process is None:
+            if self.sample_rate is None:
+                raise ValueError("Sample rate unknown for the first write")
+            self._start()
+        if self._error is not None:
+            self._failed()
+        self._queue.put(audio)
+        self.frames += len(audio)
+
+    def close(self):
+        """Wait until the queued audio is encoded, the MP3 is then complete
+
+        Raises:
+            ffmpeg.Error: If ffmpeg failed
+        """
+        if self._process is None:
+            if self.sample_rate is None:
+                return
+            # Nothing written, an empty MP3 like WavWriter's empty file
+            self._start()
+        self._queue.put(None)
+        self._thread.join()
+        if self._process.wait() != 0 or self._error is not None:
+            self._failed()
+
+    def abort(self):
+        """Stop encoding and delete the partial MP3"""
+        if self._process is not None:
+            self._process.kill()
+            self._queue.put(None)
+            self._thread.join()
+            self._process.wait()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _failed(self):
+        """Raise ffmpeg's error once it stopped taking audio"""
+        stderr = self._process.stderr.read()
+        self._process.wait()
+        raise ffmpeg.Error("ffmpeg", None, stderr) from self._error
+
+    def _start(self):
+        stream = ffmpeg.input("pipe:", format="s16le", ac=1, ar=self.sample_rate)
+        if self.tempo != 1.0:
+            stream = stream.filter("atempo", self.tempo)
+        self._process = (
+            stream.output(self.path, ac=1, ar=22050)
+            .global_args("-loglevel", "error")
+            .overwrite_output()
+            .run_async(pipe_stdin=True, pipe_stderr=True)
+        )
+        self._thread = threading.Thread(target=self._feed, daemon=True)
+        self._thread.start()
+
+    def _feed(self):
+        while True:
+            audio = self._queue.get()
+            if audio is None:
+                break
+            if self._error is not None:
+                # Keep draining so that write() never blocks on a dead ffmpeg
+                continue
+            pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+            try:
+                self._process.stdin.write(pcm.tobytes())
+            except OSError as exc:
+                self._error = exc
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+
+
+def encode_mp3(audio, sample_rate):
+    """Encode float audio in memory and return the MP3's bytes, for audio
+    short enough to be answered in a response rather than stored.
+
+    Runs the equivalent of: ffmpeg -f s16le -i pipe: -ac 1 -ar 22050 -f mp3 pipe:"""
+
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    out, _ = (
+        ffmpeg.input("pipe:", format="s16le", ac=1, ar=sample_rate)
+        .output("pipe:", format="mp3", ac=1, ar=22050)
+        .global_args("-loglevel", "error")
+        .run(input=pcm.tobytes(), capture_stdout=True, capture_stderr=True)
+    )
+    return out
+
+
+def probe_duration(path):
+    """Return the duration of an audio file in seconds, None if it can't be
+    probed (ffprobe missing or failing). Only used for job metadata, so a
+    failure here must not fail the job.
+
+    Runs the equivalent of: ffprobe -show_format path"""
+
+    try:
+        return float(ffmpeg.probe(path)["format"]["duration"])
+    except (ffmpeg.Error, OSError, KeyError, ValueError) as exc:
+        print(f"Could not probe duration of {path}: {exc}")
+        return None
+
+
+def _ffmetadata_escape(value):
+    return re.sub(r"([=;#\\\n])", r"\\\1", value)
+
+
+def concat_mp3_with_chapters(chapters, out_path):
+    """Join MP3s without re-encoding into one MP3 with a chapter per input.
+
+    Args:
+        chapters (list): (mp3_path, title, seconds) in order. Chapter markers
+            need every duration, with one unknown (None) there are none.
+        out_path (str): Output MP3, ID3v2.3 chapter frames hold the markers
+
+    Runs the equivalent of: ffmpeg -f concat -safe 0 -i files.txt -i chapters.txt
+    -map_metadata 1 -c copy -id3v2_version 3 out_path"""
+
+    list_path = f"{out_path}.files.txt"
+    meta_path = f"{out_path}.chapters.txt"
+    with open(list_path, "w") as f:
+        for path, _, _ in chapters:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+
+    marked = all(seconds is not None for _, _, seconds in chapters)
+    if marked:
+        with open(meta_path, "w") as f:
+            f.write(";FFMETADATA1\n")
+            start = 0
+            for number, (_, title, seconds) in enumerate(chapters, start=1):
+                end = start + round(seconds * 1000)
+                f.write("[CHAPTER]\nTIMEBASE=1/1000\n")
+                f.write(f"START={start}\nEND={end}\n")
+                f.write(f"title={_ffmetadata_escape(title or f'Chapter {number}')}\n")
+                start = end
+
+    options = {"c": "copy", "id3v2_version": 3}
+    if marked:
+        options["map_metadata"] = 1
+    args = (
+        ffmpeg.input(list_path, f="concat", safe=0)
+        .output(out_path, **options)
+        .overwrite_output()
+        .compile()
+    )
+    if marked:
+        # ffmpeg-python can't add an input without streams, as the
+        # chapters file is, so add it after the concat list
+        position = args.index(list_path) + 1
+        args[position:position] = ["-i", meta_path]
+    try:
+        subprocess.run(args, check=True, capture_output=True)
+    finally:
+        os.remove(list_path)
+        if marked:
+            os.remove(meta_path)
+    return out_path
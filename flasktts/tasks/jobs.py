@@ -0,0 +1,1270 @@
+import base64
+import json
+import sqlite3
+import time
+from typing import Callable, Iterable, Optional
+
+from huey.storage import RedisStorage
+
+PENDING = "PENDING"
+COMPLETED = "COMPLETED"
+FAILED = "FAILED"
+RUNNING = "RUNNING"
+# Finished jobs, their output is kept until the retention manager evicts it
+FINISHED = (COMPLETED, FAILED)
+
+# Columns returned when listing jobs
+JOB_FIELDS = (
+    "job_id",
+    "status",
+    "model",
+    "voice",
+    "characters",
+    "audio_seconds",
+    "output_bytes",
+    "peak_memory",
+    "created_at",
+    "updated_at",
+    "parent_id",
+)
+
+# Weight of the newest job in the per model and voice moving averages of
+# speech rate and RTF, the first jobs are averaged evenly until it is reached
+RATE_SMOOTHING = 0.1
+
+
+def gpu_lock_name(worker_name: str) -> str:
+    """Name of the lock serializing jobs on one worker's device."""
+    return f"gpu-lock-{worker_name}" if worker_name else "gpu-lock"
+
+
+def running_key(worker_name: str) -> str:
+    """Key under which a worker records the id of the job it is running."""
+    return f"{gpu_lock_name(worker_name)}-running"
+
+
+def _prepare_enqueue(huey, task) -> bytes:
+    """Do what ``Huey.enqueue`` does to a task before storing it."""
+    if task.expires:
+        task.resolve_expires(huey.utc)
+    return huey.serialize_task(task)
+
+
+def _enqueue_one_by_one(
+    index, huey, jobs: Iterable[tuple], client: Optional[str]
+) -> list[str]:
+    """Enqueue through ``huey.enqueue``, used in immediate mode where tasks
+    run inline instead of being stored."""
+    job_ids = []
+    for task, model, voice, characters in jobs:
+        index.add(task.id, model, voice, characters, client)
+        huey.enqueue(task)
+        job_ids.append(task.id)
+    return job_ids
+
+
+def _enqueue_document_one_by_one(index, huey, document_id, jobs, titles, client):
+    """Immediate mode flavour of ``enqueue_document``. The document is
+    indexed first, its chapters may finish before this returns."""
+    jobs = list(jobs)
+    index.add_document(document_id, jobs, client)
+    job_ids = []
+    for number, ((task, model, voice, characters), title) in enumerate(
+        zip(jobs, titles)
+    ):
+        index.add(task.id, model, voice, characters, client)
+        index.set_chapter(task.id, document_id, number, title)
+        huey.enqueue(task)
+        job_ids.append(task.id)
+    return job_ids
+
+
+def _encode_cursor(created_at: float, job_id: str) -> str:
+    raw = f"{created_at!r}|{job_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> tuple[float, str]:
+    """Decode a listing cursor, raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, job_id = raw.split("|", 1)
+        return float(created_at), job_id
+    except (UnicodeError, TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor}") from exc
+
+
+def create_job_index(storage):
+    """Create the job index matching the storage backend of the Huey instance."""
+    if isinstance(storage, RedisStorage):
+        return RedisJobIndex(storage)
+    return SqliteJobIndex(storage)
+
+
+class SqliteJobIndex:
+    """Per-job status index stored next to the Huey queue.
+
+    Huey keeps results in a flat key/value table, so answering "what state is
+    job X in" means scanning and deserializing every stored result. The index
+    keeps one row per TTS job keyed by its id, written when the job is
+    enqueued and updated from the Huey signal handlers.
+    """
+
+    table_jobs = (
+        "create table if not exists jobs ("
+        "job_id text not null primary key, status text not null, "
+        "model text, voice text, created_at real not null, "
+        "updated_at real not null)"
+    )
+    # Columns added after the table was first released, as (name, type)
+    added_columns = [
+        ("characters", "integer"),
+        ("audio_seconds", "real"),
+        ("output_bytes", "integer"),
+        # Chapter jobs of a document: the document and their position in it
+        ("parent_id", "text"),
+        ("chapter", "integer"),
+        ("title", "text"),
+        # Documents: number of chapters and how many of them are finished
+        ("chapters", "integer"),
+        ("chapters_done", "integer"),
+        # Finished jobs: when the output was last used, finished or downloaded
+        ("accessed_at", "real"),
+        # When the job last started running
+        ("started_at", "real"),
+        # Who submitted the job, for per-client admission limits
+        ("client", "text"),
+        # Peak memory of the job's inference in bytes
+        ("peak_memory", "integer"),
+    ]
+    index_created = (
+        "create index if not exists jobs_created on jobs (created_at, job_id)"
+    )
+    index_status = (
+        "create index if not exists jobs_status_created "
+        "on jobs (status, created_at, job_id)"
+    )
+    index_model = (
+        "create index if not exists jobs_model_created "
+        "on jobs (model, created_at, job_id)"
+    )
+    index_parent = "create index if not exists jobs_parent on jobs (parent_id, chapter)"
+    index_accessed = (
+        "create index if not exists jobs_accessed on jobs (accessed_at) "
+        "where accessed_at is not null and parent_id is null"
+    )
+    # Moving averages of the audio seconds per character and the real-time
+    # factor of finished jobs, per model and voice ('' for none)
+    table_rates = (
+        "create table if not exists job_rates ("
+        "model text not null, voice text not null, audio_per_char real not null, "
+        "rtf real not null, samples integer not null, updated_at real not null, "
+        "primary key (model, voice))"
+    )
+    ddl = [table_jobs, table_rates]
+    indexes = [
+        index_created,
+        index_status,
+        index_model,
+        index_parent,
+        index_accessed,
+    ]
+
+    def __init__(self, storage):
+        """
+        Args:
+            storage (SqliteStorage): Storage of the Huey instance, the index
+                lives in the same database so jobs can be enqueued and indexed
+                in one transaction.
+        """
+        self.storage = storage
+        with self.storage.db(commit=True) as curs:
+            for sql in self.ddl:
+                curs.execute(sql)
+            curs.execute("pragma table_info(jobs)")
+            existing = {row[1] for row in curs.fetchall()}
+            for name, column_type in self.added_columns:
+                if name not in existing:
+                    curs.execute(f"alter table jobs add column {name} {column_type}")
+            for sql in self.indexes:
+                curs.execute(sql)
+
+    def _insert_job(
+        self,
+        curs,
+        job_id: str,
+        model: str,
+        voice: Optional[str],
+        characters: Optional[int],
+        client: Optional[str] = None,
+    ):
+        now = time.time()
+        # The worker may already have reported on this job, keep its status.
+        curs.execute(
+            "insert into jobs (job_id, status, model, voice, characters, client, "
+            "created_at, updated_at) values (?, ?, ?, ?, ?, ?, ?, ?) "
+            "on conflict(job_id) do update set model = excluded.model, "
+            "voice = excluded.voice, characters = excluded.characters, "
+            "client = excluded.client",
+            (job_id, PENDING, model, voice, characters, client, now, now),
+        )
+
+    def add(
+        self,
+        job_id: str,
+        model: str,
+        voice: Optional[str] = None,
+        characters: Optional[int] = None,
+        client: Optional[str] = None,
+    ):
+        """Record a job that was enqueued through the regular Huey path."""
+        with self.storage.db(commit=True) as curs:
+            self._insert_job(curs, job_id, model, voice, characters, client)
+
+    def backfill(self, job_id: str, status: str, model: Optional[str] = None):
+        """Index a job that predates the index, existing rows are left alone."""
+        now = time.time()
+        self.storage.sql(
+            "insert or ignore into jobs (job_id, status, model, created_at, "
+            "updated_at) values (?, ?, ?, ?, ?)",
+            (job_id, status, model, now, now),
+            commit=True,
+        )
+
+    def enqueue(
+        self, huey, jobs: Iterable[tuple], client: Optional[str] = None
+    ) -> list[str]:
+        """Enqueue several tasks and index them in a single transaction.
+
+        Args:
+            huey (Huey): Huey instance owning the tasks
+            jobs (Iterable[tuple]): (task, model, voice, characters) tuples,
+                where task is a task signature created with ``some_task.s(...)``
+            client (str, optional): Who submitted the jobs
+
+        Returns:
+            list[str]: Ids of the enqueued jobs, in input order
+        """
+        if huey.immediate:
+            return _enqueue_one_by_one(self, huey, jobs, client)
+
+        job_ids = []
+        with self.storage.db(commit=True) as curs:
+            for task, model, voice, characters in jobs:
+                self._insert_task(curs, huey, task)
+                self._insert_job(curs, task.id, model, voice, characters, client)
+                job_ids.append(task.id)
+        return job_ids
+
+    def _insert_task(self, curs, huey, task):
+        # Same insert as SqliteStorage.enqueue, which can't join our
+        # transaction. Tied to Huey's task table, hence the pinned huey
+        # version in requirements.txt.
+        curs.execute(
+            "insert into task (queue, data, priority) values (?, ?, ?)",
+            (
+                self.storage.name,
+                sqlite3.Binary(_prepare_enqueue(huey, task)),
+                task.priority or 0,
+            ),
+        )
+
+    def _insert_document(
+        self, curs, document_id: str, jobs: list[tuple], client: Optional[str]
+    ):
+        now = time.time()
+        _, model, voice, _ = jobs[0]
+        curs.execute(
+            "insert into jobs (job_id, status, model, voice, characters, client, "
+            "chapters, chapters_done, created_at, updated_at) "
+            "values (?, ?, ?, ?, ?, ?, ?, 0, ?, ?)",
+            (
+                document_id,
+                PENDING,
+                model,
+                voice,
+                sum(characters for *_, characters in jobs),
+                client,
+                len(jobs),
+                now,
+                now,
+            ),
+        )
+
+    def add_document(
+        self, document_id: str, jobs: list[tuple], client: Optional[str] = None
+    ):
+        """Record a document whose chapters are enqueued through the regular
+        Huey path, see ``enqueue_document``."""
+        with self.storage.db(commit=True) as curs:
+            self._insert_document(curs, document_id, jobs, client)
+
+    def _set_chapter(self, curs, job_id, document_id, number, title):
+        curs.execute(
+            "update jobs set parent_id = ?, chapter = ?, title = ? where job_id = ?",
+            (document_id, number, title, job_id),
+        )
+
+    def set_chapter(self, job_id: str, document_id: str, number: int, title: str):
+        """Mark an indexed job as chapter number of a document."""
+        with self.storage.db(commit=True) as curs:
+            self._set_chapter(curs, job_id, document_id, number, title)
+
+    def enqueue_document(
+        self,
+        huey,
+        document_id: str,
+        jobs: Iterable[tuple],
+        titles: list[str],
+        client: Optional[str] = None,
+    ) -> list[str]:
+        """Enqueue the chapter jobs of a document in a single transaction.
+
+        The document itself is indexed as a job without a task until all its
+        chapters are finished, see ``chapter_finished``.
+
+        Args:
+            huey (Huey): Huey instance owning the tasks
+            document_id (str): Id of the document job
+            jobs (Iterable[tuple]): (task, model, voice, characters) per
+                chapter, in reading order, as for ``enqueue``
+            titles (list[str]): Chapter titles
+            client (str, optional): Who submitted the document
+
+        Returns:
+            list[str]: Ids of the chapter jobs, in reading order
+        """
+        if huey.immediate:
+            return _enqueue_document_one_by_one(
+                self, huey, document_id, jobs, titles, client
+            )
+
+        jobs = list(jobs)
+        with self.storage.db(commit=True) as curs:
+            # One transaction, a chapter must not finish before it is known
+            # to be one
+            self._insert_document(curs, document_id, jobs, client)
+            for number, ((task, model, voice, characters), title) in enumerate(
+                zip(jobs, titles)
+            ):
+                self._insert_task(curs, huey, task)
+                self._insert_job(curs, task.id, model, voice, characters, client)
+                self._set_chapter(curs, task.id, document_id, number, title)
+        return [task.id for task, *_ in jobs]
+
+    def claim(self, huey, match: Callable, limit: int, scan: int = 64) -> list:
+        """Take queued tasks off the queue, to run them in the current task.
+
+        Looks at the next scan tasks in dequeue order and removes up to limit
+        of those match accepts. Removal is atomic, a task another worker
+        dequeued first is not returned.
+
+        Returns:
+            list: The claimed tasks, in queue order
+        """
+        claimed = []
+        with self.storage.db(commit=True) as curs:
+            # Same order as SqliteStorage.dequeue
+            curs.execute(
+                "select id, data from task where queue = ? "
+                "order by priority desc, id limit ?",
+                (self.storage.name, scan),
+            )
+            for row_id, data in curs.fetchall():
+                if len(claimed) >= limit:
+                    break
+                task = huey.deserialize_task(data)
+                if not match(task):
+                    continue
+                curs.execute("delete from task where id = ?", (row_id,))
+                if curs.rowcount:
+                    claimed.append(task)
+        return claimed
+
+    def parent_of(self, job_id: str) -> Optional[str]:
+        """Id of the document a chapter job belongs to, None for other jobs."""
+        rows = self.storage.sql(
+            "select parent_id from jobs where job_id = ?", (job_id,), results=True
+        )
+        return rows[0][0] if rows else None
+
+    def chapter_finished(self, document_id: str) -> bool:
+        """Count one more finished chapter of a document.
+
+        Returns:
+            bool: True for the call that finishes the last chapter, exactly once
+        """
+        with self.storage.db(commit=True) as curs:
+            curs.execute(
+                "update jobs set chapters_done = chapters_done + 1 where job_id = ?",
+                (document_id,),
+            )
+            curs.execute(
+                "select chapters_done, chapters from jobs where job_id = ?",
+                (document_id,),
+            )
+            row = curs.fetchone()
+        return row is not None and row[0] == row[1]
+
+    def document(self, document_id: str) -> Optional[dict]:
+        """A document job with its chapter jobs in reading order.
+
+        Returns:
+            dict: Job fields plus chapters, chapters_done and chapter_jobs,
+            None if there is no such document
+        """
+        rows = self.storage.sql(
+            f"select {', '.join(JOB_FIELDS)}, chapters, chapters_done "
+            "from jobs where job_id = ? and chapters is not null",
+            (document_id,),
+            results=True,
+        )
+        if not rows:
+            return None
+        document = dict(zip(JOB_FIELDS + ("chapters", "chapters_done"), rows[0]))
+        fields = JOB_FIELDS + ("title",)
+        rows = self.storage.sql(
+            f"select {', '.join(fields)} from jobs where parent_id = ? "
+            "order by chapter",
+            (document_id,),
+            results=True,
+        )
+        document["chapter_jobs"] = [dict(zip(fields, row)) for row in rows]
+        return document
+
+    def set_status(self, job_id: str, status: str, unless: Optional[str] = None):
+        """Update (or create) the status row of a job.
+
+        Args:
+            unless (str, optional): Leave a job in this status alone
+        """
+        now = time.time()
+        accessed_at = now if status in FINISHED else None
+        started_at = now if status == RUNNING else None
+        self.storage.sql(
+            "insert into jobs (job_id, status, created_at, updated_at, accessed_at, "
+            "started_at) values (?, ?, ?, ?, ?, ?) on conflict(job_id) do update set "
+            "status = excluded.status, updated_at = excluded.updated_at, "
+            "accessed_at = coalesce(excluded.accessed_at, jobs.accessed_at), "
+            "started_at = coalesce(excluded.started_at, jobs.started_at) "
+            "where jobs.status is not ?",
+            (job_id, status, now, now, accessed_at, started_at, unless),
+            commit=True,
+        )
+
+    def touch(self, job_id: str):
+        """Record a use (download) of a finished job's output."""
+        self.storage.sql(
+            "update jobs set accessed_at = ? where job_id = ? "
+            "and accessed_at is not null",
+            (time.time(), job_id),
+            commit=True,
+        )
+
+    def stored_bytes(self) -> int:
+        """Total size of the output of all indexed jobs."""
+        ((total,),) = self.storage.sql(
+            "select coalesce(sum(output_bytes), 0) from jobs", results=True
+        )
+        return total
+
+    def least_recently_used(self, limit: int) -> list[dict]:
+        """Finished jobs, least recently used first, documents with their
+        chapters and chapters not on their own.
+
+        Returns:
+            list[dict]: job_id, accessed_at and output_bytes, which for a
+            document includes its chapters
+        """
+        rows = self.storage.sql(
+            "select job_id, accessed_at, coalesce(output_bytes, 0) + coalesce("
+            "(select sum(c.output_bytes) from jobs c where c.parent_id = jobs.job_id)"
+            ", 0) from jobs where accessed_at is not null and parent_id is null "
+            "order by accessed_at limit ?",
+            (limit,),
+            results=True,
+        )
+        return [
+            dict(zip(("job_id", "accessed_at", "output_bytes"), row)) for row in rows
+        ]
+
+    def set_output(
+        self,
+        job_id: str,
+        audio_seconds: Optional[float],
+        output_bytes: int,
+        peak_memory: Optional[int] = None,
+    ):
+        """Record the size of a finished job's audio and the peak memory of
+        its inference, audio_seconds and peak_memory may be unknown."""
+        self.storage.sql(
+            "update jobs set audio_seconds = ?, output_bytes = ?, peak_memory = ? "
+            "where job_id = ?",
+            (audio_seconds, output_bytes, peak_memory, job_id),
+            commit=True,
+        )
+
+    def record_rate(self, job_id: str, compute_seconds: float):
+        """Fold a finished job's speech rate and RTF into the averages of its
+        model and voice. Jobs without text or audio length are skipped.
+
+        Args:
+            compute_seconds (float): Time the worker spent on the job
+        """
+        self.storage.sql(
+            "insert into job_rates (model, voice, audio_per_char, rtf, samples, "
+            "updated_at) select model, coalesce(voice, ''), "
+            "audio_seconds / characters, ? / audio_seconds, 1, ? from jobs "
+            "where job_id = ? and model is not null and characters > 0 "
+            "and audio_seconds > 0 and chapters is null "
+            "on conflict(model, voice) do update set "
+            "audio_per_char = audio_per_char + max(1.0 / (samples + 1), ?) "
+            "* (excluded.audio_per_char - audio_per_char), "
+            "rtf = rtf + max(1.0 / (samples + 1), ?) * (excluded.rtf - rtf), "
+            "samples = samples + 1, updated_at = excluded.updated_at",
+            (compute_seconds, time.time(), job_id, RATE_SMOOTHING, RATE_SMOOTHING),
+            commit=True,
+        )
+
+    def rates(self) -> dict[tuple, dict]:
+        """Speech rate and RTF averages of every model and voice.
+
+        Returns:
+            dict[tuple, dict]: (model, voice) -> audio_per_char, rtf and
+            samples, voice is None for models without voices
+        """
+        rows = self.storage.sql(
+            "select model, voice, audio_per_char, rtf, samples from job_rates",
+            results=True,
+        )
+        return {
+            (model, voice or None): {
+                "audio_per_char": audio_per_char,
+                "rtf": rtf,
+                "samples": samples,
+            }
+            for model, voice, audio_per_char, rtf, samples in rows
+        }
+
+    def pending_characters(
+        self, before: Optional[float] = None, client: Optional[str] = None
+    ) -> dict[tuple, int]:
+        """Characters of the pending jobs, per model and voice.
+
+        Args:
+            before (float, optional): Only count jobs created before this
+                UNIX timestamp, those queued ahead of a job
+            client (str, optional): Only count the jobs of this client
+
+        Returns:
+            dict[tuple, int]: (model, voice) -> characters
+        """
+        params = [PENDING]
+        where = ""
+        if before is not None:
+            where += "and created_at < ? "
+            params.append(before)
+        if client is not None:
+            where += "and client = ? "
+            params.append(client)
+        # Documents are counted through their chapters
+        rows = self.storage.sql(
+            "select model, voice, sum(characters) from jobs where status = ? "
+            f"{where}and chapters is null group by model, voice",
+            params,
+            results=True,
+        )
+        return {(model, voice): characters or 0 for model, voice, characters in rows}
+
+    def running_jobs(self, client: Optional[str] = None) -> list[dict]:
+        """Running jobs with their model, voice, characters and started_at,
+        only those of client if given."""
+        fields = ("job_id", "model", "voice", "characters", "started_at")
+        params = [RUNNING]
+        where = ""
+        if client is not None:
+            where = "and client = ? "
+            params.append(client)
+        rows = self.storage.sql(
+            f"select {', '.join(fields)} from jobs where status = ? "
+            f"{where}and chapters is null",
+            params,
+            results=True,
+        )
+        return [dict(zip(fields, row)) for row in rows]
+
+    def job(self, job_id: str) -> Optional[dict]:
+        """A job's fields plus started_at and chapters, None if not indexed."""
+        fields = JOB_FIELDS + ("started_at", "chapters")
+        rows = self.storage.sql(
+            f"select {', '.join(fields)} from jobs where job_id = ?",
+            (job_id,),
+            results=True,
+        )
+        return dict(zip(fields, rows[0])) if rows else None
+
+    def statuses(self, job_ids: list[str]) -> dict[str, str]:
+        """Look up the status of several jobs at once.
+
+        Returns:
+            dict[str, str]: job_id -> status, ids that are not indexed are omitted
+        """
+        if not job_ids:
+            return {}
+        placeholders = ",".join("?" * len(job_ids))
+        rows = self.storage.sql(
+            f"select job_id, status from jobs where job_id in ({placeholders})",
+            list(job_ids),
+            results=True,
+        )
+        return dict(rows)
+
+    def list_jobs(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None,
+        model: Optional[str] = None,
+        created_after: Optional[float] = None,
+    ) -> tuple[list[dict], Optional[str]]:
+        """List jobs newest first, one page at a time.
+
+        Pages are keyed on (created_at, job_id) so each page is a range scan
+        of an index no matter how deep into the listing the client is.
+
+        Args:
+            limit (int): Maximum number of jobs to return
+            cursor (str, optional): Cursor returned with the previous page
+            status (str, optional): Only return jobs with this status
+            model (str, optional): Only return jobs for this model
+            created_after (float, optional): Only return jobs created after this
+                UNIX timestamp
+
+        Returns:
+            tuple[list[dict], Optional[str]]: Jobs and the cursor of the next
+            page, None when this is the last page
+        """
+        clauses, params = [], []
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if model:
+            clauses.append("model = ?")
+            params.append(model)
+        if created_after is not None:
+            clauses.append("created_at > ?")
+            params.append(created_after)
+        if cursor:
+            created_at, job_id = _decode_cursor(cursor)
+            clauses.append("(created_at < ? or (created_at = ? and job_id < ?))")
+            params.extend([created_at, created_at, job_id])
+
+        where = f"where {' and '.join(clauses)}" if clauses else ""
+        rows = self.storage.sql(
+            f"select {', '.join(JOB_FIELDS)} from jobs {where} "
+            "order by created_at desc, job_id desc limit ?",
+            params + [limit + 1],
+            results=True,
+        )
+        page = [dict(zip(JOB_FIELDS, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = page[-1]
+            next_cursor = _encode_cursor(last["created_at"], last["job_id"])
+        return page, next_cursor
+
+    def delete(self, job_id: str):
+        """Delete a job, and the chapter jobs of a document."""
+        self.storage.sql(
+            "delete from jobs where job_id = ? or parent_id = ?",
+            (job_id, job_id),
+            commit=True,
+        )
+
+    def flush(self):
+        self.storage.sql("delete from jobs", commit=True)
+
+
+class RedisJobIndex:
+    """Redis flavour of :class:`SqliteJobIndex` for multi-node deployments.
+
+    Each job is a hash; sorted sets scored by creation time index all jobs,
+    jobs per status and jobs per model, so listings are range reads. The
+    chapters of a document are a sorted set scored by chapter number.
+    Finished top-level jobs are a sorted set scored by last use for the
+    retention manager, next to a running total of the output size. The rate
+    averages are a hash of JSON values keyed by model and voice, outside the
+    job prefix so flushing the jobs keeps them.
+    """
+
+    # Hash values are strings, these are converted back when read
+    int_fields = {
+        "characters",
+        "output_bytes",
+        "peak_memory",
+        "chapters",
+        "chapters_done",
+    }
+    float_fields = {
+        "audio_seconds",
+        "created_at",
+        "updated_at",
+        "accessed_at",
+        "started_at",
+    }
+
+    def __init__(self, storage):
+        """
+        Args:
+            storage (RedisStorage): Storage of the Huey instance
+        """
+        self.storage = storage
+        self.conn = storage.conn
+        self.prefix = f"flasktts.jobs.{storage.name}"
+        self.all_key = f"{self.prefix}.all"
+        self.lru_key = f"{self.prefix}.lru"
+        self.bytes_key = f"{self.prefix}.bytes"
+        self.rates_key = f"flasktts.rates.{storage.name}"
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}.job.{job_id}"
+
+    def _status_key(self, status: str) -> str:
+        return f"{self.prefix}.status.{status}"
+
+    def _model_key(self, model: str) -> str:
+        return f"{self.prefix}.model.{model}"
+
+    def _chapters_key(self, document_id: str) -> str:
+        return f"{self.prefix}.chapters.{document_id}"
+
+    def _queue_job(
+        self, pipe, job_id, status, created_at, model, voice, characters, **extra
+    ):
+        mapping = {
+            "status": status,
+            "created_at": created_at,
+            "updated_at": time.time(),
+        }
+        for name, value in (
+            ("model", model),
+            ("voice", voice),
+            ("characters", characters),
+            *extra.items(),
+        ):
+            if value is not None:
+                mapping[name] = value
+        pipe.hset(self._job_key(job_id), mapping=mapping)
+        pipe.zadd(self.all_key, {job_id: created_at})
+        pipe.zadd(self._status_key(status), {job_id: created_at})
+        if model:
+            pipe.zadd(self._model_key(model), {job_id: created_at})
+
+    def _upsert(
+        self,
+        job_id: str,
+        status: Optional[str],
+        overwrite_status: bool,
+        unless: Optional[str] = None,
+        **meta,
+    ):
+        """Create or update a job, atomically moving it between status sets."""
+        key = self._job_key(job_id)
+
+        def update(pipe):
+            old_status, created_at, parent_id = pipe.hmget(
+                key, "status", "created_at", "parent_id"
+            )
+            old_status = old_status.decode() if old_status else None
+            created_at = float(created_at) if created_at else time.time()
+            new_status = status if overwrite_status or not old_status else old_status
+            if old_status is not None and old_status == unless:
+                new_status = old_status
+            pipe.multi()
+            if old_status and old_status != new_status:
+                pipe.zrem(self._status_key(old_status), job_id)
+            if overwrite_status and new_status == status and status in FINISHED:
+                now = time.time()
+                pipe.hset(key, "accessed_at", now)
+                if not parent_id:
+                    pipe.zadd(self.lru_key, {job_id: now})
+            if overwrite_status and new_status == status == RUNNING:
+                pipe.hset(key, "started_at", time.time())
+            self._queue_job(pipe, job_id, new_status, created_at, **meta)
+
+        self.conn.transaction(update, key)
+
+    def add(
+        self,
+        job_id: str,
+        model: str,
+        voice: Optional[str] = None,
+        characters: Optional[int] = None,
+        client: Optional[str] = None,
+    ):
+        """Record a job that was enqueued through the regular Huey path."""
+        self._upsert(
+            job_id,
+            PENDING,
+            False,
+            model=model,
+            voice=voice,
+            characters=characters,
+            client=client,
+        )
+
+    def backfill(self, job_id: str, status: str, model: Optional[str] = None):
+        """Index a job that predates the index, existing jobs are left alone."""
+        self._upsert(job_id, status, False, model=model, voice=None, characters=None)
+
+    def enqueue(
+        self, huey, jobs: Iterable[tuple], client: Optional[str] = None
+    ) -> list[str]:
+        """Enqueue several tasks and index them in a single MULTI/EXEC block.
+
+        See :meth:`SqliteJobIndex.enqueue`.
+        """
+        if huey.immediate:
+            return _enqueue_one_by_one(self, huey, jobs, client)
+
+        job_ids = []
+        now = time.time()
+        with self.conn.pipeline(transaction=True) as pipe:
+            for task, model, voice, characters in jobs:
+                # Same push as RedisStorage.enqueue, inside our MULTI block
+                pipe.lpush(self.storage.queue_key, _prepare_enqueue(huey, task))
+                self._queue_job(
+                    pipe,
+                    task.id,
+                    PENDING,
+                    now,
+                    model,
+                    voice,
+                    characters,
+                    client=client,
+                )
+                job_ids.append(task.id)
+            pipe.execute()
+        return job_ids
+
+    def _queue_document(
+        self,
+        pipe,
+        document_id: str,
+        jobs: list[tuple],
+        now: float,
+        client: Optional[str],
+    ):
+        _, model, voice, _ = jobs[0]
+        characters = sum(characters for *_, characters in jobs)
+        self._queue_job(
+            pipe,
+            document_id,
+            PENDING,
+            now,
+            model,
+            voice,
+            characters,
+            chapters=len(jobs),
+            chapters_done=0,
+            client=client,
+        )
+
+    def _queue_chapter(self, pipe, job_id, document_id, number, title):
+        pipe.hset(
+            self._job_key(job_id),
+            mapping={"parent_id": document_id, "chapter": number, "title": title},
+        )
+        pipe.zadd(self._chapters_key(document_id), {job_id: number})
+
+    def add_document(
+        self, document_id: str, jobs: list[tuple], client: Optional[str] = None
+    ):
+        """Record a document whose chapters are enqueued through the regular
+        Huey path, see :meth:`SqliteJobIndex.enqueue_document`."""
+        with self.conn.pipeline(transaction=True) as pipe:
+            self._queue_document(pipe, document_id, jobs, time.time(), client)
+            pipe.execute()
+
+    def set_chapter(self, job_id: str, document_id: str, number: int, title: str):
+        """Mark an indexed job as chapter number of a document."""
+        with self.conn.pipeline(transaction=True) as pipe:
+            self._queue_chapter(pipe, job_id, document_id, number, title)
+            pipe.execute()
+
+    def enqueue_document(
+        self,
+        huey,
+        document_id: str,
+        jobs: Iterable[tuple],
+        titles: list[str],
+        client: Optional[str] = None,
+    ) -> list[str]:
+        """Enqueue the chapter jobs of a document in a single MULTI/EXEC block.
+
+        See :meth:`SqliteJobIndex.enqueue_document`.
+        """
+        if huey.immediate:
+            return _enqueue_document_one_by_one(
+                self, huey, document_id, jobs, titles, client
+            )
+
+        jobs = list(jobs)
+        now = time.time()
+        with self.conn.pipeline(transaction=True) as pipe:
+            self._queue_document(pipe, document_id, jobs, now, client)
+            for number, ((task, model, voice, characters), title) in enumerate(
+                zip(jobs, titles)
+            ):
+                pipe.lpush(self.storage.queue_key, _prepare_enqueue(huey, task))
+                self._queue_job(
+                    pipe,
+                    task.id,
+                    PENDING,
+                    now,
+                    model,
+                    voice,
+                    characters,
+                    client=client,
+                )
+                self._queue_chapter(pipe, task.id, document_id, number, title)
+            pipe.execute()
+        return [task.id for task, *_ in jobs]
+
+    def claim(self, huey, match: Callable, limit: int, scan: int = 64) -> list:
+        """Take queued tasks off the queue, see :meth:`SqliteJobIndex.claim`."""
+        claimed = []
+        # RedisStorage pushes on the left and pops on the right
+        for data in reversed(self.conn.lrange(self.storage.queue_key, -scan, -1)):
+            if len(claimed) >= limit:
+                break
+            task = huey.deserialize_task(data)
+            if match(task) and self.conn.lrem(self.storage.queue_key, -1, data):
+                claimed.append(task)
+        return claimed
+
+    def parent_of(self, job_id: str) -> Optional[str]:
+        """Id of the document a chapter job belongs to, None for other jobs."""
+        parent_id = self.conn.hget(self._job_key(job_id), "parent_id")
+        return parent_id.decode() if parent_id else None
+
+    def chapter_finished(self, document_id: str) -> bool:
+        """Count one more finished chapter of a document.
+
+        Returns:
+            bool: True for the call that finishes the last chapter, exactly once
+        """
+        key = self._job_key(document_id)
+        with self.conn.pipeline(transaction=True) as pipe:
+            pipe.hincrby(key, "chapters_done", 1)
+            pipe.hget(key, "chapters")
+            done, chapters = pipe.execute()
+        return chapters is not None and done == int(chapters)
+
+    def document(self, document_id: str) -> Optional[dict]:
+        """A document job with its chapter jobs in reading order.
+
+        See :meth:`SqliteJobIndex.document`.
+        """
+        (document,) = self._read_jobs([document_id], ("chapters", "chapters_done"))
+        if document["chapters"] is None:
+            return None
+        chapter_ids = [
+            job_id.decode()
+            for job_id in self.conn.zrange(self._chapters_key(document_id), 0, -1)
+        ]
+        document["chapter_jobs"] = self._read_jobs(chapter_ids, ("title",))
+        return document
+
+    def set_status(self, job_id: str, status: str, unless: Optional[str] = None):
+        """Update (or create) the status of a job.
+
+        Args:
+            unless (str, optional): Leave a job in this status alone
+        """
+        self._upsert(
+            job_id, status, True, unless, model=None, voice=None, characters=None
+        )
+
+    def set_output(
+        self,
+        job_id: str,
+        audio_seconds: Optional[float],
+        output_bytes: int,
+        peak_memory: Optional[int] = None,
+    ):
+        """Record the size of a finished job's audio and the peak memory of
+        its inference, audio_seconds and peak_memory may be unknown."""
+        key = self._job_key(job_id)
+
+        def update(pipe):
+            if not pipe.exists(key):
+                return
+            old_bytes = int(pipe.hget(key, "output_bytes") or 0)
+            output = {
+                "audio_seconds": audio_seconds,
+                "output_bytes": output_bytes,
+                "peak_memory": peak_memory,
+            }
+            pipe.multi()
+            pipe.hset(key, mapping={k: v for k, v in output.items() if v is not None})
+            pipe.incrby(self.bytes_key, output_bytes - old_bytes)
+
+        self.conn.transaction(update, key)
+
+    def touch(self, job_id: str):
+        """Record a use (download) of a finished job's output."""
+        now = time.time()
+        if self.conn.zadd(self.lru_key, {job_id: now}, xx=True, ch=True):
+            self.conn.hset(self._job_key(job_id), "accessed_at", now)
+
+    def stored_bytes(self) -> int:
+        """Total size of the output of all indexed jobs."""
+        return int(self.conn.get(self.bytes_key) or 0)
+
+    def least_recently_used(self, limit: int) -> list[dict]:
+        """Finished jobs, least recently used first.
+
+        See :meth:`SqliteJobIndex.least_recently_used`.
+        """
+        members = self.conn.zrange(self.lru_key, 0, limit - 1, withscores=True)
+        job_ids = [member.decode() for member, _ in members]
+        with self.conn.pipeline(transaction=False) as pipe:
+            for job_id in job_ids:
+                pipe.zrange(self._chapters_key(job_id), 0, -1)
+            chapters = pipe.execute()
+        with self.conn.pipeline(transaction=False) as pipe:
+            for job_id, chapter_ids in zip(job_ids, chapters):
+                for member in [job_id.encode(), *chapter_ids]:
+                    pipe.hget(self._job_key(member.decode()), "output_bytes")
+            sizes = iter(pipe.execute())
+        return [
+            {
+                "job_id": job_id,
+                "accessed_at": accessed_at,
+                "output_bytes": sum(
+                    int(next(sizes) or 0) for _ in range(1 + len(chapter_ids))
+                ),
+            }
+            for job_id, (_, accessed_at), chapter_ids in zip(job_ids, members, chapters)
+        ]
+
+    def record_rate(self, job_id: str, compute_seconds: float):
+        """Fold a finished job's speech rate and RTF into the averages of its
+        model and voice, see :meth:`SqliteJobIndex.record_rate`."""
+        model, voice, characters, audio_seconds, chapters = self.conn.hmget(
+            self._job_key(job_id),
+            "model",
+            "voice",
+            "characters",
+            "audio_seconds",
+            "chapters",
+        )
+        if not model or not characters or not audio_seconds or chapters:
+            return
+        audio_seconds = float(audio_seconds)
+        if audio_seconds <= 0 or int(characters) <= 0:
+            return
+        field = f"{model.decode()}|{voice.decode() if voice else ''}"
+        audio_per_char = audio_seconds / int(characters)
+        rtf = compute_seconds / audio_seconds
+
+        def update(pipe):
+            old = pipe.hget(self.rates_key, field)
+            rate = json.loads(old) if old else None
+            if rate is None:
+                rate = {"audio_per_char": audio_per_char, "rtf": rtf, "samples": 1}
+            else:
+                weight = max(1 / (rate["samples"] + 1), RATE_SMOOTHING)
+                rate["audio_per_char"] += weight * (
+                    audio_per_char - rate["audio_per_char"]
+                )
+                rate["rtf"] += weight * (rtf - rate["rtf"])
+                rate["samples"] += 1
+            pipe.multi()
+            pipe.hset(self.rates_key, field, json.dumps(rate))
+
+        self.conn.transaction(update, self.rates_key)
+
+    def rates(self) -> dict[tuple, dict]:
+        """Speech rate and RTF averages, see :meth:`SqliteJobIndex.rates`."""
+        rates = {}
+        for field, value in self.conn.hgetall(self.rates_key).items():
+            model, voice = field.decode().split("|", 1)
+            rates[(model, voice or None)] = json.loads(value)
+        return rates
+
+    def _read_fields(self, job_ids: list, fields: tuple) -> list[tuple]:
+        with self.conn.pipeline(transaction=False) as pipe:
+            for job_id in job_ids:
+                pipe.hmget(self._job_key(job_id), *fields)
+            rows = pipe.execute()
+        return [
+            tuple(value.decode() if value is not None else None for value in row)
+            for row in rows
+        ]
+
+    def pending_characters(
+        self, before: Optional[float] = None, client: Optional[str] = None
+    ) -> dict[tuple, int]:
+        """Characters of the pending jobs per model and voice, see
+        :meth:`SqliteJobIndex.pending_characters`.
+
+        Reads every job ahead in one round trip.
+        """
+        job_ids = self.conn.zrangebyscore(
+            self._status_key(PENDING),
+            "-inf",
+            f"({before!r}" if before is not None else "+inf",
+        )
+        characters = {}
+        for model, voice, count, chapters, owner in self._read_fields(
+            [job_id.decode() for job_id in job_ids],
+            ("model", "voice", "characters", "chapters", "client"),
+        ):
+            if chapters is None and (client is None or owner == client):
+                key = (model, voice)
+                characters[key] = characters.get(key, 0) + int(count or 0)
+        return characters
+
+    def running_jobs(self, client: Optional[str] = None) -> list[dict]:
+        """Running jobs, see :meth:`SqliteJobIndex.running_jobs`."""
+        job_ids = [
+            job_id.decode()
+            for job_id in self.conn.zrange(self._status_key(RUNNING), 0, -1)
+        ]
+        jobs = []
+        for job_id, (model, voice, characters, started_at, chapters, owner) in zip(
+            job_ids,
+            self._read_fields(
+                job_ids,
+                ("model", "voice", "characters", "started_at", "chapters", "client"),
+            ),
+        ):
+            if chapters is None and (client is None or owner == client):
+                jobs.append(
+                    {
+                        "job_id": job_id,
+                        "model": model,
+                        "voice": voice,
+                        "characters": int(characters) if characters else None,
+                        "started_at": float(started_at) if started_at else None,
+                    }
+                )
+        return jobs
+
+    def job(self, job_id: str) -> Optional[dict]:
+        """A job's fields plus started_at and chapters, None if not indexed."""
+        (job,) = self._read_jobs([job_id], ("started_at", "chapters"))
+        return job if job["status"] is not None else None
+
+    def statuses(self, job_ids: list[str]) -> dict[str, str]:
+        """Look up the status of several jobs in one round trip."""
+        with self.conn.pipeline(transaction=False) as pipe:
+            for job_id in job_ids:
+                pipe.hget(self._job_key(job_id), "status")
+            found = pipe.execute()
+        return {
+            job_id: status.decode()
+            for job_id, status in zip(job_ids, found)
+            if status is not None
+        }
+
+    def _read_jobs(self, job_ids: list[str], extra: tuple = ()) -> list[dict]:
+        with self.conn.pipeline(transaction=False) as pipe:
+            for job_id in job_ids:
+                pipe.hgetall(self._job_key(job_id))
+            rows = pipe.execute()
+        jobs = []
+        for job_id, row in zip(job_ids, rows):
+            row = {k.decode(): v.decode() for k, v in row.items()}
+            job = {field: row.get(field) for field in JOB_FIELDS + extra}
+            job["job_id"] = job_id
+            for field, value in job.items():
+                if value is not None and field in self.int_fields:
+                    job[field] = int(value)
+                elif value is not None and field in self.float_fields:
+                    job[field] = float(value)
+            jobs.append(job)
+        return jobs
+
+    def list_jobs(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None,
+        model: Optional[str] = None,
+        created_after: Optional[float] = None,
+    ) -> tuple[list[dict], Optional[str]]:
+        """List jobs newest first, one page at a time.
+
+        See :meth:`SqliteJobIndex.list_jobs`. When filtering on both status and
+        model the status set is walked and the model checked per job.
+        """
+        if status:
+            key = self._status_key(status)
+        elif model:
+            key = self._model_key(model)
+        else:
+            key = self.all_key
+        check_model = bool(status and model)
+
+        max_score, after_id = "+inf", None
+        if cursor:
+            max_score, after_id = _decode_cursor(cursor)
+        min_score = f"({created_after}" if created_after is not None else "-inf"
+
+        selected: list[dict] = []
+        offset, batch = 0, max(limit + 1, 100)
+        while len(selected) <= limit:
+            members = self.conn.zrevrangebyscore(
+                key, max_score, min_score, start=offset, num=batch, withscores=True
+            )
+            if not members:
+                break
+            offset += len(members)
+            candidates = [
+                member.decode()
+                for member, score in members
+                if after_id is None or score < max_score or member.decode() < after_id
+            ]
+            for job in self._read_jobs(candidates):
+                if check_model and job["model"] != model:
+                    continue
+                selected.append(job)
+
+        page = selected[:limit]
+        next_cursor = None
+        if len(selected) > limit:
+            last = page[-1]
+            next_cursor = _encode_cursor(last["created_at"], last["job_id"])
+        return page, next_cursor
+
+    def delete(self, job_id: str):
+        """Delete a job, and the chapter jobs of a document."""
+        chapters_key = self._chapters_key(job_id)
+        job_ids = [job_id] + [
+            chapter_id.decode() for chapter_id in self.conn.zrange(chapters_key, 0, -1)
+        ]
+        with self.conn.pipeline(transaction=False) as pipe:
+            for job_id in job_ids:
+                pipe.hmget(self._job_key(job_id), "status", "model", "output_bytes")
+            found = pipe.execute()
+        with self.conn.pipeline(transaction=True) as pipe:
+            for job_id, (status, model, output_bytes) in zip(job_ids, found):
+                pipe.delete(self._job_key(job_id))
+                pipe.zrem(self.all_key, job_id)
+                pipe.zrem(self.lru_key, job_id)
+                if output_bytes:
+                    pipe.decrby(self.bytes_key, int(output_bytes))
+                if status:
+                    pipe.zrem(self._status_key(status.decode()), job_id)
+                if model:
+                    pipe.zrem(self._model_key(model.decode()), job_id)
+            pipe.delete(chapters_key)
+            pipe.execute()
+
+    def flush(self):
+        keys = list(self.conn.scan_iter(match=f"{self.prefix}.*"))
+        if keys:
+            self.conn.delete(*keys)
@@ -1,24 +1,101 @@
-import gc
+import inspect
 import json
 import os
-
-import torch
-from huey.signals import SIGNAL_COMPLETE, SIGNAL_ERROR
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from huey import crontab
+from huey.signals import (
+    SIGNAL_COMPLETE,
+    SIGNAL_ERROR,
+    SIGNAL_EXECUTING,
+    SIGNAL_LOCKED,
+)
 from huey.utils import Error
 
-from flasktts.app import huey, mqtt_client
+from flasktts.app import artifacts, huey, jobs, mqtt_client
 from flasktts.config import Config
-from flasktts.tasks.ffmpeg import convert_wav_dir_to_mp3, convert_wav_to_mp3
+from flasktts.tasks.artifacts import TIMESTAMPS_SUFFIX, timestamps_key
+from flasktts.tasks.ffmpeg import (
+    Mp3Encoder,
+    concat_mp3_with_chapters,
+    convert_wav_dir_to_mp3,
+    convert_wav_to_mp3,
+    probe_duration,
+)
+from flasktts.tasks.jobs import (
+    COMPLETED,
+    FAILED,
+    PENDING,
+    RUNNING,
+    running_key,
+)
+from flasktts.tts import memory
 from flasktts.tts.kokorotts import KokoroTTSHighlander
 from flasktts.tts.qwen3tts import Qwen3TTSHighlander
 from flasktts.tts.style2tts import Style2TTSHighlander
+from flasktts.tts.timestamps import Timeline
+
+# Each worker records the jobs its threads are running under its own key
+RUNNING_KEY = running_key(Config.WORKER_NAME)
+_running = set()
+_running_lock = threading.Lock()
+# Every worker thread calls the startup hook, only the first one recovers
+_started = False
+_startup_lock = threading.Lock()
+
+
+@contextmanager
+def _running_jobs(*task_ids: str):
+    """Record task_ids as running on this worker for the duration.
+
+    Worker threads share the key, it holds the sorted ids of all the jobs
+    running on the worker and is removed when none are.
+    """
+    with _running_lock:
+        _running.update(task_ids)
+        huey.put(RUNNING_KEY, sorted(_running))
+    try:
+        yield
+    finally:
+        with _running_lock:
+            _running.difference_update(task_ids)
+            if _running:
+                huey.put(RUNNING_KEY, sorted(_running))
+            else:
+                huey.get(RUNNING_KEY, peek=False)
+
+
+def _output_mp3(task_id: str) -> str:
+    """Where a job's MP3 is encoded, next to the engines' output"""
+    return os.path.join(Config.TTS_WORKDIR, f"{task_id}.mp3")
 
 
-def _free_memory():
-    """Release PyTorch cached memory back to the OS."""
-    gc.collect()
-    if torch.cuda.is_available():
-        torch.cuda.empty_cache()
+def _output_timestamps(task_id: str) -> str:
+    """Where a job's timestamp index is saved, next to its MP3"""
+    return os.path.join(Config.TTS_WORKDIR, f"{task_id}{TIMESTAMPS_SUFFIX}")
+
+
+def _store_output(
+    task_id: str, output_mp3: str, peak_memory: Optional[int] = None
+) -> str:
+    """Record the audio length and size of a finished job, and the peak
+    memory of its inference, and hand the file to the artifact store with
+    its timestamp index if it has one. The index goes first, so it is there
+    once the job is.
+
+    Returns:
+        str: Artifact key of the output, the task result
+    """
+    jobs.set_output(
+        task_id, probe_duration(output_mp3), os.path.getsize(output_mp3), peak_memory
+    )
+    if os.path.isfile(_output_timestamps(task_id)):
+        artifacts.put(_output_timestamps(task_id))
+    return artifacts.put(output_mp3)
 
 
 def get_tasks_pending_failed_complete_running() -> tuple[
@@ -43,136 +120,483 @@ def get_tasks_pending_failed_complete_running() -> tuple[
             failed.append(id)
         elif isinstance(result, str) and "gpu-lock" not in id:
             completed.append(id)
-        elif id == "gpu-lock-running":
-            running.append(result)
+        elif id.startswith("gpu-lock") and id.endswith("-running"):
+            # A list of the jobs a worker runs, a single id from older workers
+            running.extend(result if isinstance(result, list) else [result])
 
     return pending_tasks, failed, completed, running
 
 
 @huey.on_startup()
 def startup():
-    """Huey startup function. Revokes any failed or running tasks and flushes the GPU lock."""
-    huey.flush_locks("gpu-lock")
-    _, failed, _, running = get_tasks_pending_failed_complete_running()
+    """Huey startup function. Revokes any failed tasks and the tasks this node
+    was running.
+
+    Jobs enqueued before the job index existed are added to it. Runs once per
+    process: the other worker threads wait for it, so none of them starts a
+    job that would then be taken for a leftover and revoked."""
+    global _started
+    with _startup_lock:
+        if not _started:
+            _recover()
+            _started = True
+
+
+def _recover():
+    pending, failed, completed, _ = get_tasks_pending_failed_complete_running()
+    running = huey.get(RUNNING_KEY, peek=True) or []
+    if isinstance(running, str):
+        running = [running]
     for task_id in failed + running:
         huey.revoke_by_id(task_id)
         huey.get(task_id, peek=False)
-    huey.get("gpu-lock-running", peek=False)
+        jobs.delete(task_id)
+    for task in pending:
+        if _is_tts_task(task):
+            jobs.backfill(task.id, PENDING, TASK_MODELS[type(task)])
+    for task_id in completed:
+        jobs.backfill(task_id, COMPLETED)
+    huey.get(RUNNING_KEY, peek=False)
 
 
 @huey.task(context=True)
-@huey.lock_task("gpu-lock")
-def style2_tts_task(text: str, task=None):
+def style2_tts_task(text: str, rate: float = 1.0, task=None):
     """Huey task for Style2TTS text-to-speech conversion.
 
     Args:
         text (str): Text to convert to speech
+        rate (float): Speech rate, applied while encoding (default: 1.0)
         task (Huey task): Huey task object, will be passed by Huey (default: None)
 
     """
-    huey.put("gpu-lock-running", task.id)
     try:
-        output_wav = Style2TTSHighlander.get_instance().synth_text(text, task.id)
-        output_mp3 = convert_wav_to_mp3(output_wav)
-        return os.path.abspath(output_mp3)
+        with _running_jobs(task.id):
+            start = time.perf_counter()
+            engine = Style2TTSHighlander.get_instance()
+            timeline = Timeline()
+            # Encoded chunk by chunk while the engine generates the next ones
+            with (
+                memory.job_peak() as peak,
+                Mp3Encoder(_output_mp3(task.id), tempo=rate) as encoder,
+            ):
+                engine.synth_text(text, task.id, writer=encoder, timeline=timeline)
+            timeline.save(_output_timestamps(task.id), tempo=rate)
+            result = _store_output(task.id, encoder.path, peak.bytes)
+            jobs.record_rate(task.id, time.perf_counter() - start)
+            return result
     finally:
-        _free_memory()
-        huey.get("gpu-lock-running", peek=False)
+        memory.release_if_needed()
 
 
 @huey.task(context=True)
-@huey.lock_task("gpu-lock")
-def kokoro_tts_task(text: str, voice: str, task=None):
+def kokoro_tts_task(text: str, voice: str, rate: float = 1.0, task=None):
     """Huey task for Kokoro text-to-speech conversion.
 
     Args:
         text (str): Text to convert to speech
         voice (str): Voice to use for synthesis
+        rate (float): Speech rate, Kokoro's own speed (default: 1.0)
         task (Huey task): Huey task object, will be passed by Huey (default: None)
 
     """
-    huey.put("gpu-lock-running", task.id)
     try:
-        output_wav_dir = KokoroTTSHighlander.get_instance().synth_text(
-            text, task.id, voice
-        )
-        output_mp3 = convert_wav_dir_to_mp3(output_wav_dir)
-        return os.path.abspath(output_mp3)
+        engine = KokoroTTSHighlander.get_instance()
+
+        def synth_one(job):
+            args = _task_arguments(job)
+            timeline = Timeline()
+            with Mp3Encoder(_output_mp3(job.id)) as encoder:
+                engine.synth_text(
+                    args["text"], job.id, args["voice"], args["rate"], encoder, timeline
+                )
+            timeline.save(_output_timestamps(job.id))
+            return encoder.path
+
+        def synth_batch(batch):
+            args = [_task_arguments(job) for job in batch]
+            timelines = [Timeline() for _ in batch]
+            outputs = engine.synth_batch(
+                [a["text"] for a in args],
+                [job.id for job in batch],
+                voice,
+                [a["rate"] for a in args],
+                timelines,
+            )
+            for job, timeline in zip(batch, timelines):
+                timeline.save(_output_timestamps(job.id))
+            return outputs
+
+        def encode(output_wav_dir, job):
+            return convert_wav_dir_to_mp3(output_wav_dir)
+
+        with _running_jobs(task.id):
+            return _run_batch(task, synth_one, synth_batch, encode)
     finally:
-        _free_memory()
-        huey.get("gpu-lock-running", peek=False)
+        memory.release_if_needed()
 
 
 @huey.task(context=True)
-@huey.lock_task("gpu-lock")
-def qwen3_tts_task(text: str, task=None):
+def qwen3_tts_task(text: str, rate: float = 1.0, task=None):
     """Huey task for Qwen3-TTS text-to-speech conversion (voice-cloned).
 
     Args:
         text (str): Text to convert to speech
+        rate (float): Speech rate, applied while encoding (default: 1.0)
         task (Huey task): Huey task object, will be passed by Huey (default: None)
 
     """
-    huey.put("gpu-lock-running", task.id)
     try:
-        output_wav = Qwen3TTSHighlander.get_instance().synth_text(text, task.id)
-        output_mp3 = convert_wav_to_mp3(output_wav)
-        return os.path.abspath(output_mp3)
+        engine = Qwen3TTSHighlander.get_instance()
+
+        def synth_one(job):
+            args = _task_arguments(job)
+            timeline = Timeline()
+            with Mp3Encoder(_output_mp3(job.id), tempo=args["rate"]) as encoder:
+                engine.synth_text(
+                    args["text"], job.id, writer=encoder, timeline=timeline
+                )
+            timeline.save(_output_timestamps(job.id), tempo=args["rate"])
+            return encoder.path
+
+        def synth_batch(batch):
+            args = [_task_arguments(job) for job in batch]
+            timelines = [Timeline() for _ in batch]
+            outputs = engine.synth_batch(
+                [a["text"] for a in args], [job.id for job in batch], timelines
+            )
+            for job, a, timeline in zip(batch, args, timelines):
+                timeline.save(_output_timestamps(job.id), tempo=a["rate"])
+            return outputs
+
+        def encode(output_wav, job):
+            return convert_wav_to_mp3(output_wav, tempo=_task_arguments(job)["rate"])
+
+        with _running_jobs(task.id):
+            return _run_batch(task, synth_one, synth_batch, encode)
     finally:
-        _free_memory()
-        huey.get("gpu-lock-running", peek=False)
+        memory.release_if_needed()
+
+
+def _task_arguments(task) -> dict:
+    """Arguments of a TTS task by name, defaults filled in"""
+    func = BATCHED_TASKS[type(task)].func
+    bound = inspect.signature(func).bind(*task.args, **(task.kwargs or {}))
+    bound.apply_defaults()
+    return bound.arguments
+
+
+def _batchable(task, other) -> bool:
+    """Whether the queued task other can join task's batch: a short job of
+    the same engine and voice that wasn't revoked."""
+    if type(other) is not type(task):
+        return False
+    args, other_args = _task_arguments(task), _task_arguments(other)
+    return (
+        other_args.get("voice") == args.get("voice")
+        and len(other_args["text"]) <= Config.MICROBATCH_MAX_CHARS
+        and not huey.is_revoked(other)
+    )
+
+
+def _claim_companions(task) -> list:
+    """Queued jobs to synthesize in one batch with task.
+
+    Short jobs of the same engine and voice waiting in the queue are taken
+    off it, waiting up to Config.MICROBATCH_WINDOW_MS for more to arrive
+    until the batch holds Config.MICROBATCH_MAX_JOBS.
+    """
+    limit = Config.MICROBATCH_MAX_JOBS - 1
+    if limit < 1 or huey.immediate or not _batchable(task, task):
+        return []
+    deadline = time.monotonic() + Config.MICROBATCH_WINDOW_MS / 1000
+    companions = []
+    while True:
+        companions += jobs.claim(
+            huey, lambda other: _batchable(task, other), limit - len(companions)
+        )
+        remaining = deadline - time.monotonic()
+        if len(companions) >= limit or remaining <= 0:
+            return companions
+        time.sleep(min(remaining, 0.01))
+
+
+def _run_batch(task, synth_one, synth_batch, encode) -> str:
+    """Synthesize task's job, batched with compatible queued jobs.
+
+    The jobs claimed from the queue get their results and signals as Huey
+    would have given them. If the batch itself fails they go back on the
+    queue and task runs alone, so a bad input only fails its own job.
+
+    Args:
+        task (Huey task): The task being executed
+        synth_one (callable): MP3 path of one task, encoded as it is
+            synthesized
+        synth_batch (callable): Engine outputs of a list of tasks
+        encode (callable): MP3 path of an engine output of synth_batch and
+            its task
+
+    Returns:
+        str: Artifact key of task's output, the task result
+    """
+    companions = _claim_companions(task)
+    if not companions:
+        return _run_alone(task, synth_one)
+
+    with _running_jobs(*[companion.id for companion in companions]):
+        return _run_with_companions(task, companions, synth_one, synth_batch, encode)
+
+
+def _run_alone(task, synth_one) -> str:
+    """Synthesize and store a single job, recording its rate"""
+    start = time.perf_counter()
+    with memory.job_peak() as peak:
+        output = synth_one(task)
+    result = _store_output(task.id, output, peak.bytes)
+    jobs.record_rate(task.id, time.perf_counter() - start)
+    return result
+
+
+def _run_with_companions(task, companions, synth_one, synth_batch, encode) -> str:
+    """Batch part of _run_batch, once companions are claimed"""
+    for companion in companions:
+        task_executing(SIGNAL_EXECUTING, companion)
+    start = time.perf_counter()
+    try:
+        with memory.job_peak() as peak:
+            outputs = synth_batch([task] + companions)
+    except Exception as exc:
+        print(f"Batch of {len(companions) + 1} jobs failed, requeueing: {exc}")
+        for companion in companions:
+            jobs.set_status(companion.id, PENDING)
+            huey.enqueue(companion)
+        return _run_alone(task, synth_one)
+
+    stored = []
+    for companion, output in zip(companions, outputs[1:]):
+        try:
+            result = _store_output(companion.id, encode(output, companion), peak.bytes)
+        except Exception as exc:
+            _cleanup_workdir_files(companion.id)
+            error = huey.build_error_result(companion, exc)
+            huey.put_result(companion.id, Error(error))
+            task_error(SIGNAL_ERROR, companion, exc)
+        else:
+            huey.put_result(companion.id, result)
+            task_complete(SIGNAL_COMPLETE, companion)
+            stored.append(companion.id)
+    # The jobs of a batch share its peak
+    result = _store_output(task.id, encode(outputs[0], task), peak.bytes)
+    # Each job of the batch is charged its share of the batch's time
+    seconds = (time.perf_counter() - start) / len(outputs)
+    for job_id in [task.id] + stored:
+        jobs.record_rate(job_id, seconds)
+    return result
+
+
+@huey.task(context=True)
+def stitch_document_task(task=None):
+    """Huey task joining the chapters of a document into one MP3 with chapter
+    markers. Enqueued with the document's id as task id when its last chapter
+    finishes, so the result is found under the document like any job's.
+
+    Args:
+        task (Huey task): Huey task object, will be passed by Huey (default: None)
+
+    """
+    document = jobs.document(task.id)
+    workdir = os.path.join(Config.TTS_WORKDIR, task.id)
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        chapters = []
+        for number, chapter in enumerate(document["chapter_jobs"]):
+            path = os.path.join(workdir, f"{number:05d}.mp3")
+            artifacts.download(huey.get(chapter["job_id"], peek=True), path)
+            seconds = probe_duration(path) or chapter["audio_seconds"]
+            chapters.append((path, chapter["title"], seconds))
+        output_mp3 = concat_mp3_with_chapters(chapters, f"{workdir}.mp3")
+        return _store_output(task.id, output_mp3)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def enqueue_stitch(document_id: str):
+    """Enqueue the stitching of a finished document."""
+    huey.enqueue(stitch_document_task.task_class(id=document_id))
+
+
+TASK_MODELS = {
+    style2_tts_task.task_class: "style2tts",
+    kokoro_tts_task.task_class: "kokoro",
+    qwen3_tts_task.task_class: "qwen3",
+}
+
+
+# Tasks whose short jobs are coalesced into batches
+BATCHED_TASKS = {
+    kokoro_tts_task.task_class: kokoro_tts_task,
+    qwen3_tts_task.task_class: qwen3_tts_task,
+}
+
+
+def _is_tts_task(task) -> bool:
+    return type(task) in TASK_MODELS
+
+
+def _is_indexed_task(task) -> bool:
+    """Tasks with a row in the job index: TTS jobs and document stitching."""
+    return _is_tts_task(task) or isinstance(task, stitch_document_task.task_class)
 
 
 @huey.task()
 def cleanup():
     """Huey task to clean up old task results."""
     _cleanup_workdir_files()
+    artifacts.flush()
     huey.flush()
+    jobs.flush()
 
 
 @huey.task()
 def cleanup_task(task_id: str):
-    """Huey task to clean up a specific task result.
+    """Huey task to clean up a specific task result, and the chapters of a
+    document. Jobs are now evicted by retention_task, this only runs the
+    cleanups scheduled per job by earlier releases.
 
     Args:
         task_id (str): Task ID to clean up
 
     """
-    _cleanup_workdir_files(task_id)
-    huey.get(task_id, peek=False)
+    _cleanup_job(task_id)
+
+
+@huey.periodic_task(crontab(minute=f"*/{Config.RETENTION_INTERVAL_MIN}"))
+@huey.lock_task("retention")
+def retention_task():
+    """Periodic Huey task evicting finished jobs past the retention limits."""
+    evicted = evict_jobs(Config.CLEANUP_TASKS_AFTER_SEC, Config.RETENTION_MAX_BYTES)
+    if evicted:
+        print(f"Retention evicted {evicted} jobs")
+
+
+def evict_jobs(max_age: float, max_bytes: int, batch: int = 100) -> int:
+    """Delete finished jobs, least recently used first, while they were last
+    used (finished or downloaded) more than max_age seconds ago or the stored
+    output exceeds max_bytes.
+
+    Args:
+        max_age (float): Seconds a job is kept after its last use
+        max_bytes (int): Disk quota of the stored output, 0 for none
+        batch (int): Jobs read from the index at a time
+
+    Returns:
+        int: Number of jobs evicted
+    """
+    expire_before = time.time() - max_age
+    stored = jobs.stored_bytes()
+    evicted = 0
+    while True:
+        candidates = jobs.least_recently_used(batch)
+        if not candidates:
+            return evicted
+        for job in candidates:
+            over_quota = max_bytes and stored > max_bytes
+            if job["accessed_at"] >= expire_before and not over_quota:
+                return evicted
+            _cleanup_job(job["job_id"])
+            stored -= job["output_bytes"]
+            evicted += 1
+
+
+def _cleanup_job(job_id: str):
+    """Delete a job's result, artifact, workdir files and index entry, with
+    those of its chapters for a document."""
+    document = jobs.document(job_id)
+    chapter_ids = [c["job_id"] for c in document["chapter_jobs"]] if document else []
+    for task_id in [job_id] + chapter_ids:
+        _cleanup_workdir_files(task_id)
+        result = huey.get(task_id, peek=False)
+        if isinstance(result, str):
+            artifacts.delete(result)
+            artifacts.delete(timestamps_key(result))
+    jobs.delete(job_id)
 
 
 def _cleanup_workdir_files(task_id=None):
-    """Remove generated files from the workdir, optionally filtered by task_id."""
+    """Remove generated files from the workdir, all of them or those of task_id.
+
+    A job only ever writes <id>.wav, <id>.mp3, its timestamp index and the
+    <id>/ directory, so those are removed directly instead of scanning the
+    workdir.
+    """
     workdir = Config.TTS_WORKDIR
     if not os.path.exists(workdir):
         return
-    for entry in os.listdir(workdir):
+    entries = (
+        [f"{task_id}.wav", f"{task_id}.mp3", f"{task_id}{TIMESTAMPS_SUFFIX}", task_id]
+        if task_id
+        else os.listdir(workdir)
+    )
+    for entry in entries:
         path = os.path.join(workdir, entry)
-        if task_id and task_id not in entry:
-            continue
         if os.path.isfile(path):
             os.remove(path)
         elif os.path.isdir(path):
-            for f in os.listdir(path):
-                os.remove(os.path.join(path, f))
-            os.rmdir(path)
+            shutil.rmtree(path)
+
+
+@huey.signal(SIGNAL_EXECUTING)
+def task_executing(signal, task):
+    if _is_indexed_task(task):
+        jobs.set_status(task.id, RUNNING)
+    if _is_tts_task(task):
+        document_id = jobs.parent_of(task.id)
+        if document_id:
+            jobs.set_status(document_id, RUNNING, unless=FAILED)
 
 
 @huey.signal(SIGNAL_COMPLETE)
 def task_complete(signal, task):
     print(f"Task {task.id} completed")
-    cleanup_task.schedule(args=(task.id,), delay=Config.CLEANUP_TASKS_AFTER_SEC)
+    if _is_indexed_task(task):
+        jobs.set_status(task.id, COMPLETED)
+    document_id = jobs.parent_of(task.id) if _is_tts_task(task) else None
+    if document_id and jobs.chapter_finished(document_id):
+        enqueue_stitch(document_id)
 
     if mqtt_client:
         message = json.dumps({"type": "complete", "task_id": task.id})
         mqtt_client.publish(Config.MQTT_TOPIC, message)
 
 
+def _fail_document(document_id: str):
+    """Fail a document when one of its chapters failed, its remaining
+    chapters are not worth synthesizing."""
+    if jobs.statuses([document_id]).get(document_id) == FAILED:
+        return
+    jobs.set_status(document_id, FAILED)
+    for chapter in jobs.document(document_id)["chapter_jobs"]:
+        if chapter["status"] == PENDING:
+            huey.revoke_by_id(chapter["job_id"])
+            jobs.set_status(chapter["job_id"], FAILED)
+
+
+@huey.signal(SIGNAL_LOCKED)
+def task_locked(signal, task):
+    if _is_tts_task(task):
+        jobs.set_status(task.id, FAILED)
+        document_id = jobs.parent_of(task.id)
+        if document_id:
+            _fail_document(document_id)
+
+
 @huey.signal(SIGNAL_ERROR)
 def task_error(signal, task, exc=None):
     print(f"Task {task.id} failed, {exc}")
-    cleanup_task.schedule(args=(task.id,), delay=Config.CLEANUP_TASKS_AFTER_SEC)
+    if _is_indexed_task(task):
+        jobs.set_status(task.id, FAILED)
+    document_id = jobs.parent_of(task.id) if _is_tts_task(task) else None
+    if document_id:
+        _fail_document(document_id)
 
     if mqtt_client:
         message = json.dumps({"type": "error", "task_id": task.id})
@@ -0,0 +1,74 @@
+"""Incremental audio output shared by the engines.
+
+Engines append each chunk's audio to a WavWriter as soon as it is generated
+instead of collecting a whole book in memory, so peak memory is one chunk
+whatever the length of the input.
+"""
+
+from typing import Optional
+
+import numpy as np
+import soundfile as sf
+
+
+class WavWriter:
+    """Append-only 16-bit PCM WAV file.
+
+    The file is opened on the first write when the sample rate is only known
+    once the engine has produced audio.
+    """
+
+    def __init__(self, path: str, sample_rate: Optional[int] = None):
+        """
+        Args:
+            path (str): Output WAV file
+            sample_rate (int, optional): Sample rate, or None to take it from
+                the first write
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.frames = 0
+        self._file: Optional[sf.SoundFile] = None
+
+    def __enter__(self) -> "WavWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def duration(self) -> float:
+        """Seconds of audio written so far"""
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+    def write(self, audio: np.ndarray, sample_rate: Optional[int] = None):
+        """Append float audio in [-1, 1], values outside are clipped
+
+        Raises:
+            ValueError: If sample_rate differs from the file's
+        """
+        if sample_rate is not None:
+            if self.sample_rate is None:
+                self.sample_rate = sample_rate
+            elif sample_rate != self.sample_rate:
+                raise ValueError(
+                    f"Sample rate {sample_rate} does not match {self.sample_rate}"
+                )
+        if self._file is None:
+            if self.sample_rate is None:
+                raise ValueError("Sample rate unknown for the first write")
+            self._open()
+        self._file.write(np.clip(audio, -1.0, 1.0).astype(np.float32, copy=False))
+        self.frames += len(audio)
+
+    def close(self):
+        """Finish the file, writing an empty one if nothing was appended"""
+        if self._file is None and self.sample_rate is not None:
+            self._open()
+        if self._file is not None:
+            self._file.close()
+
+    def _open(self):
+        self._file = sf.SoundFile(
+            self.path, "w", samplerate=self.sample_rate, channels=1, subtype="PCM_16"
+        )
@@ -0,0 +1,70 @@
+import threading
+from typing import Optional
+
+import torch
+
+from flasktts.config import Config
+
+_device_locks: dict = {}
+_device_locks_guard = threading.Lock()
+
+
+def select_device(
+    device: Optional[str] = None, allow_mps: bool = False
+) -> torch.device:
+    """Select the compute device for an engine.
+
+    Honors the TTS_DEVICE env var as an override (e.g. "cpu", "cuda",
+    "cuda:0") for hosts where auto-detection picks the wrong backend —
+    for example an older GPU whose compute capability isn't supported
+    by the installed PyTorch build. The worker launcher also uses it to pin
+    each consumer to its own device.
+
+    Args:
+        device (str, optional): Explicit device, wins over everything else
+        allow_mps (bool): Whether the engine works on Apple MPS
+
+    Returns:
+        torch.device: Device to load the engine on
+    """
+    if device is not None:
+        return torch.device(device)
+    if Config.TTS_DEVICE:
+        return torch.device(Config.TTS_DEVICE)
+    if torch.cuda.is_available():
+        return torch.device("cuda")
+    if allow_mps and torch.backends.mps.is_available():
+        return torch.device("mps")
+    return torch.device("cpu")
+
+
+def worker_devices() -> list[str]:
+    """Devices to start a worker consumer for, from Config.WORKER_DEVICES."""
+    if Config.WORKER_DEVICES != "auto":
+        return [d.strip() for d in Config.WORKER_DEVICES.split(",") if d.strip()]
+    if torch.cuda.is_available():
+        return [f"cuda:{i}" for i in range(torch.cuda.device_count())]
+    return ["cpu"]
+
+
+def device_worker_name(device: str) -> str:
+    """Worker name of the consumer pinned to a device, e.g. "node1-cuda0".
+
+    Config.WORKER_NAME defaults to the host name, so consumers on different
+    hosts never share a GPU lock.
+    """
+    suffix = device.replace(":", "")
+    return f"{Config.WORKER_NAME}-{suffix}" if Config.WORKER_NAME else suffix
+
+
+def device_lock(device) -> threading.Lock:
+    """Lock serializing model inference on a device within this process.
+
+    Worker threads share the loaded engines. A job holds its device's lock
+    only while a model runs, so one job's text processing and encoding
+    overlap another job's inference, and jobs never compete for device
+    memory.
+    """
+    name = str(torch.device(device))
+    with _device_locks_guard:
+        return _device_locks.setdefault(name, threading.Lock())
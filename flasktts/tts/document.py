@@ -0,0 +1,273 @@
+"""Chapter splitting of long documents (Markdown, HTML, EPUB).
+
+A document is cut into chapters at its top two heading levels (EPUB: also at
+every spine document) and reduced to plain text, one paragraph per line, so
+each chapter can be synthesized as a job of its own by any engine. The
+heading is kept as the first line of its chapter so it is read out. A
+heading with no text of its own (e.g. "Part One" right before "Chapter 1") is
+folded into the next chapter rather than becoming an empty one.
+"""
+
+import io
+import os
+import posixpath
+import re
+import zipfile
+from html.parser import HTMLParser
+from typing import List, NamedTuple, Optional
+from urllib.parse import unquote
+from xml.etree import ElementTree
+
+FORMATS = ("markdown", "html", "epub", "text")
+_EXTENSIONS = {
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".html": "html",
+    ".htm": "html",
+    ".xhtml": "html",
+    ".epub": "epub",
+    ".txt": "text",
+}
+
+
+class Chapter(NamedTuple):
+    title: str
+    text: str
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    """Document format from a file name, None if the extension is unknown"""
+    return _EXTENSIONS.get(os.path.splitext(filename or "")[1].lower())
+
+
+def split_chapters(data: bytes, fmt: str) -> List[Chapter]:
+    """Split a document into chapters of plain text
+
+    Args:
+        data (bytes): Document content
+        fmt (str): One of FORMATS
+
+    Raises:
+        ValueError: If the format is unknown or the document can't be read
+
+    Returns:
+        List[Chapter]: Chapters in reading order, none of them empty
+    """
+    if fmt == "epub":
+        return epub_chapters(data)
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError as exc:
+        raise ValueError("Document is not UTF-8 text") from exc
+    if fmt == "markdown":
+        return markdown_chapters(text)
+    if fmt == "html":
+        return html_chapters(text)
+    if fmt == "text":
+        return _fold_sections([("", text.strip())])
+    raise ValueError(f"Unknown document format {fmt!r}, expected one of {FORMATS}")
+
+
+def _fold_sections(sections) -> List[Chapter]:
+    """Chapters from (title, body) sections, folding bodiless headings into
+    the next section and dropping empty ones."""
+    chapters = []
+    carry = []
+    for title, body in sections:
+        title, body = title.strip(), body.strip()
+        if not body:
+            if title:
+                carry.append(title)
+            continue
+        lines = carry + ([title] if title else [])
+        chapters.append(
+            Chapter(title or (carry[0] if carry else ""), "\n".join(lines + [body]))
+        )
+        carry = []
+    if carry and chapters:
+        last = chapters[-1]
+        chapters[-1] = Chapter(last.title, "\n".join([last.text] + carry))
+    elif carry:
+        chapters.append(Chapter(carry[0], "\n".join(carry)))
+    return chapters
+
+
+_MD_HEADING = re.compile(r"^ {0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+_MD_FENCE = re.compile(r"^ {0,3}(```|~~~)")
+_MD_LIST_ITEM = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+_MD_INLINE = [
+    (re.compile(r"<!--.*?-->", re.S), ""),
+    (re.compile(r"!\[[^\]]*\]\([^)]*\)"), ""),  # images
+    (re.compile(r"\[([^\]]*)\]\([^)]*\)"), r"\1"),  # links
+    (re.compile(r"\[([^\]]*)\]\[[^\]]*\]"), r"\1"),  # reference links
+    (re.compile(r"<[^>]+>"), ""),  # inline HTML
+    (re.compile(r"(\*\*|__|\*|_|~~|`)(?=\S)(.+?)(?<=\S)\1"), r"\2"),
+]
+_MD_LINE = [
+    (re.compile(r"^ {0,3}>\s?"), ""),  # block quotes
+    (_MD_LIST_ITEM, ""),
+    (re.compile(r"^\s*\[[^\]]+\]:\s+\S+.*$"), ""),  # link definitions
+    (re.compile(r"^ {0,3}([-*_])(\s*\1){2,}\s*$"), ""),  # rules
+    (re.compile(r"^\s*\|?(\s*:?-+:?\s*\|)+\s*:?-*:?\s*$"), ""),  # table rules
+    (re.compile(r"\s*\|\s*"), " "),  # table cells
+]
+
+
+def _markdown_to_text(line: str) -> str:
+    for pattern, replacement in _MD_LINE:
+        line = pattern.sub(replacement, line)
+    for pattern, replacement in _MD_INLINE:
+        line = pattern.sub(replacement, line)
+    return line.strip()
+
+
+def markdown_chapters(text: str) -> List[Chapter]:
+    """Chapters of a Markdown document, split at # and ## headings.
+
+    Code blocks are dropped, they don't read well.
+    """
+    sections = []
+    title, body = "", []
+    in_code = False
+    for line in text.splitlines():
+        if _MD_FENCE.match(line):
+            in_code = not in_code
+            continue
+        if in_code:
+            continue
+        heading = _MD_HEADING.match(line)
+        if heading and len(heading.group(1)) <= 2:
+            sections.append((title, "\n".join(body)))
+            title, body = _markdown_to_text(heading.group(2)), []
+        elif heading:
+            # Lower level headings are paragraphs of their own
+            body.extend(["", _markdown_to_text(heading.group(2)), ""])
+        else:
+            if _MD_LIST_ITEM.match(line):
+                body.append("")
+            body.append(_markdown_to_text(line))
+    sections.append((title, "\n".join(body)))
+    # Paragraphs are blank line separated, lines within one are joined
+    return _fold_sections(
+        (title, "\n".join(_paragraphs(body))) for title, body in sections
+    )
+
+
+def _paragraphs(text: str) -> List[str]:
+    return [
+        " ".join(paragraph.split())
+        for paragraph in re.split(r"\n\s*\n", text)
+        if paragraph.strip()
+    ]
+
+
+class _HtmlText(HTMLParser):
+    """Collects (title, body) sections of an HTML document."""
+
+    BLOCK = set(
+        "address article aside blockquote br dd div dl dt figcaption figure "
+        "footer h3 h4 h5 h6 header hr li main ol p pre section table td th tr "
+        "ul".split()
+    )
+    SKIP = {"head", "script", "style", "noscript", "svg", "math", "template"}
+    CHAPTER = {"h1", "h2"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.sections = []
+        self.title = None  # text of an open h1/h2, None outside of one
+        self.current_title = ""
+        self.lines = [""]
+        self.skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self.skip += 1
+        elif tag in self.CHAPTER:
+            self.flush()
+            self.title = ""
+        elif tag in self.BLOCK:
+            self.lines.append("")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in self.BLOCK:
+            self.lines.append("")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self.skip = max(self.skip - 1, 0)
+        elif tag in self.CHAPTER and self.title is not None:
+            self.current_title = " ".join(self.title.split())
+            self.title = None
+        elif tag in self.BLOCK:
+            self.lines.append("")
+
+    def handle_data(self, data):
+        if self.skip:
+            return
+        if self.title is not None:
+            self.title += data
+        else:
+            self.lines[-1] += data
+
+    def flush(self):
+        body = [" ".join(line.split()) for line in self.lines]
+        self.sections.append((self.current_title, "\n".join(l for l in body if l)))
+        self.current_title, self.lines = "", [""]
+
+    def close(self):
+        super().close()
+        if self.title is not None:
+            self.current_title = " ".join(self.title.split())
+            self.title = None
+        self.flush()
+
+
+def _html_sections(html: str) -> list:
+    parser = _HtmlText()
+    parser.feed(html)
+    parser.close()
+    return parser.sections
+
+
+def html_chapters(html: str) -> List[Chapter]:
+    """Chapters of an HTML document, split at h1 and h2 headings"""
+    return _fold_sections(_html_sections(html))
+
+
+_CONTAINER_NS = {"c": "urn:oasis:names:tc:opendocument:xmlns:container"}
+_OPF_NS = {"opf": "http://www.idpf.org/2007/opf"}
+
+
+def epub_chapters(data: bytes) -> List[Chapter]:
+    """Chapters of an EPUB, the spine documents in reading order, each also
+    split at its h1 and h2 headings"""
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as epub:
+            container = ElementTree.fromstring(epub.read("META-INF/container.xml"))
+            rootfile = container.find(".//c:rootfile", _CONTAINER_NS)
+            opf_path = rootfile.get("full-path")
+            opf = ElementTree.fromstring(epub.read(opf_path))
+            base = posixpath.dirname(opf_path)
+            manifest = {
+                item.get("id"): item.get("href")
+                for item in opf.iterfind(".//opf:manifest/opf:item", _OPF_NS)
+            }
+            sections = []
+            for itemref in opf.iterfind(".//opf:spine/opf:itemref", _OPF_NS):
+                if itemref.get("linear") == "no":
+                    continue
+                href = manifest.get(itemref.get("idref"))
+                if not href:
+                    continue
+                path = posixpath.normpath(posixpath.join(base, unquote(href)))
+                html = epub.read(path).decode("utf-8-sig", errors="replace")
+                sections.extend(_html_sections(html))
+    except (
+        zipfile.BadZipFile,
+        KeyError,
+        AttributeError,
+        ElementTree.ParseError,
+    ) as exc:
+        raise ValueError(f"Not a readable EPUB: {exc}") from exc
+    return _fold_sections(sections)
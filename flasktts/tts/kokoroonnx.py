@@ -0,0 +1,179 @@
+"""Kokoro on ONNX Runtime, for CPU-only nodes.
+
+The misaki G2P, the chunking and the voice packs are the same as the
+PyTorch engine's; only the acoustic model and vocoder run as one ONNX graph.
+Export the graph once per Kokoro release:
+
+    python -m flasktts.tts.kokoroonnx export Models/kokoro.onnx
+"""
+
+import json
+import sys
+import threading
+from numbers import Number
+from typing import List, Optional
+
+import numpy as np
+from huggingface_hub import hf_hub_download
+from kokoro import KPipeline
+
+from flasktts.config import Config
+from flasktts.tts import memory
+from flasktts.tts.device import device_lock
+from flasktts.tts.kokorotts import REPO_ID, SAMPLE_RATE, KokoroTTS
+from flasktts.tts.lookahead import prefetch
+from flasktts.tts.timestamps import Timeline
+from flasktts.tts.voices import VoiceCache
+
+
+def load_vocab(repo_id: str = REPO_ID) -> dict:
+    """Phoneme to token id table of the Kokoro checkpoint"""
+    with open(hf_hub_download(repo_id=repo_id, filename="config.json")) as f:
+        return json.load(f)["vocab"]
+
+
+class KokoroOnnxTTS(KokoroTTS):
+    def __init__(
+        self,
+        output_dir: str,
+        lang_code: str = "a",
+        model_path: Optional[str] = None,
+        intra_op_threads: Optional[int] = None,
+        inter_op_threads: Optional[int] = None,
+    ):
+        """
+        Args:
+            output_dir (str): Output directory to save the generated audio files
+            lang_code (str): Language code, see KokoroTTS
+            model_path (str, optional): Exported ONNX graph. Defaults to Config.KOKORO_ONNX_MODEL.
+            intra_op_threads (int, optional): Threads per operator, 0 for all cores.
+                Defaults to Config.ORT_INTRA_OP_THREADS.
+            inter_op_threads (int, optional): Threads running operators in parallel.
+                Defaults to Config.ORT_INTER_OP_THREADS.
+        """
+        import onnxruntime as ort
+
+        self.output_dir = output_dir
+        # G2P and voice packs only, the model is the ONNX session
+        self.pipeline = KPipeline(lang_code=lang_code, repo_id=REPO_ID, model=False)
+        self.g2p_pipeline = self.pipeline
+        self.frontend_lock = threading.Lock()
+        self.blends = VoiceCache(
+            self.pipeline.load_single_voice,
+            Config.VOICE_CACHE_SIZE,
+            Config.VOICE_BLEND_DIR or None,
+        )
+        self.vocab = load_vocab()
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = (
+            Config.ORT_INTRA_OP_THREADS
+            if intra_op_threads is None
+            else intra_op_threads
+        )
+        options.inter_op_num_threads = (
+            Config.ORT_INTER_OP_THREADS
+            if inter_op_threads is None
+            else inter_op_threads
+        )
+        self.session = ort.InferenceSession(
+            model_path or Config.KOKORO_ONNX_MODEL,
+            options,
+            providers=["CPUExecutionProvider"],
+        )
+
+    def generate(
+        self,
+        chunks: List[str],
+        voice: str,
+        speed: Number = 1,
+        timeline: Optional[Timeline] = None,
+    ):
+        """Yield the audio of each chunk, in order, see KokoroTTS.generate.
+
+        The exported graph returns the audio only, so the timeline gets each
+        chunk's sentences but no words.
+        """
+        pack = self.load_voice(voice)
+        for result in prefetch(self.chunk_results(chunks)):
+            audio = self.infer(result.phonemes, pack, speed)
+            yield audio
+            if timeline is not None:
+                timeline.add(result.graphemes, len(audio) / SAMPLE_RATE)
+
+    def infer(self, phonemes: str, pack, speed: Number = 1) -> np.ndarray:
+        """Run the graph on one chunk's phonemes
+
+        Args:
+            phonemes (str): Phonemes from the G2P, at most 510
+            pack (torch.Tensor): Voice pack, one style vector per phoneme count
+            speed (Number, optional): Speed of speech. Defaults to 1.
+
+        Returns:
+            np.ndarray: 24 kHz float32 audio
+        """
+        input_ids = [self.vocab[p] for p in phonemes if p in self.vocab]
+        # Same framing and style selection as KModel.forward
+        input_ids = np.array([[0, *input_ids, 0]], dtype=np.int64)
+        ref_s = pack[len(phonemes) - 1].numpy().astype(np.float32)
+        # ONNX Runtime sessions are thread-safe, but concurrent runs would
+        # compete for the same intra-op threads
+        with device_lock("cpu"), memory.inference_peak("cpu"):
+            (audio,) = self.session.run(
+                None,
+                {
+                    "input_ids": input_ids,
+                    "ref_s": ref_s,
+                    "speed": np.array([speed], dtype=np.float32),
+                },
+            )
+        return audio
+
+    def infer_batch(
+        self, phonemes: List[str], pack, speeds: List[Number]
+    ) -> List[np.ndarray]:
+        """Audio of several chunks' phonemes, see KokoroTTS.infer_batch.
+
+        The exported graph takes one sequence, so the chunks run one by one.
+        """
+        return [self.infer(ps, pack, speed) for ps, speed in zip(phonemes, speeds)]
+
+
+def export_onnx(path: str, repo_id: str = REPO_ID):
+    """Export the Kokoro checkpoint to an ONNX graph at path"""
+    import torch
+    from kokoro import KModel
+
+    class Graph(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, ref_s, speed):
+            audio, _ = self.model.forward_with_tokens(input_ids, ref_s, speed)
+            return audio
+
+    # The complex STFT of the default vocoder has no ONNX equivalent
+    model = KModel(repo_id=repo_id, disable_complex=True).eval()
+    torch.onnx.export(
+        Graph(model),
+        (torch.randint(1, 100, (1, 32)), torch.randn(1, 256), torch.tensor([1.0])),
+        path,
+        input_names=["input_ids", "ref_s", "speed"],
+        output_names=["waveform"],
+        dynamic_axes={"input_ids": {1: "tokens"}, "waveform": {0: "samples"}},
+        opset_version=17,
+        dynamo=False,
+    )
+    print(f"Exported {repo_id} to {path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "export":
+        export_onnx(sys.argv[2])
+    else:
+        KokoroOnnxTTS("test_output").synth_text(
+            "The sky above the port was the color of television, tuned to a dead channel.",
+            "test-kokoro-onnx",
+            voice="af_heart",
+        )
@@ -1,28 +1,58 @@
+import copy
 import os
+import threading
 import time
 from numbers import Number
-from typing import Optional
+from typing import List, Optional
 
+import numpy as np
 import soundfile as sf
 import torch
 from kokoro import KPipeline
+from torch.nn.utils.rnn import pack_padded_sequence, pad_packed_sequence
 
 from flasktts.config import Config
+from flasktts.tts import memory
+from flasktts.tts.device import device_lock, select_device
+from flasktts.tts.lookahead import prefetch
+from flasktts.tts.optimize import InferenceOptimizer
+from flasktts.tts.segment import segment_text
+from flasktts.tts.timestamps import WORD, Timeline
+from flasktts.tts.voices import VoiceCache, is_blend
+
+# Kokoro handles up to 510 phoneme tokens per call. Chunks are budgeted in
+# phonemes, with some headroom since packed chunks are measured piecewise.
+CHUNK_TARGET_PHONEMES = 300
+CHUNK_MAX_PHONEMES = 480
+
+REPO_ID = "hexgrad/Kokoro-82M"
+SAMPLE_RATE = 24000
 
 
 class KokoroTTSHighlander:
     _instance = None
+    _lock = threading.Lock()
 
     @classmethod
     def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = KokoroTTS(Config.TTS_WORKDIR)
+        with cls._lock:
+            if cls._instance is None:
+                if Config.KOKORO_BACKEND == "onnx":
+                    from flasktts.tts.kokoroonnx import KokoroOnnxTTS
+
+                    cls._instance = KokoroOnnxTTS(Config.TTS_WORKDIR)
+                else:
+                    cls._instance = KokoroTTS(Config.TTS_WORKDIR)
         return cls._instance
 
 
 class KokoroTTS:
     def __init__(
-        self, output_dir: str, lang_code: str = "a", device: Optional[str] = None
+        self,
+        output_dir: str,
+        lang_code: str = "a",
+        device: Optional[str] = None,
+        optimize: Optional[str] = None,
     ):
         """
         Args:
@@ -33,21 +63,48 @@ class KokoroTTS:
                  🇯🇵 'j' => Japanese: pip install misaki[ja]
                 🇨🇳 'z' => Mandarin Chinese: pip install misaki[zh]
             device (str, optional): Device to use for inference. Defaults to None for auto-detect.
+            optimize (str, optional): Inference optimizations, see flasktts.tts.optimize.
+                Defaults to Config.KOKORO_OPTIMIZE.
         """
 
-        if device is None:
-            if torch.cuda.is_available():
-                device = torch.device("cuda")
-            elif (
-                False and torch.backends.mps.is_available()
-            ):  # MPS is not supported check https://github.com/pytorch/pytorch/issues/77764
-                device = torch.device("mps")
-            else:
-                device = torch.device("cpu")
+        # MPS is not supported check https://github.com/pytorch/pytorch/issues/77764
+        device = select_device(device)
         self.output_dir = output_dir
-        self.pipeline = KPipeline(lang_code=lang_code, device=device)
+        self.pipeline = KPipeline(lang_code=lang_code, repo_id=REPO_ID, device=device)
+        # Same G2P and voices without the model, to phonemize batches up front
+        self.g2p_pipeline = copy.copy(self.pipeline)
+        self.g2p_pipeline.model = None
+        # misaki's G2P and the voice cache are not thread-safe
+        self.frontend_lock = threading.Lock()
+        self.blends = VoiceCache(
+            self.pipeline.load_single_voice,
+            Config.VOICE_CACHE_SIZE,
+            Config.VOICE_BLEND_DIR or None,
+        )
+        self.optimizer = InferenceOptimizer(
+            Config.KOKORO_OPTIMIZE if optimize is None else optimize,
+            device,
+            engine="Kokoro",
+        )
+        self.optimizer.optimize_styletts(self.pipeline.model)
+
+    def phoneme_length(self, text: str) -> int:
+        """Number of phonemes the pipeline's G2P produces for text"""
+        with self.frontend_lock:
+            phonemes = self.pipeline.g2p(text)
+        if isinstance(phonemes, tuple):
+            phonemes = phonemes[0]
+        return len(phonemes or "")
 
-    def synth_text(self, text: str, uuid: str, voice: str, speed: Number = 1) -> str:
+    def synth_text(
+        self,
+        text: str,
+        uuid: str,
+        voice: str,
+        speed: Number = 1,
+        writer=None,
+        timeline: Optional[Timeline] = None,
+    ) -> str:
         """
         Synthesize text to speech
 
@@ -56,10 +113,79 @@ class KokoroTTS:
             uuid (str): Unique identifier for the job
             voice (str): Voice to use for synthesis
             speed (Number, optional): Speed of speech. Defaults to 1.
+            writer (WavWriter | Mp3Encoder, optional): Where the chunks go as
+                they are generated, left open. Defaults to a directory with
+                a WAV file per chunk.
+            timeline (Timeline, optional): Collects the timestamps of the
+                sentences and words as they are generated
 
         Returns:
             str: Output path where the generated audio files
         """
+        chunks = self.chunks(text)
+        if writer is not None:
+            for audio in self.generate(chunks, voice, speed, timeline):
+                writer.write(audio, SAMPLE_RATE)
+            print(f"TTS completed for {uuid}, output saved to {writer.path}")
+            return writer.path
+
+        output_path = self._output_path(uuid)
+        for i, audio in enumerate(self.generate(chunks, voice, speed, timeline)):
+            print(i)
+            # Zero padded so the parts sort in order when they are joined
+            sf.write(os.path.join(output_path, f"{i:05d}.wav"), audio, SAMPLE_RATE)
+
+        print(f"TTS completed for {uuid}, output saved to {output_path}")
+
+        return output_path
+
+    def synth_batch(
+        self,
+        texts: List[str],
+        uuids: List[str],
+        voice: str,
+        speeds: List[Number],
+        timelines: Optional[List[Timeline]] = None,
+    ) -> List[str]:
+        """
+        Synthesize several short texts, typically separate jobs, in one
+        batched forward pass. The audio is the same as synth_text's.
+
+        Args:
+            texts (List[str]): Texts to synthesize
+            uuids (List[str]): Unique identifier of each text's job
+            voice (str): Voice to use for all of them
+            speeds (List[Number]): Speed of speech of each text
+            timelines (List[Timeline], optional): Timeline of each text, which
+                gets its sentences but no words: the batched forward pass
+                doesn't return its durations
+
+        Returns:
+            List[str]: Output path of each text's audio files, as synth_text's
+        """
+        rows = []  # (text number, result) per chunk
+        for number, text in enumerate(texts):
+            rows.extend(
+                (number, result) for result in self.phonemize(self.chunks(text))
+            )
+        pack = self.load_voice(voice)
+        audio = self.infer_batch(
+            [result.phonemes for _, result in rows],
+            pack,
+            [speeds[number] for number, _ in rows],
+        )
+        output_paths = [self._output_path(uuid) for uuid in uuids]
+        parts = [0] * len(texts)
+        for (number, result), part in zip(rows, audio):
+            path = os.path.join(output_paths[number], f"{parts[number]:05d}.wav")
+            sf.write(path, part, SAMPLE_RATE)
+            parts[number] += 1
+            if timelines:
+                timelines[number].add(result.graphemes, len(part) / SAMPLE_RATE)
+        print(f"TTS completed for {len(texts)} jobs in one batch of {len(rows)}")
+        return output_paths
+
+    def _output_path(self, uuid: str) -> str:
         output_path = os.path.join(self.output_dir, uuid)
         if os.path.exists(output_path):
             print(
@@ -70,23 +196,217 @@ class KokoroTTS:
                 os.remove(os.path.join(output_path, file))
             os.rmdir(output_path)
         os.makedirs(output_path)
+        return output_path
 
-        generator = self.pipeline(
-            text,
-            voice=voice,
-            speed=speed,
-            split_pattern=r"\n+",
+    def chunks(self, text: str) -> List[str]:
+        """Chunks of text Kokoro generates one at a time"""
+        return segment_text(
+            text, CHUNK_TARGET_PHONEMES, CHUNK_MAX_PHONEMES, self.phoneme_length
         )
 
-        for i, (_, _, audio) in enumerate(generator):
-            print(i)
-            sf.write(
-                os.path.join(output_path, f"{int(time.time())}_{i}.wav"), audio, 24000
-            )
+    def phonemize(self, chunks: List[str]) -> list:
+        """G2P results of chunks, split as generate splits them, with their
+        graphemes and phonemes"""
+        with self.frontend_lock:
+            return list(self.g2p_pipeline("\n".join(chunks), split_pattern=r"\n+"))
 
-        print(f"TTS completed for {uuid}, output saved to {output_path}")
+    def load_voice(self, voice: str) -> torch.Tensor:
+        """Voice pack of a preset, loaded once and cached by the pipeline, or
+        of a blend such as "af_heart:0.7,af_bella:0.3", see
+        flasktts.tts.voices"""
+        with self.frontend_lock:
+            if is_blend(voice):
+                return self.blends.get(voice)
+            return self.pipeline.load_voice(voice)
 
-        return output_path
+    def infer_batch(
+        self, phonemes: List[str], pack: torch.Tensor, speeds: List[Number]
+    ) -> List[np.ndarray]:
+        """Audio of several chunks' phonemes, generated as one batch
+
+        Args:
+            phonemes (List[str]): Phonemes of each chunk, at most 510 each
+            pack (torch.Tensor): Voice pack, one style vector per phoneme count
+            speeds (List[Number]): Speed of speech of each chunk
+
+        Returns:
+            List[np.ndarray]: 24 kHz float32 audio of each chunk
+        """
+        if not phonemes:
+            return []
+        model = self.pipeline.model
+        vocab = model.vocab
+        input_ids = [[vocab[p] for p in ps if p in vocab] for ps in phonemes]
+        # Style vectors are picked by phoneme count, as in KPipeline.infer
+        ref_s = torch.cat([pack[len(ps) - 1] for ps in phonemes]).to(model.device)
+        speed = torch.tensor(speeds, dtype=torch.float32, device=model.device)
+
+        def run(rows):
+            with (
+                device_lock(model.device),
+                memory.inference_peak(model.device),
+                self.optimizer.inference(),
+            ):
+                audio = forward_batch(
+                    model, [input_ids[row] for row in rows], ref_s[rows], speed[rows]
+                )
+            return [part.float().cpu().numpy() for part in audio]
+
+        # A batch that runs out of memory is generated in halves
+        rows = list(range(len(phonemes)))
+        return [
+            part
+            for parts in memory.retry_smaller(run, rows, memory.halves)
+            for part in parts
+        ]
+
+    def generate(
+        self,
+        chunks: List[str],
+        voice: str,
+        speed: Number = 1,
+        timeline: Optional[Timeline] = None,
+    ):
+        """Yield the audio of each chunk, in order
+
+        The next chunks are phonemized on a background thread while the
+        current one is on the device, see flasktts.tts.lookahead. The G2P
+        and the model take turns under separate locks, so concurrent jobs
+        phonemize while another job's chunk is on the device too.
+
+        Args:
+            chunks (List[str]): Chunks from segment_text
+            voice (str): Voice to use for synthesis
+            speed (Number, optional): Speed of speech. Defaults to 1.
+            timeline (Timeline, optional): Gets each chunk's sentences, and
+                its words timed by the durations the model predicted
+        """
+        model = self.pipeline.model
+        pack = self.load_voice(voice).to(model.device)
+
+        def infer(phonemes):
+            with (
+                device_lock(model.device),
+                memory.inference_peak(model.device),
+                self.optimizer.inference(),
+            ):
+                return KPipeline.infer(model, phonemes, pack, speed)
+
+        for result in prefetch(self.chunk_results(chunks)):
+            # A chunk that runs out of memory is generated in two pieces
+            outputs = memory.retry_smaller(infer, result.phonemes, split_phonemes)
+            for output in outputs:
+                yield output.audio
+            if timeline is not None:
+                words = None
+                # Durations of pieces no longer line up with the tokens
+                if len(outputs) == 1 and result.tokens:
+                    words = token_words(result.tokens, outputs[0].pred_dur)
+                seconds = sum(len(output.audio) for output in outputs) / SAMPLE_RATE
+                timeline.add(result.graphemes, seconds, words)
+
+    def chunk_results(self, chunks: List[str]):
+        """G2P result of each chunk, split as KPipeline splits them, the
+        text front end of generate
+
+        Args:
+            chunks (List[str]): Chunks from segment_text
+        """
+        # One chunk per line, KPipeline phonemizes each line separately
+        results = iter(self.g2p_pipeline("\n".join(chunks), split_pattern=r"\n+"))
+        while True:
+            with self.frontend_lock:
+                result = next(results, None)
+            if result is None:
+                return
+            yield result
+
+
+def split_phonemes(phonemes: str) -> List[str]:
+    """A chunk's phonemes in two at the word boundary nearest the middle"""
+    spaces = [i for i, symbol in enumerate(phonemes) if symbol == " "]
+    if not spaces:
+        return [phonemes]
+    middle = min(spaces, key=lambda i: abs(i - len(phonemes) // 2))
+    return [phonemes[:middle], phonemes[middle + 1 :]]
+
+
+def token_words(tokens: list, pred_dur: torch.Tensor) -> list:
+    """Words of a chunk with their start and end seconds, from the tokens
+    of its G2P result and the phoneme durations the model predicted
+
+    Punctuation is left out, and the pieces the tokenizer splits a word into
+    ("do", "n't") are joined back.
+    """
+    KPipeline.join_timestamps(tokens, pred_dur)
+    words, joined = [], False
+    for token in tokens:
+        if token.start_ts is None or not WORD.fullmatch(token.text):
+            joined = False
+            continue
+        if joined and words:
+            text, start, _ = words[-1]
+            words[-1] = (text + token.text, start, token.end_ts)
+        else:
+            words.append((token.text, token.start_ts, token.end_ts))
+        joined = not token.whitespace
+    return words
+
+
+def forward_batch(
+    model, input_ids: List[List[int]], ref_s: torch.Tensor, speed: torch.Tensor
+) -> List[torch.Tensor]:
+    """KModel.forward_with_tokens for a batch of token sequences.
+
+    The text encoders and the duration predictor run on the padded batch,
+    packing their LSTMs so each row gets exactly its unbatched result. The
+    prosody predictor and the decoder then run row by row: their instance
+    norms normalize over time, so padding frames would change the audio.
+
+    Args:
+        model (KModel): Kokoro model
+        input_ids (List[List[int]]): Token ids of each row, without the
+            framing zeros
+        ref_s (torch.Tensor): Style vector of each row, (rows, 256)
+        speed (torch.Tensor): Speed of each row, (rows,)
+
+    Returns:
+        List[torch.Tensor]: Audio of each row
+    """
+    device = model.device
+    lengths = torch.tensor([len(ids) + 2 for ids in input_ids], device=device)
+    tokens = torch.zeros(
+        (len(input_ids), int(lengths.max())), dtype=torch.long, device=device
+    )
+    for row, ids in enumerate(input_ids):
+        tokens[row, 1 : len(ids) + 1] = torch.tensor(ids, device=device)
+    positions = torch.arange(tokens.shape[1], device=device)
+    text_mask = positions.unsqueeze(0) >= lengths.unsqueeze(1)
+
+    bert_dur = model.bert(tokens, attention_mask=(~text_mask).int())
+    d_en = model.bert_encoder(bert_dur).transpose(-1, -2)
+    s = ref_s[:, 128:]
+    d = model.predictor.text_encoder(d_en, s, lengths, text_mask)
+    x = pack_padded_sequence(d, lengths.cpu(), batch_first=True, enforce_sorted=False)
+    model.predictor.lstm.flatten_parameters()
+    x, _ = model.predictor.lstm(x)
+    x, _ = pad_packed_sequence(x, batch_first=True, total_length=d.shape[1])
+    duration = torch.sigmoid(model.predictor.duration_proj(x)).sum(axis=-1)
+    pred_dur = torch.round(duration / speed.unsqueeze(1)).clamp(min=1).long()
+    t_en = model.text_encoder(tokens, lengths, text_mask)
+
+    audio = []
+    for row, length in enumerate(lengths.tolist()):
+        indices = torch.repeat_interleave(positions[:length], pred_dur[row, :length])
+        frames = torch.arange(indices.shape[0], device=device)
+        alignment = torch.zeros((1, length, indices.shape[0]), device=device)
+        alignment[0, indices, frames] = 1
+        en = d[row : row + 1, :length].transpose(-1, -2) @ alignment
+        F0_pred, N_pred = model.predictor.F0Ntrain(en, s[row : row + 1])
+        asr = t_en[row : row + 1, :, :length] @ alignment
+        row_audio = model.decoder(asr, F0_pred, N_pred, ref_s[row : row + 1, :128])
+        audio.append(row_audio.squeeze())
+    return audio
 
 
 if __name__ == "__main__":
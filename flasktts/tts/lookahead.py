@@ -0,0 +1,69 @@
+"""Text front end running ahead of the model.
+
+Phonemization and tokenization run on the CPU. Done inline, each chunk's
+front end runs between two inferences and the device waits for it.
+prefetch() moves it to a background thread that prepares the next chunks
+while the current one is on the device, at most Config.FRONTEND_LOOKAHEAD
+ahead, so a book isn't phonemized into memory all at once.
+"""
+
+import queue
+import threading
+from typing import Iterable, Iterator, Optional
+
+from flasktts.config import Config
+
+_END = object()
+
+
+def prefetch(items: Iterable, depth: Optional[int] = None) -> Iterator:
+    """Iterate items on a background thread, ahead of the consumer
+
+    The items come in order. An exception raised while producing them is
+    raised by the consumer where the failing item would have come. Closing
+    the returned iterator stops the producer after its current item.
+
+    Args:
+        items (Iterable): Lazily produced items, typically a generator
+        depth (int, optional): Items produced ahead of the consumer, 0 to
+            iterate inline. Defaults to Config.FRONTEND_LOOKAHEAD.
+    """
+    depth = Config.FRONTEND_LOOKAHEAD if depth is None else depth
+    if depth <= 0:
+        yield from items
+        return
+
+    ready = queue.Queue(depth)
+    stopped = threading.Event()
+
+    def put(entry) -> bool:
+        # Wake up now and then to notice a consumer that went away
+        while not stopped.is_set():
+            try:
+                ready.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put((item, None)):
+                    return
+        except BaseException as exc:
+            put((_END, exc))
+        else:
+            put((_END, None))
+
+    threading.Thread(target=produce, name="frontend", daemon=True).start()
+    try:
+        while True:
+            item, exc = ready.get()
+            if item is _END:
+                if exc is not None:
+                    raise exc
+                return
+            yield item
+    finally:
+        stopped.set()
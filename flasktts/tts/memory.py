@@ -0,0 +1,162 @@
+"""Memory management of the engines.
+
+Freeing memory after every chunk, gc.collect() and
+torch.cuda.empty_cache(), costs time and hands the CUDA caching
+allocator's blocks back only for it to request them again for the next
+chunk. Memory is instead released once the device is nearly full, above
+Config.MEMORY_RELEASE_FRACTION of it. Running out of memory on a chunk or a
+batch frees memory and retries the work in smaller pieces, and the peak
+memory of each job's inference is recorded with the job.
+"""
+
+import gc
+import os
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import torch
+
+from flasktts.config import Config
+from flasktts.tts.device import select_device
+
+_local = threading.local()
+
+
+def _rss() -> Optional[int]:
+    """Resident memory of this process, None where /proc is missing"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def used_memory(device) -> tuple[Optional[int], int]:
+    """Bytes in use and in total on device: reserved by the CUDA caching
+    allocator, or this process's resident memory out of the host's"""
+    device = torch.device(device)
+    if device.type == "cuda":
+        total = torch.cuda.get_device_properties(device).total_memory
+        return torch.cuda.memory_reserved(device), total
+    return _rss(), os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+def free_memory():
+    """Collect garbage and return the CUDA allocator's cached blocks"""
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+def release_if_needed(device=None) -> bool:
+    """free_memory() if the device is above Config.MEMORY_RELEASE_FRACTION
+
+    Args:
+        device (str | torch.device, optional): Device of the engine, defaults
+            to this worker's
+
+    Returns:
+        bool: Whether memory was released
+    """
+    used, total = used_memory(select_device() if device is None else device)
+    if used is None or used < Config.MEMORY_RELEASE_FRACTION * total:
+        return False
+    free_memory()
+    return True
+
+
+def is_out_of_memory(exc: BaseException) -> bool:
+    """Whether exc reports that the device or host ran out of memory"""
+    if isinstance(exc, (torch.cuda.OutOfMemoryError, MemoryError)):
+        return True
+    message = str(exc)
+    return isinstance(exc, RuntimeError) and (
+        "out of memory" in message or "can't allocate memory" in message
+    )
+
+
+def retry_smaller(run: Callable, work, split: Callable) -> list:
+    """run(work), retried on the pieces of work if it runs out of memory
+
+    Args:
+        run (Callable): Runs a piece of work and returns its result
+        work: Chunk text, batch rows or whatever run takes
+        split (Callable): Smaller pieces of a piece of work, in order, fewer
+            than two if it can't be split
+
+    Returns:
+        list: Results of the pieces run, in order, just run(work)'s if it
+        fit in memory
+
+    Raises:
+        Exception: The out of memory error of a piece that can't be split
+    """
+    try:
+        return [run(work)]
+    except Exception as exc:
+        if not is_out_of_memory(exc):
+            raise
+        pieces = split(work)
+        if len(pieces) < 2:
+            raise
+        message = str(exc).splitlines()[0] if str(exc) else type(exc).__name__
+    # Out of the except block, the traceback no longer holds the failed
+    # attempt's tensors
+    free_memory()
+    print(f"Out of memory, retrying in {len(pieces)} pieces: {message}")
+    return [result for piece in pieces for result in retry_smaller(run, piece, split)]
+
+
+def halves(items: list) -> list[list]:
+    """Split for retry_smaller of a batch: its two halves"""
+    middle = len(items) // 2
+    return [items[:middle], items[middle:]] if middle else [items]
+
+
+class PeakMemory:
+    """Highest memory use seen by the inference of one job"""
+
+    def __init__(self):
+        self.bytes: Optional[int] = None
+
+    def update(self, used: Optional[int]):
+        if used is not None:
+            self.bytes = max(self.bytes or 0, used)
+
+
+@contextmanager
+def job_peak():
+    """Collect the peak memory of the inference this thread runs in the
+    block, measured by inference_peak
+
+    Yields:
+        PeakMemory: Its bytes are None if nothing was measured
+    """
+    peak = PeakMemory()
+    previous = getattr(_local, "peak", None)
+    _local.peak = peak
+    try:
+        yield peak
+    finally:
+        _local.peak = previous
+
+
+@contextmanager
+def inference_peak(device):
+    """Measure the memory of the inference in the block for job_peak.
+
+    Run it holding the device lock, the CUDA peak counter is the device's.
+    On CUDA it is the most memory allocated, on CPU the process's resident
+    memory afterwards, which includes what other threads hold.
+    """
+    device = torch.device(device)
+    cuda = device.type == "cuda"
+    if cuda:
+        torch.cuda.reset_peak_memory_stats(device)
+    try:
+        yield
+    finally:
+        peak = getattr(_local, "peak", None)
+        if peak is not None:
+            peak.update(torch.cuda.max_memory_allocated(device) if cuda else _rss())
@@ -0,0 +1,171 @@
+"""Optional inference optimizations, mostly aimed at CPU-only nodes.
+
+Each engine reads a comma separated list of optimizations from its
+``<ENGINE>_OPTIMIZE`` setting, falling back to ``TTS_OPTIMIZE``:
+
+    inference_mode  run under torch.inference_mode instead of torch.no_grad
+    int8            int8 dynamic quantization of Linear/LSTM layers (CPU only)
+    bf16            bfloat16 for the transformer parts of the model
+    compile         torch.compile the heavy submodules
+
+"cpu" is shorthand for "inference_mode,int8". The default is none of them,
+which keeps the plain fp32 path.
+
+What bf16 means depends on the engine. Style2TTS and Kokoro keep fp32
+weights and run only their PL-BERT encoder under bf16 autocast; its output
+feeds the duration predictor, so speech length can drift slightly (the
+benchmark reports it). Qwen3-TTS instead loads all its weights in bfloat16,
+and without bf16 it loads them in the checkpoint's own dtype.
+
+int8 relies on PyTorch's eager dynamic quantization, which is deprecated in
+favour of torchao; when a PyTorch release no longer ships it, int8 is
+skipped with a warning.
+"""
+
+from contextlib import contextmanager
+from typing import FrozenSet, Iterable, Optional
+
+import torch
+from torch import nn
+
+try:
+    from torch.ao.nn.quantized.dynamic import LSTM as QuantizedLSTM
+    from torch.ao.quantization import quantize_dynamic
+except ImportError:
+    quantize_dynamic = None
+
+OPTIMIZATIONS = ("inference_mode", "int8", "bf16", "compile")
+PRESETS = {"cpu": ("inference_mode", "int8"), "none": ()}
+
+
+def parse_optimizations(spec: Optional[str]) -> FrozenSet[str]:
+    """Parse an optimization list such as "inference_mode,int8".
+
+    Raises:
+        ValueError: If an entry is not a known optimization or preset
+    """
+    enabled = set()
+    for entry in (spec or "").split(","):
+        entry = entry.strip().lower()
+        if not entry:
+            continue
+        if entry in PRESETS:
+            enabled.update(PRESETS[entry])
+        elif entry in OPTIMIZATIONS:
+            enabled.add(entry)
+        else:
+            raise ValueError(
+                f"Unknown optimization {entry!r}, expected one of "
+                f"{', '.join(OPTIMIZATIONS + tuple(PRESETS))}"
+            )
+    return frozenset(enabled)
+
+
+class InferenceOptimizer:
+    """Applies the configured optimizations to one engine's modules."""
+
+    def __init__(
+        self,
+        spec: Optional[str],
+        device: torch.device,
+        supported: Iterable[str] = OPTIMIZATIONS,
+        engine: str = "engine",
+    ):
+        """
+        Args:
+            spec (str, optional): Optimization list, see module docstring
+            device (torch.device): Device the engine runs on
+            supported (Iterable[str]): Optimizations this engine can use; the
+                others are ignored with a warning
+            engine (str): Engine name for log messages
+        """
+        self.device = torch.device(device)
+        requested = parse_optimizations(spec)
+        supported = set(supported)
+        if self.device.type != "cpu":
+            # PyTorch only has dynamic quantization kernels for the CPU
+            supported.discard("int8")
+        if quantize_dynamic is None:
+            supported.discard("int8")
+        for name in sorted(requested - supported):
+            print(f"{engine}: optimization {name} not supported on {self.device}")
+        self.enabled = requested & supported
+        if self.enabled:
+            print(f"{engine}: optimizations {', '.join(sorted(self.enabled))}")
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.enabled
+
+    @contextmanager
+    def inference(self):
+        """Context to run a whole synthesis call in."""
+        if "inference_mode" in self.enabled:
+            with torch.inference_mode():
+                yield
+        else:
+            with torch.no_grad():
+                yield
+
+    def autocast(self, module: nn.Module) -> nn.Module:
+        """Run a module under bfloat16 autocast and return fp32 outputs.
+
+        Only wrap modules that tolerate reduced precision (transformer
+        encoders); the vocoder always stays in fp32.
+        """
+        if "bf16" not in self.enabled:
+            return module
+        return _Autocast(module, self.device.type)
+
+    def quantize(self, module: nn.Module) -> nn.Module:
+        """int8 dynamic quantization of a module's Linear and LSTM layers."""
+        if "int8" not in self.enabled:
+            return module
+        # quantize_dynamic only swaps children, so wrap to cover a bare layer.
+        # In place: copying fails on modules using weight_norm, as the
+        # StyleTTS2 predictor and decoder do.
+        module = quantize_dynamic(
+            nn.Sequential(module), {nn.Linear, nn.LSTM}, dtype=torch.qint8, inplace=True
+        )[0]
+        for submodule in module.modules():
+            if isinstance(submodule, QuantizedLSTM):
+                # Weights are already packed; model code still calls this
+                submodule.flatten_parameters = lambda: None
+        return module
+
+    def compile(self, module: nn.Module) -> nn.Module:
+        """torch.compile a module, shapes vary with the text so compile dynamic."""
+        if "compile" not in self.enabled:
+            return module
+        return torch.compile(module, dynamic=True)
+
+    def optimize_styletts(self, model):
+        """Optimize a StyleTTS2-family model (Style2TTS, Kokoro) in place.
+
+        The PL-BERT encoder runs in bf16, the prosody predictor and the
+        decoder are quantized, and the decoder, where most time goes, is
+        compiled. The vocoder never runs in bf16, but the duration predictor
+        reads the bf16 encoder output, so bf16 can shift durations slightly.
+        """
+        model.bert = self.autocast(model.bert)
+        model.bert_encoder = self.quantize(model.bert_encoder)
+        model.predictor = self.quantize(model.predictor)
+        model.decoder = self.compile(self.quantize(model.decoder))
+
+
+class _Autocast(nn.Module):
+    def __init__(self, module: nn.Module, device_type: str):
+        super().__init__()
+        self.module = module
+        self.device_type = device_type
+
+    def __getattr__(self, name):
+        # Keep attributes of the wrapped module (e.g. .device) reachable
+        try:
+            return super().__getattr__(name)
+        except AttributeError:
+            return getattr(self.module, name)
+
+    def forward(self, *args, **kwargs):
+        with torch.autocast(self.device_type, dtype=torch.bfloat16):
+            out = self.module(*args, **kwargs)
+        return out.float() if torch.is_tensor(out) else out
@@ -1,20 +1,25 @@
-import gc
 import os
-import re
+import threading
 import time
+from contextlib import nullcontext
 from typing import List, Optional
 
-import librosa
-import numpy as np
-import soundfile as sf
 import torch
 from qwen_tts import Qwen3TTSModel
 
 from flasktts.config import Config
-
-# Target length per chunk in characters. Qwen3-TTS works best on short-ish
-# segments; long inputs cause very slow generation and higher memory.
-CHUNK_TARGET_CHARS = 500
+from flasktts.tts import memory
+from flasktts.tts.audio import WavWriter
+from flasktts.tts.device import device_lock, select_device
+from flasktts.tts.optimize import InferenceOptimizer
+from flasktts.tts.segment import segment_text
+
+# Target length per chunk in text tokens (~4 characters each). Qwen3-TTS works
+# best on short-ish segments; long inputs cause very slow generation and
+# higher memory.
+CHUNK_TARGET_TOKENS = 120
+# Hard limit per chunk; longer sentences are split at clause/word boundaries.
+CHUNK_MAX_TOKENS = 150
 
 # Default reference voice: Kokoro af_heart cloned via Qwen3 Base model
 DEFAULT_REF_AUDIO = os.path.join(
@@ -30,11 +35,13 @@ DEFAULT_REF_TEXT = (
 
 class Qwen3TTSHighlander:
     _instance = None
+    _lock = threading.Lock()
 
     @classmethod
     def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = Qwen3TTS(Config.TTS_WORKDIR)
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = Qwen3TTS(Config.TTS_WORKDIR)
         return cls._instance
 
 
@@ -48,7 +55,7 @@ class Qwen3TTS:
         device: Optional[str] = None,
         ref_audio: Optional[str] = None,
         ref_text: Optional[str] = None,
-        speech_rate: Optional[float] = None,
+        optimize: Optional[str] = None,
     ):
         """
         Initialize the Qwen3 TTS model with voice cloning from a reference audio.
@@ -62,28 +69,49 @@ class Qwen3TTS:
             device (str, optional): Device for inference. Defaults to auto-detect.
             ref_audio (str, optional): Path to reference audio WAV for voice cloning.
             ref_text (str, optional): Transcript of the reference audio.
-            speech_rate (float, optional): Pitch-preserving time stretch applied to
-                the output audio. >1.0 = faster, <1.0 = slower. Defaults to
-                Config.QWEN3_SPEECH_RATE.
+            optimize (str, optional): Inference optimizations, see
+                flasktts.tts.optimize. "bf16" loads the weights in bfloat16,
+                "int8" loads them in fp32 and quantizes the transformer layers;
+                the two are exclusive and int8 wins. Defaults to
+                Config.QWEN3_OPTIMIZE.
         """
-        self.device = self._select_device(device)
+        # MPS crashes on Qwen3-TTS bf16 matmul ops — skip it
+        self.device = select_device(device)
         self.output_dir = output_dir
         self.model_id = model_id or self.DEFAULT_MODEL_ID
-        self.speech_rate = (
-            speech_rate if speech_rate is not None else Config.QWEN3_SPEECH_RATE
-        )
+        # HuggingFace fast tokenizers are not safe to call from several threads
+        self.frontend_lock = threading.Lock()
 
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
 
         print(f"Starting Qwen3-TTS: {self.device} (torch {torch.__version__})")
-        print(f"Speech rate: {self.speech_rate}")
         print(f"Loading model: {self.model_id}")
 
+        # The generation loop is too dynamic for torch.compile to pay off
+        self.optimizer = InferenceOptimizer(
+            Config.QWEN3_OPTIMIZE if optimize is None else optimize,
+            self.device,
+            supported=("inference_mode", "int8", "bf16"),
+            engine="Qwen3-TTS",
+        )
+        if "int8" in self.optimizer:
+            # Dynamic quantization needs fp32 weights
+            dtype = torch.float32
+        elif "bf16" in self.optimizer:
+            dtype = torch.bfloat16
+        else:
+            dtype = "auto"
+
         self.model = Qwen3TTSModel.from_pretrained(
             self.model_id,
             device_map=str(self.device),
-            dtype="auto",
+            dtype=dtype,
+        )
+        talker = self.model.model.talker
+        talker.model.layers = self.optimizer.quantize(talker.model.layers)
+        talker.code_predictor.model.layers = self.optimizer.quantize(
+            talker.code_predictor.model.layers
         )
 
         # Pre-compute voice clone prompt at startup
@@ -96,74 +124,40 @@ class Qwen3TTS:
         )
         print("Voice clone prompt ready")
 
-    @staticmethod
-    def _select_device(device: Optional[str] = None) -> torch.device:
-        """Select the best available compute device.
+    def token_length(self, text: str) -> int:
+        """Number of text tokens the model's tokenizer produces for text."""
+        with self.frontend_lock:
+            input_ids = self.model.processor(text=text)["input_ids"]
+        if input_ids and isinstance(input_ids[0], list):
+            input_ids = input_ids[0]
+        return len(input_ids)
 
-        Honors the TTS_DEVICE env var as an override (e.g. "cpu", "cuda",
-        "cuda:0") for hosts where auto-detection picks the wrong backend —
-        for example an older GPU whose compute capability isn't supported
-        by the installed PyTorch build.
-
-        Note: MPS is disabled for Qwen3-TTS due to bf16 matmul
-        incompatibilities in the PyTorch MPS backend.
-        """
-        if device is not None:
-            return torch.device(device)
-        env_device = os.getenv("TTS_DEVICE")
-        if env_device:
-            return torch.device(env_device)
-        if torch.cuda.is_available():
-            return torch.device("cuda")
-        # MPS crashes on Qwen3-TTS bf16 matmul ops — skip it
-        return torch.device("cpu")
-
-    @staticmethod
-    def _chunk_text(text: str, target_chars: int = CHUNK_TARGET_CHARS) -> List[str]:
-        """Split text into chunks at sentence boundaries, close to target_chars each.
-
-        Long inputs cause very slow generation and memory pressure. Splitting at
-        sentence boundaries keeps prosody natural while bounding per-call work.
-        """
-        text = text.strip()
-        if not text:
-            return []
-
-        # Split into sentences (keeping the punctuation)
-        sentences = re.split(r"(?<=[.!?])\s+", text)
-        chunks: List[str] = []
-        current = ""
-        for sentence in sentences:
-            if not sentence:
-                continue
-            if not current:
-                current = sentence
-            elif len(current) + 1 + len(sentence) <= target_chars:
-                current = f"{current} {sentence}"
-            else:
-                chunks.append(current)
-                current = sentence
-        if current:
-            chunks.append(current)
-        return chunks
-
-    def synth_text(self, text: str, uuid: str) -> str:
+    def synth_text(self, text: str, uuid: str, writer=None) -> str:
         """Synthesize text to speech using the pre-computed cloned voice.
 
         The input is split into sentence-aligned chunks and generated one at a
-        time so a long article produces incremental progress, frees memory
-        between chunks, and keeps per-call work bounded.
+        time so a long article produces incremental progress and keeps
+        per-call work bounded. Each chunk is appended to the WAV file as it is
+        generated, so memory does not grow with the length of the text.
+        Cached memory is released between chunks only when the device is
+        nearly full, see flasktts.tts.memory.
 
         Args:
             text (str): Text to synthesize
             uuid (str): Unique identifier for the job
+            writer (WavWriter | Mp3Encoder, optional): Where the chunks go as
+                they are generated, left open. Defaults to a WAV file.
 
         Returns:
-            str: Output path of the generated WAV file
+            str: Output path of the generated audio
         """
-        output_path = os.path.join(self.output_dir, f"{uuid}.wav")
+        output = (
+            WavWriter(os.path.join(self.output_dir, f"{uuid}.wav"))
+            if writer is None
+            else nullcontext(writer)
+        )
 
-        chunks = self._chunk_text(text)
+        chunks = self.chunks(text)
         if not chunks:
             raise ValueError("Empty text passed to synth_text")
 
@@ -172,47 +166,103 @@ class Qwen3TTS:
             f"({sum(len(c) for c in chunks)} chars)"
         )
 
-        all_segments: List[np.ndarray] = []
-        sample_rate: Optional[int] = None
         t0 = time.perf_counter()
-        for i, chunk in enumerate(chunks, start=1):
-            chunk_start = time.perf_counter()
-            segments, sr = self.model.generate_voice_clone(
-                text=chunk,
-                voice_clone_prompt=self.voice_prompt,
-            )
-            sample_rate = sr
-            all_segments.extend(segments)
-
-            # Free intermediate tensors between chunks to keep memory bounded
-            gc.collect()
-            if torch.cuda.is_available():
-                torch.cuda.empty_cache()
-
-            chunk_audio_len = sum(len(s) for s in segments) / sr
-            elapsed = time.perf_counter() - chunk_start
-            print(
-                f"  chunk {i}/{len(chunks)}: {len(chunk)} chars -> "
-                f"{chunk_audio_len:.1f}s audio in {elapsed:.1f}s "
-                f"(RTF {elapsed / chunk_audio_len:.2f})"
-            )
+        with output as writer:
+            for i, chunk in enumerate(chunks, start=1):
+                chunk_start = time.perf_counter()
+                chunk_audio_len = self._synth_chunk(chunk, writer)
+                elapsed = time.perf_counter() - chunk_start
+                print(
+                    f"  chunk {i}/{len(chunks)}: {len(chunk)} chars -> "
+                    f"{chunk_audio_len:.1f}s audio in {elapsed:.1f}s "
+                    f"(RTF {elapsed / chunk_audio_len:.2f})"
+                )
 
-        combined_audio = np.concatenate(all_segments)
+        total = time.perf_counter() - t0
+        print(
+            f"Qwen3-TTS {uuid} complete: {writer.duration:.1f}s audio in "
+            f"{total:.1f}s (RTF {total / writer.duration:.2f}) -> {writer.path}"
+        )
+        return writer.path
 
-        if self.speech_rate != 1.0:
-            combined_audio = librosa.effects.time_stretch(
-                combined_audio, rate=self.speech_rate
-            )
+    def synth_batch(self, texts: List[str], uuids: List[str]) -> List[str]:
+        """Synthesize several short texts, typically separate jobs, with one
+        batched generation. Each batch row samples its own codes, so the
+        audio is as varied as synth_text's but not identical to it.
 
-        sf.write(output_path, combined_audio, sample_rate)
+        Args:
+            texts (List[str]): Texts to synthesize
+            uuids (List[str]): Unique identifier of each text's job
+
+        Returns:
+            List[str]: Output path of each text's WAV file
+        """
+        rows = []  # (text number, chunk)
+        for number, text in enumerate(texts):
+            chunks = self.chunks(text)
+            if not chunks:
+                raise ValueError("Empty text passed to synth_batch")
+            rows.extend((number, chunk) for chunk in chunks)
+
+        t0 = time.perf_counter()
+        # A batch that runs out of memory is generated in halves
+        results = memory.retry_smaller(
+            self._generate, [chunk for _, chunk in rows], memory.halves
+        )
+        segments = [segment for part, _ in results for segment in part]
+        sr = results[0][1]
+        output_paths = [os.path.join(self.output_dir, f"{uuid}.wav") for uuid in uuids]
+        writers = [WavWriter(path) for path in output_paths]
+        for (number, _), segment in zip(rows, segments):
+            writers[number].write(segment, sr)
+        for writer in writers:
+            writer.close()
 
         total = time.perf_counter() - t0
-        total_audio = len(combined_audio) / sample_rate
+        seconds = sum(writer.duration for writer in writers)
         print(
-            f"Qwen3-TTS {uuid} complete: {total_audio:.1f}s audio in "
-            f"{total:.1f}s (RTF {total / total_audio:.2f}) -> {output_path}"
+            f"Qwen3-TTS batch of {len(texts)} jobs complete: {seconds:.1f}s audio "
+            f"in {total:.1f}s (RTF {total / seconds:.2f})"
+        )
+        return output_paths
+
+    def chunks(self, text: str) -> List[str]:
+        """Chunks of text Qwen3-TTS generates one at a time"""
+        return segment_text(
+            text, CHUNK_TARGET_TOKENS, CHUNK_MAX_TOKENS, self.token_length
         )
-        return output_path
+
+    def _synth_chunk(self, chunk: str, writer) -> float:
+        """Generate one chunk and append it to writer, returns its seconds.
+        A chunk that runs out of memory is generated in smaller pieces."""
+        seconds = 0.0
+        for segments, sr in memory.retry_smaller(
+            self._generate, chunk, self._split_chunk
+        ):
+            for segment in segments:
+                writer.write(segment, sr)
+                seconds += len(segment) / sr
+        memory.release_if_needed(self.device)
+        return seconds
+
+    def _generate(self, text):
+        """Segments and sample rate generated from a chunk or a list of them"""
+        with (
+            device_lock(self.device),
+            memory.inference_peak(self.device),
+            self.optimizer.inference(),
+        ):
+            return self.model.generate_voice_clone(
+                text=text,
+                voice_clone_prompt=self.voice_prompt,
+            )
+
+    def _split_chunk(self, chunk: str) -> List[str]:
+        """A chunk in two pieces of about half its tokens"""
+        half = self.token_length(chunk) // 2
+        if half < 1:
+            return [chunk]
+        return segment_text(chunk, half, half, self.token_length)
 
     def cleanup(self, task_id=None):
         """Remove generated files from the output directory."""
@@ -0,0 +1,119 @@
+"""Text segmentation shared by all engines.
+
+Input text is cut into chunks that fit an engine's budget: paragraphs (lines)
+are never merged, sentences are packed together up to a target length, and a
+sentence longer than the hard limit is split at clause boundaries, then at
+word boundaries, and only as a last resort mid-word. Nothing is dropped.
+"""
+
+import re
+from typing import Callable, Iterator, List
+
+_PARAGRAPH_BREAK = re.compile(r"\s*\n\s*")
+# Sentence end: terminal punctuation plus any closing quotes/brackets
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'”’)\]]*(?=\s)")
+_CLAUSE_END = re.compile(r"[,;:–—]+[\"'”’)\]]*(?=\s)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _split_after(pattern: re.Pattern, text: str) -> List[str]:
+    """Split text after every match of pattern, keeping the matched text."""
+    pieces = []
+    start = 0
+    for match in pattern.finditer(text):
+        piece = text[start : match.end()].strip()
+        if piece:
+            pieces.append(piece)
+        start = match.end()
+    rest = text[start:].strip()
+    if rest:
+        pieces.append(rest)
+    return pieces
+
+
+def _pack(pieces: List[str], target: int, length: Callable[[str], int]) -> List[str]:
+    """Greedily join consecutive pieces while the result stays within target.
+
+    Each piece is measured once and lengths are summed, counting one unit for
+    the joining space. That is exact for characters and close for token
+    counters, which is why engines keep their budgets a little below their
+    hard model limit.
+    """
+    chunks: List[str] = []
+    current = ""
+    current_len = 0
+    for piece in pieces:
+        piece_len = length(piece)
+        if not current:
+            current, current_len = piece, piece_len
+        elif current_len + 1 + piece_len <= target:
+            current = f"{current} {piece}"
+            current_len += 1 + piece_len
+        else:
+            chunks.append(current)
+            current, current_len = piece, piece_len
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _bounded_pieces(
+    sentence: str, max_len: int, length: Callable[[str], int]
+) -> Iterator[str]:
+    """Yield parts of a sentence that are each at most max_len long."""
+    if length(sentence) <= max_len:
+        yield sentence
+        return
+
+    for splitter in (
+        lambda s: _split_after(_CLAUSE_END, s),
+        lambda s: _WHITESPACE.split(s),
+    ):
+        parts = splitter(sentence)
+        if len(parts) > 1:
+            for part in _pack(parts, max_len, length):
+                yield from _bounded_pieces(part, max_len, length)
+            return
+
+    # A single "word" longer than the limit (URLs, hashes): cut it in half
+    half = len(sentence) // 2
+    if half == 0:
+        yield sentence
+        return
+    yield from _bounded_pieces(sentence[:half], max_len, length)
+    yield from _bounded_pieces(sentence[half:], max_len, length)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a paragraph into sentences, keeping their punctuation."""
+    return _split_after(_SENTENCE_END, text)
+
+
+def segment_text(
+    text: str,
+    target_len: int,
+    max_len: int,
+    length: Callable[[str], int] = len,
+) -> List[str]:
+    """Split text into chunks sized for one engine call each.
+
+    Args:
+        text (str): Text to segment
+        target_len (int): Preferred chunk length; sentences are packed
+            together until adding the next one would exceed it
+        max_len (int): Hard limit, no chunk is ever longer than this
+        length (Callable[[str], int]): Measure of a chunk, characters by default;
+            pass a token counter to budget in model tokens
+
+    Returns:
+        List[str]: Chunks in reading order
+    """
+    chunks: List[str] = []
+    for paragraph in _PARAGRAPH_BREAK.split(text.strip()):
+        if not paragraph:
+            continue
+        pieces = []
+        for sentence in split_sentences(paragraph):
+            pieces.extend(_bounded_pieces(sentence, max_len, length))
+        chunks.extend(_pack(pieces, min(target_len, max_len), length))
+    return chunks
@@ -0,0 +1,36 @@
+"""Per-job synthesis state.
+
+Engines hold only what every job shares: the loaded models and read-only
+settings. Whatever a job changes while it runs lives in its session, so one
+engine can synthesize several jobs at the same time from different worker
+threads without one job's state leaking into another's.
+"""
+
+from typing import Optional
+
+import torch
+
+
+class SynthesisSession:
+    """State of one job's synthesis."""
+
+    def __init__(self, job_id: str, seed: Optional[int] = None):
+        """
+        Args:
+            job_id (str): Job being synthesized
+            seed (int, optional): Seed of the job's random generator, None
+                for a random one
+        """
+        self.job_id = job_id
+        # Style of the previous chunk, carried over to the next (Style2TTS)
+        self.style: Optional[torch.Tensor] = None
+        # Drawn from on the CPU so a seed gives the same noise on any device
+        self.generator = torch.Generator()
+        if seed is None:
+            self.generator.seed()
+        else:
+            self.generator.manual_seed(seed)
+
+    def randn(self, *size: int, device=None) -> torch.Tensor:
+        """Standard normal noise from the job's generator"""
+        return torch.randn(*size, generator=self.generator).to(device)
@@ -1,8 +1,9 @@
 import base64
 import os
 import random
-import re
 import sys
+import threading
+from contextlib import nullcontext
 from itertools import chain
 from typing import Optional
 
@@ -13,7 +14,6 @@ import torch
 import torchaudio
 import yaml
 from nltk.tokenize import word_tokenize
-from scipy.io.wavfile import write
 from styletts2.models import *
 from styletts2.Modules.diffusion.sampler import (
     ADPM2Sampler,
@@ -25,41 +25,68 @@ from styletts2.utils import *
 from styletts2.Utils.PLBERT.util import load_plbert
 
 from flasktts.config import Config
+from flasktts.tts import memory
+from flasktts.tts.audio import WavWriter
+from flasktts.tts.device import device_lock, select_device
+from flasktts.tts.lookahead import prefetch
+from flasktts.tts.optimize import InferenceOptimizer
+from flasktts.tts.segment import segment_text
+from flasktts.tts.session import SynthesisSession
+from flasktts.tts.timestamps import Timeline, duration_words
+
+# PL-BERT accepts 512 positions; this includes the start token.
+MAX_TOKENS = 512
+# Chunk sizes in characters. Phonemes run slightly longer than the text, so
+# these stay well inside MAX_TOKENS; chunks that still don't fit are split.
+CHUNK_TARGET_CHARS = 200
+CHUNK_MAX_CHARS = 300
+# Token ids of TextCleaner's punctuation, the space last; 0 is the padding
+PUNCTUATION_IDS = range(1, 17)
+SPACE_ID = 16
 
 
 class Style2TTSHighlander:
     _instance = None
+    _lock = threading.Lock()
 
     @classmethod
     def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = Style2TTS(Config.TTS_WORKDIR)
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = Style2TTS(Config.TTS_WORKDIR)
         return cls._instance
 
 
 class Style2TTS:
-    def __init__(self, output_dir: str, device: Optional[str] = None):
+    def __init__(
+        self,
+        output_dir: str,
+        device: Optional[str] = None,
+        optimize: Optional[str] = None,
+    ):
         """
         Initialize the Style2TTS model
 
         Args:
             output_dir (str): Output directory for generated audio files
             device (str, optional): Device to use for inference. Defaults to None for auto-detect.
+            optimize (str, optional): Inference optimizations, see flasktts.tts.optimize.
+                Defaults to Config.STYLE2TTS_OPTIMIZE.
         """
-        if device is not None:
-            self.device = device
-        elif torch.cuda.is_available():
-            self.device = torch.device("cuda")
-        elif torch.backends.mps.is_available():
-            self.device = torch.device("mps")
-        else:
-            self.device = torch.device("cpu")
+        self.device = select_device(device, allow_mps=True)
+        self.optimizer = InferenceOptimizer(
+            Config.STYLE2TTS_OPTIMIZE if optimize is None else optimize,
+            self.device,
+            engine="Style2TTS",
+        )
 
         print(f"Starting TTS: {self.device} {torch.__version__}")
         self.output_dir = output_dir
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
         self.textclenaer = TextCleaner()
+        # The espeak backend of phonemizer is not thread-safe
+        self.frontend_lock = threading.Lock()
         self.seed_init()
         self.load_models()
         # comply with the model license
@@ -67,7 +94,6 @@ class Style2TTS:
             b"VGhlIGZvbGxvd2luZyBpcyBiZWluZyByZWFkIGJ5IGFuIEFJIHZvaWNlLg=="
         ).decode("utf-8")
 
-        self.s_prev = None
         self.sample_rate = 24000
 
     def seed_init(self, seed=0):
@@ -138,6 +164,7 @@ class Style2TTS:
         #             except:
         #                 _load(params[key], model[key])
         _ = [self.model[key].eval() for key in self.model]
+        self.optimizer.optimize_styletts(self.model)
 
         self.sampler = DiffusionSampler(
             self.model.diffusion.diffusion,
@@ -179,27 +206,40 @@ class Style2TTS:
 
         return reference_embeddings
 
-    def long_form_inference(
-        self, text, s_prev, noise, alpha=0.7, diffusion_steps=10, embedding_scale=1.5
-    ):
-        """Long-form inference"""
+    def tokenize(self, text):
+        """Phonemize text and map it to model tokens, including the start token"""
         text = text.strip()
         text = text.replace('"', "")
-        ps = self.global_phonemizer.phonemize([text])
+        with self.frontend_lock:
+            ps = self.global_phonemizer.phonemize([text])
         ps = word_tokenize(ps[0])
         ps = " ".join(ps)
 
         tokens = self.textclenaer(ps)
 
         tokens.insert(0, 0)
+        return tokens
 
-        # Limit the number of tokens
-        if len(tokens) > 512 - 1:
-            tokens = tokens[:512]
-
+    def long_form_inference(
+        self,
+        tokens,
+        s_prev,
+        noise,
+        alpha=0.7,
+        diffusion_steps=10,
+        embedding_scale=1.5,
+        return_durations=False,
+    ):
+        """Long-form inference on at most MAX_TOKENS tokens from tokenize(),
+        also returning the predicted frames of each token with
+        return_durations"""
         tokens = torch.LongTensor(tokens).to(self.device).unsqueeze(0)
 
-        with torch.no_grad():
+        with (
+            device_lock(self.device),
+            memory.inference_peak(self.device),
+            self.optimizer.inference(),
+        ):
             input_lengths = torch.LongTensor([tokens.shape[-1]]).to(tokens.device)
             text_mask = self.length_to_mask(input_lengths).to(tokens.device)
 
@@ -245,51 +285,107 @@ class Style2TTS:
                 ref.squeeze().unsqueeze(0),
             )
 
+        if return_durations:
+            return out.squeeze().cpu().numpy(), s_pred, pred_dur.cpu().tolist()
         return out.squeeze().cpu().numpy(), s_pred
 
-    def tts_line(self, line, max_batch_size=500):
-        sentences = re.split("[?.,!]", line)  # simple split by comma
+    def tts_chunks(
+        self, chunks, session: SynthesisSession, timeline: Optional[Timeline] = None
+    ):
+        """Synthesize chunks in order, carrying the style from one to the next.
 
-        for text in sentences:
-            if text.strip() == "":
-                continue
-            text += "."  # add it back
-            noise = torch.randn(1, 1, 256).to(self.device)
+        The next chunks are tokenized on a background thread while the
+        current one is on the device, see flasktts.tts.lookahead.
+
+        Args:
+            chunks (Iterable[str]): Text chunks of one job
+            session (SynthesisSession): The job's style and random generator
+            timeline (Timeline, optional): Gets each chunk's sentences, and
+                its words timed by the durations the model predicted
+        """
+        for text, tokens in prefetch(self.chunk_tokens(chunks)):
+            noise = session.randn(1, 1, 256, device=self.device)
 
             sys.stdout.flush()
-            wav, self.s_prev = self.long_form_inference(text, self.s_prev, noise)
+            if timeline is None:
+                wav, session.style = self.long_form_inference(
+                    tokens, session.style, noise
+                )
+            else:
+                wav, session.style, durations = self.long_form_inference(
+                    tokens, session.style, noise, return_durations=True
+                )
+                seconds = len(wav) / self.sample_rate
+                words = token_words(text, tokens, durations, seconds)
+                timeline.add(text, seconds, words)
             yield wav
 
-    def synth_text(self, text: str, uuid: str) -> str:
+    def chunk_tokens(self, chunks):
+        """Text and tokens of each chunk, the text front end of tts_chunks.
+
+        A chunk whose phonemes exceed MAX_TOKENS is split further rather than
+        truncated, so no text is ever dropped.
+
+        Args:
+            chunks (Iterable[str]): Text chunks of one job
+        """
+        for chunk in chunks:
+            if chunk[-1] not in ".!?,;:":
+                chunk += "."  # the model ends sentences more naturally
+            yield from self._chunk_tokens(chunk)
+
+    def _chunk_tokens(self, chunk):
+        tokens = self.tokenize(chunk)
+        if len(tokens) > MAX_TOKENS:
+            # Split without adding periods, they'd give the pieces
+            # sentence-final prosody in the middle of a sentence
+            half = max(len(chunk) // 2, 1)
+            for piece in segment_text(chunk, half, half):
+                yield from self._chunk_tokens(piece)
+            return
+        yield chunk, tokens
+
+    def synth_text(
+        self,
+        text: str,
+        uuid: str,
+        writer=None,
+        timeline: Optional[Timeline] = None,
+    ) -> str:
         """Synthesize text to speech
 
         Args:
             text (str): Text to synthesize
             uuid (str): Unique identifier for the job
+            writer (WavWriter | Mp3Encoder, optional): Where the chunks go as
+                they are generated, left open. Defaults to a WAV file.
+            timeline (Timeline, optional): Collects the timestamps of the
+                sentences and words as they are generated, the preroll's
+                included
 
         Returns:
             str: Output path where the generated audio files
         """
 
-        output_path = os.path.join(self.output_dir, f"{uuid}.wav")
-        all_wavs = []
-
-        for i, line in enumerate(chain([self.preroll], text.splitlines())):
-            for wav in self.tts_line(line, i):
-                all_wavs.append(wav)
-
-        # Concatenate all the wavs into a single array
-        combined_wav = np.concatenate(all_wavs)
-        combined_wav = np.array(
-            combined_wav * 32767, dtype=np.int16
-        )  # Convert to 16-bit PCM
+        session = SynthesisSession(uuid)
+        if writer is None:
+            output = WavWriter(
+                os.path.join(self.output_dir, f"{uuid}.wav"), self.sample_rate
+            )
+        else:
+            output = nullcontext(writer)
 
-        # Write the combined wav to the output file
-        write(output_path, self.sample_rate, combined_wav)
+        # Each chunk goes to the writer as soon as it is generated
+        chunks = segment_text(text, CHUNK_TARGET_CHARS, CHUNK_MAX_CHARS)
+        with output as writer:
+            for wav in self.tts_chunks(
+                chain([self.preroll], chunks), session, timeline
+            ):
+                writer.write(wav, self.sample_rate)
 
-        print(f"TTS completed for {uuid}, output saved to {output_path}")
+        print(f"TTS completed for {uuid}, output saved to {writer.path}")
 
-        return output_path
+        return writer.path
 
     def cleanup(self, task_id=None):
         """Remove all files from the output directory"""
@@ -302,6 +398,40 @@ class Style2TTS:
                 os.remove(os.path.join(self.output_dir, file))
 
 
+def token_words(
+    text: str, tokens: list, durations: list, seconds: float
+) -> Optional[list]:
+    """Words of a chunk with their start and end seconds
+
+    The phonemes of each word are the tokens between spaces and punctuation,
+    timed by the frames the model predicted for them, scaled to the chunk's
+    seconds of audio.
+
+    Args:
+        text (str): The chunk's text
+        tokens (list): Its tokens from tokenize
+        durations (list): Frames of each token
+        seconds (float): Seconds of audio generated for it
+
+    Returns:
+        list: (word, start, end) of each word, None if the phonemizer didn't
+        pronounce the text one group of phonemes per word, as for numbers
+    """
+    scale = seconds / max(sum(durations), 1)
+    groups, start, frame = [], None, 0
+    for token, frames in zip(tokens, durations):
+        if token != 0 and token not in PUNCTUATION_IDS:
+            if start is None:
+                start = frame
+        elif start is not None:
+            groups.append((start * scale, frame * scale))
+            start = None
+        frame += frames
+    if start is not None:
+        groups.append((start * scale, frame * scale))
+    return duration_words(text.replace('"', ""), groups)
+
+
 if __name__ == "__main__":
     tts = Style2TTS("test_output")
     text = "This is a test of the TTS system. It should work well. Let's see how it goes. I hope it works. I really do."
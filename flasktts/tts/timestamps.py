@@ -0,0 +1,139 @@
+"""Sentence and word timestamps of a job's audio.
+
+Engines generate a job chunk by chunk and know each chunk's text and how
+much audio it made, and Kokoro and Style2TTS predict a duration for every
+phoneme on the way. A Timeline collects that while the audio is generated,
+so the alignment costs no inference of its own: words get the time of their
+phonemes where the engine predicts durations, and sentences span their
+words, or a share of their chunk proportional to their length where no
+words are known. The job stores it as a small JSON sidecar of its audio.
+
+    {"version": 1, "duration": 4.2,
+     "sentences": [{"text": "Hello world.", "start": 0.0, "end": 1.1}, ...],
+     "words": [["Hello", 0.0, 0.41], ["world", 0.45, 1.1], ...]}
+"""
+
+import json
+import re
+from typing import List, Optional, Tuple
+
+from flasktts.tts.segment import split_sentences
+
+# A word as the timestamps count them, a contraction being one
+WORD = re.compile(r"\w+(?:['’]\w+)*")
+# Text ending a sentence, a chunk not ending with it continues in the next
+_SENTENCE_END = re.compile(r"[.!?…]+[\"'”’)\]]*$")
+
+Word = Tuple[str, float, float]
+
+
+class Timeline:
+    """Offsets of the sentences and words of a job's audio, appended chunk
+    by chunk as the engine generates it"""
+
+    def __init__(self):
+        self.sentences: List[list] = []  # [text, start, end]
+        self.words: List[list] = []  # [text, start, end]
+        self.duration = 0.0
+        # The last sentence continues in the next chunk
+        self._open = False
+
+    def add(self, text: str, seconds: float, words: Optional[List[Word]] = None):
+        """Append a chunk of the audio
+
+        Args:
+            text (str): The chunk's text
+            seconds (float): Seconds of audio generated for it
+            words (List[Word], optional): Its words with their start and end
+                seconds from the start of the chunk, for engines that know
+                them
+        """
+        start = self.duration
+        self.duration += seconds
+        sentences = split_sentences(text.strip())
+        if words:
+            self.words.extend([word, start + s, start + e] for word, s, e in words)
+        spans = _word_spans(sentences, words) or _length_spans(sentences, seconds)
+        for sentence, (s, e) in zip(sentences, spans):
+            if self._open and self.sentences:
+                # A sentence split between chunks is one sentence
+                self.sentences[-1][0] += f" {sentence}"
+                self.sentences[-1][2] = start + e
+            else:
+                self.sentences.append([sentence, start + s, start + e])
+            self._open = False
+        if sentences:
+            self._open = not _SENTENCE_END.search(sentences[-1])
+
+    def to_dict(self, tempo: float = 1.0) -> dict:
+        """The JSON index, in milliseconds precision
+
+        Args:
+            tempo (float, optional): Speech rate applied to the audio after
+                generation, which scales every offset. Defaults to 1.0.
+        """
+
+        def at(seconds):
+            return round(seconds / tempo, 3)
+
+        return {
+            "version": 1,
+            "duration": at(self.duration),
+            "sentences": [
+                {"text": text, "start": at(s), "end": at(e)}
+                for text, s, e in self.sentences
+            ],
+            "words": [[text, at(s), at(e)] for text, s, e in self.words],
+        }
+
+    def save(self, path: str, tempo: float = 1.0):
+        """Write the JSON index to path, see to_dict"""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(tempo), f, ensure_ascii=False, separators=(",", ":"))
+
+
+def _word_spans(
+    sentences: List[str], words: Optional[List[Word]]
+) -> Optional[List[Tuple[float, float]]]:
+    """Each sentence from its first word's start to its last word's end,
+    None unless the words are exactly those of the sentences"""
+    if not words:
+        return None
+    counts = [len(WORD.findall(sentence)) for sentence in sentences]
+    if 0 in counts or sum(counts) != len(words):
+        return None
+    spans, first = [], 0
+    for count in counts:
+        last = first + count - 1
+        spans.append((words[first][1], words[last][2]))
+        first = last + 1
+    return spans
+
+
+def _length_spans(sentences: List[str], seconds: float) -> List[Tuple[float, float]]:
+    """The chunk's seconds shared between its sentences by their length"""
+    lengths = [len(sentence) + 1 for sentence in sentences]
+    total = sum(lengths)
+    spans, start = [], 0.0
+    for length in lengths:
+        end = start + seconds * length / total
+        spans.append((start, end))
+        start = end
+    return spans
+
+
+def duration_words(
+    text: str, groups: List[Tuple[float, float]]
+) -> Optional[List[Word]]:
+    """Words of text timed by the phoneme groups an engine pronounced them
+    as, None if the groups aren't one per word
+
+    Args:
+        text (str): Text of a chunk
+        groups (List[Tuple[float, float]]): Start and end seconds of each
+            spoken word's phonemes, in order
+    """
+    words = WORD.findall(text)
+    if not words or len(words) != len(groups):
+        return None
+    return [(word, start, end) for word, (start, end) in zip(words, groups)]
@@ -0,0 +1,225 @@
+"""Kokoro voice blends and named voices.
+
+A Kokoro voice is a pack of style vectors, and a weighted mix of presets'
+packs is a voice of its own: "af_heart:0.7,af_bella:0.3". A recipe is
+normalized (presets sorted, duplicates merged, weights summing to 1) so the
+same mix always has the same key, which is how jobs are told apart for
+batching and estimates and how the engine caches the blended pack:
+VoiceCache keeps the most recently used ones and can save them to disk,
+rather than mixing the packs again for every job. NamedVoices gives a
+recipe a name clients use as their voice, resolved when a job is submitted.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import torch
+
+# Kokoro's presets: language and gender letters, then the name (af_heart)
+PRESET = re.compile(r"[a-z]{2}_[a-z0-9_]+")
+# Names of named voices, which may not look like a preset
+NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,63}")
+
+
+def is_blend(voice: Optional[str]) -> bool:
+    """Whether voice is a recipe rather than a single voice"""
+    return bool(voice) and ("," in voice or ":" in voice)
+
+
+def components(recipe: str) -> list[tuple[str, float]]:
+    """Presets and weights of a recipe, normalized
+
+    Args:
+        recipe (str): Comma separated presets, each with an optional weight
+            after a colon (1 if missing), e.g. "af_heart:0.7,af_bella:0.3"
+
+    Raises:
+        ValueError: If the recipe is malformed
+
+    Returns:
+        list[tuple[str, float]]: Presets in order with weights summing to 1,
+        rounded to 4 significant digits
+    """
+    weights = {}
+    for part in recipe.split(","):
+        preset, _, weight = part.strip().partition(":")
+        preset = preset.strip()
+        if not PRESET.fullmatch(preset):
+            raise ValueError(f"'{preset}' is not a Kokoro voice, e.g. af_heart")
+        try:
+            value = float(weight) if weight.strip() else 1.0
+        except ValueError:
+            raise ValueError(f"Weight of {preset} is not a number: '{weight}'")
+        if not math.isfinite(value) or value <= 0:
+            raise ValueError(f"Weight of {preset} must be positive")
+        weights[preset] = weights.get(preset, 0.0) + value
+    total = sum(weights.values())
+    return [
+        (preset, float(f"{weights[preset] / total:.4g}")) for preset in sorted(weights)
+    ]
+
+
+def normalize(recipe: str) -> str:
+    """The key of a recipe, the same for every spelling of the same mix.
+    A recipe of one preset is that preset.
+
+    Raises:
+        ValueError: If the recipe is malformed
+    """
+    parts = components(recipe)
+    if len(parts) == 1:
+        return parts[0][0]
+    return ",".join(f"{preset}:{weight:g}" for preset, weight in parts)
+
+
+class VoiceCache:
+    """Blended voice packs, the most recently used kept in memory.
+
+    Not thread-safe, the engine calls it under its front end lock.
+    """
+
+    def __init__(
+        self, load_preset: Callable, size: int, directory: Optional[str] = None
+    ):
+        """
+        Args:
+            load_preset (Callable): Voice pack of a preset name, e.g.
+                KPipeline.load_single_voice
+            size (int): Blends kept in memory
+            directory (str, optional): Where blends are saved and looked up
+                before mixing them again, None to keep them in memory only
+        """
+        self.load_preset = load_preset
+        self.size = size
+        self.directory = directory
+        self._packs: OrderedDict[str, torch.Tensor] = OrderedDict()
+
+    def get(self, recipe: str) -> torch.Tensor:
+        """Voice pack of a recipe, blended on first use
+
+        Raises:
+            ValueError: If the recipe is malformed
+        """
+        key = normalize(recipe)
+        pack = self._packs.get(key)
+        if pack is not None:
+            self._packs.move_to_end(key)
+            return pack
+        pack = self._load(key)
+        if pack is None:
+            pack = self.blend(key)
+            self._save(key, pack)
+        self._packs[key] = pack
+        if len(self._packs) > self.size:
+            self._packs.popitem(last=False)
+        return pack
+
+    def blend(self, key: str) -> torch.Tensor:
+        """Weighted sum of the presets' packs"""
+        return sum(
+            weight * self.load_preset(preset) for preset, weight in components(key)
+        )
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{digest}.pt")
+
+    def _load(self, key: str) -> Optional[torch.Tensor]:
+        if not self.directory or not os.path.exists(self._path(key)):
+            return None
+        saved = torch.load(self._path(key), weights_only=True)
+        # A digest collision would be another recipe
+        return saved["pack"] if saved.get("recipe") == key else None
+
+    def _save(self, key: str, pack: torch.Tensor):
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        torch.save({"recipe": key, "pack": pack}, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+
+class NamedVoices:
+    """Recipes saved under a name, a JSON file each in a directory of the
+    API's. Workers only see recipes, the API resolves names on submission."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    def define(self, name: str, recipe: str) -> str:
+        """Save a recipe under name, replacing the voice of that name
+
+        Raises:
+            ValueError: If the name or the recipe is invalid
+
+        Returns:
+            str: The normalized recipe
+        """
+        if not NAME.fullmatch(name) or PRESET.fullmatch(name):
+            raise ValueError(
+                f"Invalid voice name '{name}': letters, digits, '-' and '_', "
+                "not a Kokoro voice name"
+            )
+        recipe = normalize(recipe)
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            with open(f"{self._path(name)}.tmp", "w") as f:
+                json.dump({"name": name, "recipe": recipe}, f)
+            os.replace(f"{self._path(name)}.tmp", self._path(name))
+        return recipe
+
+    def recipe(self, name: str) -> Optional[str]:
+        """Recipe of a named voice, None if there is none of that name"""
+        if not NAME.fullmatch(name) or PRESET.fullmatch(name):
+            return None
+        try:
+            with open(self._path(name)) as f:
+                return json.load(f)["recipe"]
+        except FileNotFoundError:
+            return None
+
+    def all(self) -> dict[str, str]:
+        """Recipes of every named voice by name"""
+        if not os.path.isdir(self.directory):
+            return {}
+        names = sorted(
+            entry[: -len(".json")]
+            for entry in os.listdir(self.directory)
+            if entry.endswith(".json")
+        )
+        recipes = {name: self.recipe(name) for name in names}
+        return {name: recipe for name, recipe in recipes.items() if recipe}
+
+    def delete(self, name: str) -> bool:
+        """Delete a named voice, False if there is none of that name"""
+        if not NAME.fullmatch(name):
+            return False
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def resolve(self, voice: Optional[str]) -> Optional[str]:
+        """The voice the engine is given for a request's voice: a named
+        voice's recipe, a recipe normalized, anything else unchanged
+
+        Raises:
+            ValueError: If voice is a malformed recipe
+        """
+        if not voice:
+            return voice
+        if is_blend(voice):
+            return normalize(voice)
+        return self.recipe(voice) or voice
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Start one Huey consumer per compute device.
+
+Each consumer is pinned to its device and loads its own model replicas. All
+consumers pull from the same queue, so whichever device is idle picks up the
+next job. See flasktts.consumer for how many jobs a consumer runs at a time.
+
+    python -m flasktts.worker
+"""
+
+import os
+import signal
+import subprocess
+import sys
+
+from flasktts.tts.device import device_worker_name, worker_devices
+
+
+def worker_env(device: str, speak: bool = True) -> dict:
+    """Environment of the consumer pinned to a device.
+
+    CUDA devices are pinned with CUDA_VISIBLE_DEVICES so that libraries which
+    allocate on the "current" device can't spill onto another card. Without
+    speak, the consumer leaves POST /tts/speak to another one.
+    """
+    env = os.environ.copy()
+    env["WORKER_NAME"] = device_worker_name(device)
+    if not speak:
+        env["SPEAK_PORT"] = "0"
+    if device.startswith("cuda:"):
+        index = int(device.split(":", 1)[1])
+        visible = os.environ.get("CUDA_VISIBLE_DEVICES")
+        if visible:
+            index = visible.split(",")[index].strip()
+        env["CUDA_VISIBLE_DEVICES"] = str(index)
+        env["TTS_DEVICE"] = "cuda"
+    else:
+        env["TTS_DEVICE"] = device
+    return env
+
+
+def main() -> int:
+    consumers = []
+    for index, device in enumerate(worker_devices()):
+        print(f"Starting worker {device_worker_name(device)} on {device}")
+        consumers.append(
+            subprocess.Popen(
+                [sys.executable, "-m", "flasktts.consumer"],
+                # The first consumer alone serves POST /tts/speak
+                env=worker_env(device, speak=index == 0),
+            )
+        )
+
+    def stop(signum=signal.SIGTERM, frame=None):
+        for consumer in consumers:
+            if consumer.poll() is None:
+                consumer.send_signal(signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    # Exit as soon as any consumer dies so the restart policy brings us back up
+    _, status = os.wait()
+    stop()
+    for consumer in consumers:
+        consumer.wait()
+    return os.waitstatus_to_exitcode(status)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,13 @@
-from unittest.mock import MagicMock, patch
+import io
+import json
+import urllib.error
+from unittest.mock import patch
 
 import pytest
 from flask import Response
-from huey.api import Result
 
-
-def create_mock_result(mock_huey, job_id="test-job-id"):
-    task = MagicMock()
-    task.id = job_id
-    result = Result(mock_huey, task)
-    return result
+from flasktts.config import Config
+from flasktts.tts.voices import NamedVoices
 
 
 @pytest.fixture
@@ -18,26 +16,76 @@ def client(app):
 
 
 @pytest.fixture
-def mock_huey():
+def mock_jobs():
+    with patch("flasktts.app.tts.jobs") as mock:
+        mock.statuses.return_value = {}
+        mock.document.return_value = None
+        mock.job.return_value = None
+        yield mock
+
+
+@pytest.fixture
+def mock_huey(mock_jobs):
     with patch("flasktts.tasks.tasks.huey") as mock:
         mock.pending.return_value = []
         mock.all_results.return_value = {}
-        yield mock
+        with patch("flasktts.app.tts.huey", mock):
+            yield mock
 
 
 class TestTextToSpeechJob:
-    def test_create_tts_job_success(self, client, mock_huey):
+    def test_create_tts_job_success(self, client, mock_huey, mock_jobs):
         # Arrange
-        mock_result = create_mock_result(mock_huey)
-        with patch("flasktts.app.tts.style2_tts_task", return_value=mock_result):
-            # Act
-            response = client.post(
-                "/tts/synthesize", json={"text": "Test text", "model": "style2tts"}
-            )
-            print(response)
-            # Assert
-            assert response.status_code == 202
-            assert response.json == {"job_id": "test-job-id"}
+        mock_jobs.enqueue.return_value = ["test-job-id"]
+
+        # Act
+        response = client.post(
+            "/tts/synthesize", json={"text": "Test text", "model": "style2tts"}
+        )
+
+        # Assert
+        assert response.status_code == 202
+        assert response.json == {
+            "job_id": "test-job-id",
+            "estimated_start": None,
+            "estimated_completion": None,
+        }
+        _, signatures = mock_jobs.enqueue.call_args.args
+        assert [signature[1:] for signature in signatures] == [("style2tts", None, 9)]
+
+    def test_create_tts_job_invalid_model(self, client, mock_jobs):
+        # Act
+        response = client.post("/tts/synthesize", json={"text": "Hi", "model": "x"})
+
+        # Assert
+        assert response.status_code == 400
+        mock_jobs.enqueue.assert_not_called()
+
+    def test_create_tts_job_rate(self, client, mock_huey, mock_jobs):
+        # Arrange
+        mock_jobs.enqueue.return_value = ["test-job-id"]
+
+        # Act
+        response = client.post(
+            "/tts/synthesize",
+            json={"text": "Hi", "model": "kokoro", "voice": "af_heart", "rate": 1.5},
+        )
+
+        # Assert
+        assert response.status_code == 202
+        _, [(task, *_)] = mock_jobs.enqueue.call_args.args
+        assert task.args == ("Hi", "af_heart", 1.5)
+
+    @pytest.mark.parametrize("rate", [0.1, 3, "fast", True])
+    def test_create_tts_job_invalid_rate(self, client, mock_jobs, rate):
+        # Act
+        response = client.post(
+            "/tts/synthesize", json={"text": "Hi", "model": "qwen3", "rate": rate}
+        )
+
+        # Assert
+        assert response.status_code == 400
+        mock_jobs.enqueue.assert_not_called()
 
     def test_create_tts_job_missing_text(self, client):
         # Act
@@ -47,7 +95,423 @@ class TestTextToSpeechJob:
         assert response.status_code == 400
 
 
+class TestTextToSpeechBatch:
+    def test_create_batch_success(self, client, mock_jobs):
+        # Arrange
+        mock_jobs.enqueue.return_value = ["job-1", "job-2"]
+
+        # Act
+        response = client.post(
+            "/tts/synthesize/batch",
+            json={
+                "jobs": [
+                    {"text": "First", "model": "style2tts"},
+                    {"text": "Second", "model": "kokoro", "voice": "af_heart"},
+                ]
+            },
+        )
+
+        # Assert
+        assert response.status_code == 202
+        assert response.json == {"job_ids": ["job-1", "job-2"]}
+        mock_jobs.enqueue.assert_called_once()
+        _, signatures = mock_jobs.enqueue.call_args.args
+        assert [signature[1:] for signature in signatures] == [
+            ("style2tts", None, 5),
+            ("kokoro", "af_heart", 6),
+        ]
+
+    def test_create_batch_rejects_invalid_job(self, client, mock_jobs):
+        # Act
+        response = client.post(
+            "/tts/synthesize/batch",
+            json={"jobs": [{"text": "Fine", "model": "qwen3"}, {"text": ""}]},
+        )
+
+        # Assert
+        assert response.status_code == 400
+        mock_jobs.enqueue.assert_not_called()
+
+    def test_create_batch_missing_jobs(self, client, mock_jobs):
+        # Act
+        response = client.post("/tts/synthesize/batch", json={"jobs": []})
+
+        # Assert
+        assert response.status_code == 400
+
+
+class TestTextToSpeechAdmission:
+    @pytest.fixture
+    def queued(self, mock_jobs):
+        # 900 characters of client-a queued, at 0.1 s/char and RTF 1
+        mock_jobs.rates.return_value = {
+            ("kokoro", "af_heart"): {"audio_per_char": 0.1, "rtf": 1.0, "samples": 5}
+        }
+        mock_jobs.pending_characters.return_value = {("kokoro", "af_heart"): 900}
+        mock_jobs.running_jobs.return_value = []
+        mock_jobs.enqueue.return_value = ["job-1"]
+        return mock_jobs
+
+    def test_over_client_limit_is_rejected(self, client, queued):
+        # Act
+        with patch.object(Config, "CLIENT_MAX_CHARS", 1000):
+            response = client.post(
+                "/tts/synthesize",
+                json={"text": "x" * 200, "model": "kokoro", "voice": "af_heart"},
+                headers={"X-Client-Id": "client-a"},
+            )
+
+        # Assert
+        assert response.status_code == 429
+        # 100 characters too many, 10 seconds of work at the queued pace
+        assert response.headers["Retry-After"] == "10"
+        assert "client client-a" in response.json["message"]
+        queued.enqueue.assert_not_called()
+        queued.pending_characters.assert_called_with(client="client-a")
+
+    def test_within_limits_records_client(self, client, queued):
+        # Act
+        with (
+            patch.object(Config, "CLIENT_MAX_CHARS", 1000),
+            patch.object(Config, "QUEUE_MAX_SECONDS", 100),
+        ):
+            response = client.post(
+                "/tts/synthesize",
+                json={"text": "x" * 50, "model": "kokoro", "voice": "af_heart"},
+                headers={"X-Client-Id": "client-a"},
+            )
+
+        # Assert
+        assert response.status_code == 202
+        assert queued.enqueue.call_args.kwargs == {"client": "client-a"}
+
+    def test_request_over_limit_on_its_own(self, client, queued):
+        # Act
+        with patch.object(Config, "QUEUE_MAX_SECONDS", 10):
+            response = client.post(
+                "/tts/synthesize/batch",
+                json={"jobs": [{"text": "x" * 200, "model": "kokoro"}]},
+            )
+
+        # Assert
+        assert response.status_code == 413
+        assert "Retry-After" not in response.headers
+        queued.enqueue.assert_not_called()
+
+    def test_backlog(self, client, queued):
+        # Act
+        with patch.object(Config, "QUEUE_MAX_CHARS", 5000):
+            response = client.get("/tts/backlog", headers={"X-Client-Id": "feed"})
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json == {
+            "queue": {
+                "characters": 900,
+                "seconds": pytest.approx(90.0),
+                "max_characters": 5000,
+                "max_seconds": 0.0,
+            },
+            "client": {
+                "id": "feed",
+                "characters": 900,
+                "seconds": pytest.approx(90.0),
+                "max_characters": 0,
+                "max_seconds": 0.0,
+            },
+        }
+
+
+class TestTextToSpeechSpeak:
+    @pytest.fixture
+    def speak_url(self):
+        with patch.object(Config, "SPEAK_URL", "http://speak-worker/speak"):
+            yield
+
+    @pytest.fixture
+    def mock_urlopen(self, speak_url):
+        with patch("flasktts.app.tts.urllib.request.urlopen") as mock:
+            reply = mock.return_value.__enter__.return_value
+            reply.read.return_value = b"RIFF...."
+            reply.headers.get_content_type.return_value = "audio/wav"
+            yield mock
+
+    def test_speak_returns_audio(self, client, mock_urlopen, mock_jobs):
+        # Act
+        response = client.post(
+            "/tts/speak", json={"text": "Order ready.", "voice": "af_bella"}
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.mimetype == "audio/wav"
+        assert response.data == b"RIFF...."
+        forward = mock_urlopen.call_args.args[0]
+        assert forward.full_url == "http://speak-worker/speak"
+        assert json.loads(forward.data) == {
+            "text": "Order ready.",
+            "voice": "af_bella",
+            "rate": 1.0,
+            "format": "wav",
+        }
+        mock_jobs.enqueue.assert_not_called()
+
+    def test_speak_rejects_long_text(self, client, mock_urlopen):
+        with patch.object(Config, "SPEAK_MAX_CHARS", 10):
+            response = client.post("/tts/speak", json={"text": "x" * 11})
+
+        assert response.status_code == 413
+        mock_urlopen.assert_not_called()
+
+    def test_speak_rejects_invalid_format(self, client, mock_urlopen):
+        response = client.post("/tts/speak", json={"text": "Hi", "format": "ogg"})
+
+        assert response.status_code == 400
+        mock_urlopen.assert_not_called()
+
+    def test_speak_disabled(self, client):
+        with patch.object(Config, "SPEAK_URL", ""):
+            response = client.post("/tts/speak", json={"text": "Hi"})
+
+        assert response.status_code == 503
+
+    def test_speak_worker_down(self, client, mock_urlopen):
+        # Arrange
+        mock_urlopen.side_effect = urllib.error.URLError(ConnectionRefusedError())
+
+        # Act
+        response = client.post("/tts/speak", json={"text": "Hi"})
+
+        # Assert
+        assert response.status_code == 503
+
+    def test_speak_worker_error_is_relayed(self, client, mock_urlopen):
+        # Arrange
+        mock_urlopen.side_effect = urllib.error.HTTPError(
+            "http://speak-worker/speak",
+            500,
+            "Internal Server Error",
+            {},
+            io.BytesIO(b"Synthesis failed: unknown voice"),
+        )
+
+        # Act
+        response = client.post("/tts/speak", json={"text": "Hi", "voice": "zz"})
+
+        # Assert
+        assert response.status_code == 500
+        assert response.json["message"] == "Synthesis failed: unknown voice"
+
+
+class TestTextToSpeechVoices:
+    @pytest.fixture
+    def named(self, tmp_path):
+        named = NamedVoices(str(tmp_path))
+        with patch("flasktts.app.tts.named_voices", named):
+            yield named
+
+    def test_define_and_use_named_voice(self, client, named, mock_jobs):
+        # Arrange
+        mock_jobs.enqueue.return_value = ["test-job-id"]
+
+        # Act
+        defined = client.put(
+            "/tts/voices/narrator", json={"recipe": "af_heart:7,af_bella:3"}
+        )
+        submitted = client.post(
+            "/tts/synthesize",
+            json={"text": "Chapter one.", "model": "kokoro", "voice": "narrator"},
+        )
+
+        # Assert
+        assert defined.status_code == 200
+        assert defined.json == {
+            "name": "narrator",
+            "recipe": "af_bella:0.3,af_heart:0.7",
+        }
+        assert submitted.status_code == 202
+        _, signatures = mock_jobs.enqueue.call_args.args
+        assert signatures[0][1:] == ("kokoro", "af_bella:0.3,af_heart:0.7", 12)
+        assert client.get("/tts/voices").json == {"voices": [defined.json]}
+
+    def test_invalid_recipe(self, client, named, mock_jobs):
+        # Act
+        defined = client.put("/tts/voices/narrator", json={"recipe": "af_heart:x"})
+        submitted = client.post(
+            "/tts/synthesize",
+            json={"text": "Hi", "model": "kokoro", "voice": "af_heart:-1,af_bella"},
+        )
+
+        # Assert
+        assert defined.status_code == 400
+        assert submitted.status_code == 400
+        mock_jobs.enqueue.assert_not_called()
+
+    def test_delete_voice(self, client, named):
+        named.define("narrator", "af_heart,af_bella")
+
+        assert client.delete("/tts/voices/narrator").status_code == 204
+        assert client.get("/tts/voices/narrator").status_code == 404
+        assert client.delete("/tts/voices/narrator").status_code == 404
+
+
+class TestTextToSpeechDocument:
+    def test_create_document(self, client, mock_jobs):
+        # Arrange
+        mock_jobs.enqueue_document.return_value = ["chapter-1", "chapter-2"]
+        document = b"# One\n\nFirst.\n\n# Two\n\nSecond.\n"
+
+        # Act
+        response = client.post(
+            "/tts/documents",
+            data={
+                "file": (io.BytesIO(document), "book.md"),
+                "model": "kokoro",
+                "voice": "af_heart",
+                "rate": "1.2",
+            },
+            content_type="multipart/form-data",
+        )
+
+        # Assert
+        assert response.status_code == 202
+        assert response.json["chapter_ids"] == ["chapter-1", "chapter-2"]
+        _, document_id, signatures, titles = mock_jobs.enqueue_document.call_args.args
+        assert response.json["job_id"] == document_id
+        assert titles == ["One", "Two"]
+        assert [task.args for task, *_ in signatures] == [
+            ("One\nFirst.", "af_heart", 1.2),
+            ("Two\nSecond.", "af_heart", 1.2),
+        ]
+
+    def test_create_document_unknown_format(self, client, mock_jobs):
+        # Act
+        response = client.post(
+            "/tts/documents",
+            data={"file": (io.BytesIO(b"text"), "book.bin")},
+            content_type="multipart/form-data",
+        )
+
+        # Assert
+        assert response.status_code == 400
+        mock_jobs.enqueue_document.assert_not_called()
+
+    def test_create_document_without_text(self, client, mock_jobs):
+        # Act
+        response = client.post(
+            "/tts/documents",
+            data={"file": (io.BytesIO(b"<p> </p>"), "page.html")},
+            content_type="multipart/form-data",
+        )
+
+        # Assert
+        assert response.status_code == 400
+
+    def test_get_document(self, client, mock_jobs):
+        # Arrange
+        mock_jobs.document.return_value = {
+            "job_id": "doc-1",
+            "status": "RUNNING",
+            "chapters": 2,
+            "chapters_done": 1,
+            "chapter_jobs": [
+                {"job_id": "chapter-1", "status": "COMPLETED", "title": "One"},
+                {"job_id": "chapter-2", "status": "RUNNING", "title": "Two"},
+            ],
+        }
+
+        # Act
+        response = client.get("/tts/documents/doc-1")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json["chapters_done"] == 1
+        assert response.json["chapter_jobs"][1]["title"] == "Two"
+
+    def test_get_unknown_document(self, client, mock_jobs):
+        # Act
+        response = client.get("/tts/documents/missing")
+
+        # Assert
+        assert response.status_code == 404
+
+
+class TestTextToSpeechStatuses:
+    def test_get_statuses(self, client, mock_huey, mock_jobs):
+        # Arrange
+        mock_jobs.statuses.return_value = {
+            "job-1": "COMPLETED",
+            "job-2": "RUNNING",
+        }
+        # Enqueued before the job index existed
+        mock_huey.pending.return_value = ["job-3"]
+
+        # Act
+        response = client.post(
+            "/tts/jobs/status",
+            json={"job_ids": ["job-1", "job-2", "job-3", "job-4"]},
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json == {
+            "jobs": [
+                {"job_id": "job-1", "status": "COMPLETED"},
+                {"job_id": "job-2", "status": "RUNNING"},
+                {"job_id": "job-3", "status": "PENDING"},
+                {"job_id": "job-4", "status": "NOT_FOUND"},
+            ]
+        }
+        mock_jobs.statuses.assert_called_once_with(["job-1", "job-2", "job-3", "job-4"])
+
+    def test_get_statuses_missing_ids(self, client, mock_jobs):
+        # Act
+        response = client.post("/tts/jobs/status", json={})
+
+        # Assert
+        assert response.status_code == 400
+
+
 class TestTextToSpeechStatus:
+    def test_get_job_status_indexed(self, client, mock_huey, mock_jobs):
+        # Arrange
+        mock_jobs.job.return_value = {
+            "job_id": "indexed-job",
+            "status": "COMPLETED",
+            "chapters": None,
+        }
+
+        # Act
+        response = client.get("/tts/jobs/indexed-job")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json == {
+            "status": "COMPLETED",
+            "estimated_start": None,
+            "estimated_completion": None,
+        }
+        mock_huey.all_results.assert_not_called()
+
+    def test_get_job_status_estimate(self, client, mock_huey, mock_jobs):
+        # Arrange
+        mock_jobs.job.return_value = {"job_id": "queued-job", "status": "PENDING"}
+
+        # Act
+        with patch(
+            "flasktts.app.tts.estimate_times", return_value=(100.0, 160.0)
+        ) as mock_estimate:
+            response = client.get("/tts/jobs/queued-job")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json == {
+            "status": "PENDING",
+            "estimated_start": 100.0,
+            "estimated_completion": 160.0,
+        }
+        mock_estimate.assert_called_once_with(mock_jobs, mock_jobs.job.return_value)
+
     def test_get_job_status_pending(self, client, mock_huey):
         # Arrange
         job_id = "pending-job"
@@ -57,7 +521,7 @@ class TestTextToSpeechStatus:
 
         # Assert
         assert response.status_code == 200
-        assert response.json == {"status": "PENDING"}
+        assert response.json["status"] == "PENDING"
 
     def test_get_job_status_completed(self, client, mock_huey):
         # Arrange
@@ -69,7 +533,7 @@ class TestTextToSpeechStatus:
 
         # Assert
         assert response.status_code == 200
-        assert response.json == {"status": "COMPLETED"}
+        assert response.json["status"] == "COMPLETED"
 
     def test_get_job_status_not_found(self, client, mock_huey):
         # Act
@@ -80,7 +544,7 @@ class TestTextToSpeechStatus:
 
 
 class TestTextToSpeechDownload:
-    def test_download_completed_job(self, client, mock_huey):
+    def test_download_completed_job(self, client, mock_huey, mock_jobs):
         # Arrange
         job_id = "completed-job"
         mock_audio = "fake audio data"
@@ -97,6 +561,7 @@ class TestTextToSpeechDownload:
         # Assert
         assert response.status_code == 200
         assert response.headers["Content-Type"] == "audio/mpeg"
+        mock_jobs.touch.assert_called_once_with(job_id)
 
     def test_download_nonexistent_job(self, client, mock_huey):
         # Act
@@ -107,25 +572,71 @@ class TestTextToSpeechDownload:
 
 
 class TestTextToSpeechJobs:
-    def test_get_all_jobs(self, client, mock_huey):
+    def test_get_all_jobs(self, client, mock_jobs):
         # Arrange
-        pending_task = MagicMock()
-        pending_task.id = "pending-job"
-        mock_huey.pending.return_value = [pending_task]
-        mock_huey.all_results.return_value = {"completed-job": "result"}
-        mock_huey.get.return_value = "result"
+        mock_jobs.list_jobs.return_value = (
+            [
+                {"job_id": "pending-job", "status": "PENDING", "model": "kokoro"},
+                {
+                    "job_id": "completed-job",
+                    "status": "COMPLETED",
+                    "model": "qwen3",
+                    "audio_seconds": 12.5,
+                    "output_bytes": 200000,
+                },
+            ],
+            None,
+        )
 
         # Act
         response = client.get("/tts/jobs")
 
         # Assert
         assert response.status_code == 200
-        assert response.json == {
-            "jobs": [
-                {"job_id": "pending-job", "status": "PENDING"},
-                {"job_id": "completed-job", "status": "COMPLETED"},
-            ]
-        }
+        assert [(j["job_id"], j["status"]) for j in response.json["jobs"]] == [
+            ("pending-job", "PENDING"),
+            ("completed-job", "COMPLETED"),
+        ]
+        assert response.json["jobs"][1]["audio_seconds"] == 12.5
+        assert response.json["next_cursor"] is None
+
+    def test_get_jobs_filtered_page(self, client, mock_jobs):
+        # Arrange
+        mock_jobs.list_jobs.return_value = ([], "next-page")
+
+        # Act
+        response = client.get(
+            "/tts/jobs?limit=10&cursor=abc&status=FAILED&model=kokoro"
+            "&created_after=1700000000"
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json == {"jobs": [], "next_cursor": "next-page"}
+        mock_jobs.list_jobs.assert_called_once_with(
+            10,
+            cursor="abc",
+            status="FAILED",
+            model="kokoro",
+            created_after=1700000000.0,
+        )
+
+    def test_get_jobs_invalid_filter(self, client, mock_jobs):
+        # Act
+        response = client.get("/tts/jobs?status=EXPLODED")
+
+        # Assert
+        assert response.status_code == 400
+
+    def test_get_jobs_invalid_cursor(self, client, mock_jobs):
+        # Arrange
+        mock_jobs.list_jobs.side_effect = ValueError("Invalid cursor: abc")
+
+        # Act
+        response = client.get("/tts/jobs?cursor=abc")
+
+        # Assert
+        assert response.status_code == 400
 
     def test_delete_all_jobs(self, client):
         # Arrange
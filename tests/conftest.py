@@ -6,5 +6,5 @@ from flasktts.app import create_app
 @pytest.fixture
 def app():
     app = create_app()
-    app.config['TESTING'] = True
+    app.config["TESTING"] = True
     return app
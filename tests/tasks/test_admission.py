@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from flasktts.tasks import admission
+from flasktts.tasks.admission import QueueFull, admit, workload
+
+RATES = {("kokoro", "af_heart"): {"audio_per_char": 0.1, "rtf": 1.0, "samples": 5}}
+
+
+def signature(characters):
+    return (None, "kokoro", "af_heart", characters)
+
+
+@pytest.fixture
+def index():
+    mock = MagicMock()
+    mock.rates.return_value = RATES
+    mock.pending_characters.side_effect = lambda client=None: {
+        ("kokoro", "af_heart"): 500 if client is None else 100
+    }
+    mock.running_jobs.return_value = [
+        {
+            "model": "kokoro",
+            "voice": "af_heart",
+            "characters": 100,
+            "started_at": 5.0,
+        }
+    ]
+    return mock
+
+
+def test_workload_counts_pending_and_running(index):
+    # Act
+    queued = workload(index, RATES, now=10.0)
+
+    # Assert
+    assert queued["characters"] == 600
+    # 50s pending, 10s running job started 5s ago
+    assert queued["seconds"] == pytest.approx(55.0)
+
+
+def test_no_limits_skip_the_index(index):
+    # Act
+    admit(index, [signature(10_000)], "feed")
+
+    # Assert
+    index.rates.assert_not_called()
+
+
+def test_client_limit(index):
+    # Act
+    with patch.object(admission.Config, "CLIENT_MAX_CHARS", 250):
+        admit(index, [signature(50)], "feed", now=10.0)
+        with pytest.raises(QueueFull) as raised:
+            admit(index, [signature(100)], "feed", now=10.0)
+
+    # Assert
+    # 50 characters over, at the pace of the client's 200 in 15s
+    assert raised.value.retry_after == 4
+
+
+def test_seconds_limit_in_total(index):
+    # Act
+    with (
+        patch.object(admission.Config, "QUEUE_MAX_SECONDS", 60),
+        patch.object(admission.Config, "ETA_WORKERS", 2),
+    ):
+        # 27.5s queued per worker, 10 characters add 0.5s
+        admit(index, [signature(10)] * 2, None, now=10.0)
+        with pytest.raises(QueueFull) as raised:
+            admit(index, [signature(1000)], None, now=10.0)
+
+    # Assert
+    assert raised.value.retry_after == 18
+
+
+def test_request_larger_than_limit(index):
+    # Act
+    with patch.object(admission.Config, "QUEUE_MAX_CHARS", 1000):
+        with pytest.raises(QueueFull) as raised:
+            admit(index, [signature(600)] * 2, "feed")
+
+    # Assert
+    assert raised.value.retry_after is None
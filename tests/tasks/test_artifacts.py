@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+from flasktts.tasks.artifacts import LocalArtifactStore, S3ArtifactStore
+
+
+@pytest.fixture
+def output_mp3(tmp_path):
+    workdir = tmp_path / "workdir"
+    workdir.mkdir()
+    path = workdir / "job-1.mp3"
+    path.write_bytes(b"fake audio data")
+    return str(path)
+
+
+class TestLocalArtifactStore:
+    def test_put_fetch_delete(self, tmp_path, output_mp3):
+        # Arrange
+        store = LocalArtifactStore(str(tmp_path / "artifacts"))
+
+        # Act
+        key = store.put(output_mp3)
+
+        # Assert
+        assert key == "jo/job-1.mp3"
+        assert not os.path.exists(output_mp3)
+        with open(store.fetch(key), "rb") as f:
+            assert f.read() == b"fake audio data"
+
+        store.delete(key)
+        assert not os.path.exists(store.fetch(key))
+
+    def test_put_into_workdir_shard(self, output_mp3):
+        # Arrange
+        workdir = os.path.dirname(output_mp3)
+        store = LocalArtifactStore(workdir)
+
+        # Act
+        key = store.put(output_mp3)
+
+        # Assert
+        assert store.fetch(key) == os.path.join(workdir, "jo", "job-1.mp3")
+        assert os.path.exists(store.fetch(key))
+
+    def test_flush_removes_shards(self, tmp_path, output_mp3):
+        # Arrange
+        store = LocalArtifactStore(str(tmp_path / "artifacts"))
+        store.put(output_mp3)
+        (tmp_path / "artifacts" / "legacy.mp3").write_bytes(b"old")
+
+        # Act
+        store.flush()
+
+        # Assert
+        assert os.listdir(store.root) == []
+
+    def test_fetch_legacy_flat_key(self, tmp_path):
+        store = LocalArtifactStore(str(tmp_path))
+        assert store.fetch("job-1.mp3") == str(tmp_path / "job-1.mp3")
+
+    def test_download(self, tmp_path, output_mp3):
+        # Arrange
+        store = LocalArtifactStore(str(tmp_path / "artifacts"))
+        key = store.put(output_mp3)
+
+        # Act
+        store.download(key, str(tmp_path / "copy.mp3"))
+
+        # Assert
+        assert (tmp_path / "copy.mp3").read_bytes() == b"fake audio data"
+        assert os.path.exists(store.fetch(key))
+
+    def test_fetch_legacy_absolute_path(self, tmp_path, output_mp3):
+        store = LocalArtifactStore(str(tmp_path / "artifacts"))
+        assert store.fetch(output_mp3) == output_mp3
+
+
+class TestS3ArtifactStore:
+    @pytest.fixture
+    def store(self, monkeypatch):
+        moto = pytest.importorskip("moto")
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+        monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        with moto.mock_aws():
+            store = S3ArtifactStore("flasktts-test", prefix="audio/")
+            store.client.create_bucket(Bucket="flasktts-test")
+            yield store
+
+    def test_put_fetch_delete(self, store, output_mp3):
+        # Act
+        key = store.put(output_mp3)
+
+        # Assert
+        assert key == "audio/job-1.mp3"
+        assert not os.path.exists(output_mp3)
+        assert store.fetch(key).read() == b"fake audio data"
+        store.download(key, output_mp3)
+        with open(output_mp3, "rb") as f:
+            assert f.read() == b"fake audio data"
+
+        store.delete(key)
+        listing = store.client.list_objects_v2(Bucket="flasktts-test")
+        assert listing["KeyCount"] == 0
+
+    def test_flush_keeps_foreign_objects(self, store, output_mp3):
+        # Arrange
+        store.put(output_mp3)
+        store.client.put_object(
+            Bucket="flasktts-test", Key="other-app/data.bin", Body=b"x"
+        )
+
+        # Act
+        store.flush()
+
+        # Assert
+        listing = store.client.list_objects_v2(Bucket="flasktts-test")
+        assert [obj["Key"] for obj in listing["Contents"]] == ["other-app/data.bin"]
+
+    def test_empty_prefix_is_rejected(self, store):
+        with pytest.raises(ValueError):
+            S3ArtifactStore("flasktts-test", prefix="")
@@ -0,0 +1,114 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from flasktts.tasks import estimate
+from flasktts.tasks.estimate import (
+    DEFAULT_AUDIO_PER_CHAR,
+    DEFAULT_RTF,
+    backlog_seconds,
+    estimate_times,
+    job_cost,
+)
+from flasktts.tasks.jobs import COMPLETED, PENDING, RUNNING
+
+RATES = {
+    ("kokoro", "af_heart"): {"audio_per_char": 0.1, "rtf": 0.5, "samples": 3},
+    ("kokoro", "am_adam"): {"audio_per_char": 0.2, "rtf": 1.0, "samples": 1},
+}
+
+
+@pytest.fixture
+def index():
+    mock = MagicMock()
+    mock.rates.return_value = RATES
+    mock.pending_characters.return_value = {}
+    mock.running_jobs.return_value = []
+    return mock
+
+
+def test_job_cost_of_known_voice():
+    assert job_cost(RATES, "kokoro", "af_heart", 100) == pytest.approx(5.0)
+
+
+def test_job_cost_falls_back_to_model_then_priors():
+    # Act
+    other_voice = job_cost(RATES, "kokoro", "bf_emma", 100)
+    unknown_model = job_cost(RATES, "qwen3", None, 100)
+
+    # Assert
+    # Sample-weighted: (3 * 0.1 + 0.2) / 4 chars, (3 * 0.5 + 1.0) / 4 RTF
+    assert other_voice == pytest.approx(100 * 0.125 * 0.625)
+    assert unknown_model == pytest.approx(
+        100 * DEFAULT_AUDIO_PER_CHAR * DEFAULT_RTF["qwen3"]
+    )
+
+
+def test_backlog_counts_pending_and_remaining_running(index):
+    # Arrange
+    index.pending_characters.return_value = {("kokoro", "af_heart"): 100}
+    index.running_jobs.return_value = [
+        # 5s job started 2s ago, 3s left
+        {"model": "kokoro", "voice": "af_heart", "characters": 100, "started_at": 8},
+        # Overdue job, nothing left
+        {"model": "kokoro", "voice": "af_heart", "characters": 100, "started_at": 0},
+    ]
+
+    # Act
+    with patch.object(estimate.Config, "ETA_WORKERS", 2):
+        seconds = backlog_seconds(index, RATES, before=5.0, now=10.0)
+
+    # Assert
+    assert seconds == pytest.approx((5.0 + 3.0) / 2)
+    index.pending_characters.assert_called_once_with(before=5.0)
+
+
+def test_estimate_pending_job(index):
+    # Arrange
+    index.pending_characters.return_value = {("kokoro", "am_adam"): 50}
+    job = {
+        "status": PENDING,
+        "model": "kokoro",
+        "voice": "af_heart",
+        "characters": 100,
+        "created_at": 5.0,
+        "chapters": None,
+    }
+
+    # Act
+    start, completion = estimate_times(index, job, now=10.0)
+
+    # Assert
+    assert start == pytest.approx(20.0)
+    assert completion == pytest.approx(25.0)
+
+
+def test_estimate_running_job(index):
+    # Arrange
+    job = {
+        "status": RUNNING,
+        "model": "kokoro",
+        "voice": "af_heart",
+        "characters": 100,
+        "started_at": 8.0,
+        "chapters": None,
+    }
+
+    # Act
+    on_time = estimate_times(index, job, now=10.0)
+    overdue = estimate_times(index, job, now=20.0)
+
+    # Assert
+    assert on_time == (8.0, pytest.approx(13.0))
+    assert overdue == (8.0, 20.0)
+
+
+def test_no_estimate_for_finished_jobs_and_documents(index):
+    # Arrange
+    finished = {"status": COMPLETED, "chapters": None}
+    document = {"status": PENDING, "chapters": 3}
+
+    # Act / Assert
+    assert estimate_times(index, finished) == (None, None)
+    assert estimate_times(index, document) == (None, None)
+    index.rates.assert_not_called()
@@ -0,0 +1,140 @@
+import io
+from unittest.mock import MagicMock, patch
+
+import ffmpeg
+import numpy as np
+import pytest
+
+from flasktts.tasks.ffmpeg import Mp3Encoder, convert_wav_to_mp3, probe_duration
+
+
+class FakeProcess:
+    """ffmpeg process of run_async: records stdin, fails if told to"""
+
+    def __init__(self, fail=False):
+        self.received = bytearray()
+        self.stdin = MagicMock()
+        self.stdin.write.side_effect = self._write
+        self.stderr = io.BytesIO(b"Invalid output" if fail else b"")
+        self.fail = fail
+        self.killed = False
+
+    def _write(self, data):
+        if self.fail:
+            raise BrokenPipeError()
+        self.received.extend(data)
+
+    def kill(self):
+        self.killed = True
+
+    def wait(self):
+        return 1 if self.fail or self.killed else 0
+
+
+def patch_ffmpeg(process):
+    """Patch ffmpeg.input so that the encoder's pipeline runs process"""
+    mock_input = patch("ffmpeg.input").start()
+    stream = mock_input.return_value
+    stream.filter.return_value = stream
+    output = stream.output.return_value.global_args.return_value
+    output.overwrite_output.return_value.run_async.return_value = process
+    return mock_input
+
+
+def test_probe_duration():
+    with patch("ffmpeg.probe", return_value={"format": {"duration": "12.5"}}):
+        assert probe_duration("out.mp3") == 12.5
+
+
+def test_probe_failure_returns_none():
+    with patch("ffmpeg.probe", side_effect=FileNotFoundError("ffprobe")):
+        assert probe_duration("out.mp3") is None
+    with patch("ffmpeg.probe", side_effect=ffmpeg.Error("ffprobe", b"", b"bad")):
+        assert probe_duration("out.mp3") is None
+
+
+def test_tempo_adds_atempo_filter(tmp_path):
+    # Arrange
+    wav = tmp_path / "job.wav"
+    wav.write_bytes(b"")
+
+    # Act
+    with patch("ffmpeg.input") as mock_input:
+        out = convert_wav_to_mp3(str(wav), tempo=1.5)
+
+    # Assert
+    mock_input.return_value.filter.assert_called_once_with("atempo", 1.5)
+    mock_input.return_value.filter.return_value.output.assert_called_once_with(
+        str(tmp_path / "job.mp3"), ac=1, ar=22050
+    )
+    assert out == str(tmp_path / "job.mp3")
+    assert not wav.exists()
+
+
+def test_default_tempo_has_no_filter(tmp_path):
+    # Arrange
+    wav = tmp_path / "job.wav"
+    wav.write_bytes(b"")
+
+    # Act
+    with patch("ffmpeg.input") as mock_input:
+        convert_wav_to_mp3(str(wav))
+
+    # Assert
+    mock_input.return_value.filter.assert_not_called()
+    mock_input.return_value.output.assert_called_once()
+
+
+@pytest.fixture
+def stop_patches():
+    yield
+    patch.stopall()
+
+
+def test_encoder_pipes_chunks_in_order(tmp_path, stop_patches):
+    # Arrange
+    process = FakeProcess()
+    mock_input = patch_ffmpeg(process)
+
+    # Act
+    with Mp3Encoder(str(tmp_path / "job.mp3"), tempo=1.25) as encoder:
+        encoder.write(np.array([0.5, -0.5]), 24000)
+        encoder.write(np.array([2.0]), 24000)
+
+    # Assert
+    mock_input.assert_called_once_with("pipe:", format="s16le", ac=1, ar=24000)
+    mock_input.return_value.filter.assert_called_once_with("atempo", 1.25)
+    pcm = np.frombuffer(bytes(process.received), dtype=np.int16)
+    assert pcm.tolist() == [16383, -16383, 32767]
+    process.stdin.close.assert_called_once()
+    assert encoder.duration == pytest.approx(3 / 24000)
+
+
+def test_encoder_failure_raises_ffmpeg_error(tmp_path, stop_patches):
+    # Arrange
+    patch_ffmpeg(FakeProcess(fail=True))
+    encoder = Mp3Encoder(str(tmp_path / "job.mp3"))
+    encoder.write(np.zeros(10), 24000)
+
+    # Act / Assert
+    with pytest.raises(ffmpeg.Error) as raised:
+        encoder.close()
+    assert raised.value.stderr == b"Invalid output"
+
+
+def test_encoder_aborts_on_exception(tmp_path, stop_patches):
+    # Arrange
+    process = FakeProcess()
+    patch_ffmpeg(process)
+    mp3 = tmp_path / "job.mp3"
+
+    # Act
+    with pytest.raises(RuntimeError):
+        with Mp3Encoder(str(mp3)) as encoder:
+            encoder.write(np.zeros(10), 24000)
+            mp3.write_bytes(b"partial")
+            raise RuntimeError("engine failed")
+
+    # Assert
+    assert process.killed
+    assert not mp3.exists()
@@ -0,0 +1,398 @@
+import pytest
+from huey import RedisHuey, SqliteHuey
+
+from flasktts.tasks.jobs import (
+    COMPLETED,
+    FAILED,
+    PENDING,
+    RUNNING,
+    RedisJobIndex,
+    SqliteJobIndex,
+    create_job_index,
+)
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def huey(request, tmp_path):
+    if request.param == "sqlite":
+        return SqliteHuey("test_tasks", filename=str(tmp_path / "huey.db"))
+
+    fakeredis = pytest.importorskip("fakeredis")
+    redis = pytest.importorskip("redis")
+    pool = redis.ConnectionPool(
+        connection_class=fakeredis.FakeRedisConnection, server=fakeredis.FakeServer()
+    )
+    return RedisHuey("test_tasks", connection_pool=pool)
+
+
+@pytest.fixture
+def index(huey):
+    return create_job_index(huey.storage)
+
+
+@pytest.fixture
+def echo_task(huey):
+    @huey.task()
+    def echo(text):
+        return text
+
+    return echo
+
+
+class TestJobIndex:
+    def test_enqueue_batch(self, huey, index, echo_task):
+        # Act
+        job_ids = index.enqueue(
+            huey,
+            [
+                (echo_task.s("one"), "kokoro", "af_heart", 3),
+                (echo_task.s("two"), "qwen3", None, 3),
+            ],
+        )
+
+        # Assert
+        assert len(huey.pending()) == 2
+        assert [task.id for task in huey.pending()] == job_ids
+        assert index.statuses(job_ids) == {job_id: PENDING for job_id in job_ids}
+
+    def test_batch_enqueued_task_executes(self, huey, index, echo_task):
+        # Arrange
+        job_ids = index.enqueue(huey, [(echo_task.s("one"), "kokoro", None, 3)])
+
+        # Act
+        task = huey.dequeue()
+        huey.execute(task)
+
+        # Assert
+        assert task.id == job_ids[0]
+        assert huey.result(task.id) == "one"
+
+    def test_enqueue_batch_immediate_mode(self, huey, index, echo_task):
+        # Arrange
+        huey.immediate = True
+
+        # Act
+        job_ids = index.enqueue(huey, [(echo_task.s("one"), "kokoro", None, 3)])
+
+        # Assert
+        assert huey.pending() == []
+        assert huey.result(job_ids[0]) == "one"
+        assert job_ids[0] in index.statuses(job_ids)
+
+    def test_enqueue_batch_rolls_back_on_error(self, huey, index, echo_task):
+        # Arrange
+        good = echo_task.s("one")
+        bad = echo_task.s(lambda: "not picklable")
+
+        # Act
+        with pytest.raises(Exception):
+            index.enqueue(huey, [(good, "kokoro", None, 3), (bad, "kokoro", None, 3)])
+
+        # Assert
+        assert huey.pending() == []
+        assert index.statuses([good.id, bad.id]) == {}
+
+    def test_status_updates(self, index):
+        # Arrange
+        index.add("job-1", "kokoro", "af_heart")
+
+        # Act
+        index.set_status("job-1", RUNNING)
+        index.set_status("job-1", COMPLETED)
+
+        # Assert
+        assert index.statuses(["job-1", "missing"]) == {"job-1": COMPLETED}
+
+    def test_add_after_worker_update_keeps_status(self, index):
+        # Act
+        index.set_status("job-1", RUNNING)
+        index.add("job-1", "kokoro", "af_heart")
+
+        # Assert
+        assert index.statuses(["job-1"]) == {"job-1": RUNNING}
+
+    def test_delete(self, index):
+        # Arrange
+        index.add("job-1", "qwen3")
+
+        # Act
+        index.delete("job-1")
+
+        # Assert
+        assert index.statuses(["job-1"]) == {}
+
+    def test_list_pages(self, index):
+        # Arrange
+        for i in range(5):
+            index.add(f"job-{i}", "kokoro", "af_heart", 10 * i)
+
+        # Act
+        first, cursor = index.list_jobs(2)
+        second, cursor = index.list_jobs(2, cursor=cursor)
+        third, last_cursor = index.list_jobs(2, cursor=cursor)
+
+        # Assert
+        listed = [job["job_id"] for job in first + second + third]
+        assert sorted(listed) == [f"job-{i}" for i in range(5)]
+        assert len(set(listed)) == 5
+        assert last_cursor is None
+
+    def test_output_with_unknown_duration(self, index):
+        # Arrange
+        index.add("job-1", "kokoro", "af_heart", 10)
+
+        # Act
+        index.set_output("job-1", None, 1024)
+
+        # Assert
+        job = index.list_jobs(10)[0][0]
+        assert job["audio_seconds"] is None
+        assert job["output_bytes"] == 1024
+
+    def test_output_with_peak_memory(self, index):
+        # Arrange
+        index.add("job-1", "kokoro", "af_heart", 10)
+
+        # Act
+        index.set_output("job-1", 1.5, 1024, peak_memory=2**30)
+
+        # Assert
+        assert index.job("job-1")["peak_memory"] == 2**30
+        assert index.list_jobs(10)[0][0]["peak_memory"] == 2**30
+
+    def test_list_filters(self, index):
+        # Arrange
+        index.add("job-1", "kokoro", "af_heart", 10)
+        index.add("job-2", "qwen3", None, 20)
+        index.set_status("job-2", FAILED)
+        index.set_output("job-1", 1.5, 1024)
+
+        # Act
+        kokoro, _ = index.list_jobs(10, model="kokoro")
+        failed, _ = index.list_jobs(10, status=FAILED)
+        future, _ = index.list_jobs(10, created_after=kokoro[0]["created_at"] + 60)
+
+        # Assert
+        assert [job["job_id"] for job in kokoro] == ["job-1"]
+        assert kokoro[0]["audio_seconds"] == 1.5
+        assert kokoro[0]["output_bytes"] == 1024
+        assert kokoro[0]["characters"] == 10
+        assert [job["job_id"] for job in failed] == ["job-2"]
+        assert future == []
+
+    def test_list_invalid_cursor(self, index):
+        with pytest.raises(ValueError):
+            index.list_jobs(10, cursor="not a cursor")
+
+    def test_document_fan_in(self, huey, index, echo_task):
+        # Arrange
+        chapters = [
+            (echo_task.s(f"chapter {i}"), "kokoro", "af_heart", 9) for i in range(3)
+        ]
+
+        # Act
+        job_ids = index.enqueue_document(
+            huey, "doc-1", chapters, ["One", "Two", "Three"]
+        )
+        finished = [index.chapter_finished("doc-1") for _ in job_ids]
+
+        # Assert
+        assert [task.id for task in huey.pending()] == job_ids
+        assert finished == [False, False, True]
+        assert index.parent_of(job_ids[1]) == "doc-1"
+        assert index.parent_of("doc-1") is None
+        document = index.document("doc-1")
+        assert document["status"] == PENDING
+        assert document["characters"] == 27
+        assert (document["chapters"], document["chapters_done"]) == (3, 3)
+        assert [c["job_id"] for c in document["chapter_jobs"]] == job_ids
+        assert [c["title"] for c in document["chapter_jobs"]] == ["One", "Two", "Three"]
+        assert index.document(job_ids[0]) is None
+
+    def test_document_immediate_mode(self, huey, index, echo_task):
+        # Arrange
+        huey.immediate = True
+
+        # Act
+        job_ids = index.enqueue_document(
+            huey, "doc-1", [(echo_task.s("one"), "kokoro", None, 3)], ["One"]
+        )
+
+        # Assert
+        assert huey.result(job_ids[0]) == "one"
+        assert index.parent_of(job_ids[0]) == "doc-1"
+        assert index.chapter_finished("doc-1")
+
+    def test_status_unless(self, index):
+        # Arrange
+        index.add("job-1", "kokoro")
+        index.set_status("job-1", FAILED)
+
+        # Act
+        index.set_status("job-1", RUNNING, unless=FAILED)
+        index.set_status("job-2", RUNNING, unless=FAILED)
+
+        # Assert
+        assert index.statuses(["job-1", "job-2"]) == {
+            "job-1": FAILED,
+            "job-2": RUNNING,
+        }
+
+    def test_delete_document_deletes_chapters(self, huey, index, echo_task):
+        # Arrange
+        job_ids = index.enqueue_document(
+            huey, "doc-1", [(echo_task.s("one"), "kokoro", None, 3)], ["One"]
+        )
+
+        # Act
+        index.delete("doc-1")
+
+        # Assert
+        assert index.statuses(["doc-1"] + job_ids) == {}
+        assert index.document("doc-1") is None
+        assert index.list_jobs(10) == ([], None)
+
+    def test_least_recently_used(self, index):
+        # Arrange
+        for job_id in ("job-1", "job-2", "job-3"):
+            index.add(job_id, "kokoro")
+        index.set_status("job-1", COMPLETED)
+        index.set_output("job-1", 1.0, 100)
+        index.set_status("job-2", FAILED)
+        index.set_status("job-3", RUNNING)
+        index.set_output("job-3", None, 50)
+
+        # Act
+        index.touch("job-1")
+        index.touch("job-3")
+        used = index.least_recently_used(10)
+
+        # Assert
+        assert [job["job_id"] for job in used] == ["job-2", "job-1"]
+        assert [job["output_bytes"] for job in used] == [0, 100]
+        assert used[0]["accessed_at"] < used[1]["accessed_at"]
+        assert index.stored_bytes() == 150
+        index.delete("job-1")
+        assert index.stored_bytes() == 50
+        assert [job["job_id"] for job in index.least_recently_used(10)] == ["job-2"]
+
+    def test_least_recently_used_document(self, huey, index, echo_task):
+        # Arrange
+        chapters = [(echo_task.s(f"chapter {i}"), "kokoro", None, 9) for i in range(2)]
+        job_ids = index.enqueue_document(huey, "doc-1", chapters, ["One", "Two"])
+        for job_id in job_ids:
+            index.set_status(job_id, COMPLETED)
+            index.set_output(job_id, 1.0, 10)
+
+        # Act
+        index.set_status("doc-1", COMPLETED)
+        index.set_output("doc-1", 2.0, 20)
+
+        # Assert
+        (document,) = index.least_recently_used(10)
+        assert document["job_id"] == "doc-1"
+        assert document["output_bytes"] == 40
+        assert index.stored_bytes() == 40
+
+    def test_claim(self, huey, index, echo_task):
+        # Arrange
+        job_ids = index.enqueue(
+            huey,
+            [(echo_task.s(text), "kokoro", None, 5) for text in ("a", "bb", "c", "d")],
+        )
+
+        # Act
+        claimed = index.claim(huey, lambda task: len(task.args[0]) == 1, limit=2)
+
+        # Assert
+        assert [task.id for task in claimed] == [job_ids[0], job_ids[2]]
+        assert [task.id for task in huey.pending()] == [job_ids[1], job_ids[3]]
+        (next_task,) = index.claim(huey, lambda task: True, limit=5, scan=1)
+        assert next_task.id == job_ids[1]
+        assert huey.execute(huey.dequeue()) == "d"
+
+    def test_record_rate_moving_average(self, index):
+        # Arrange
+        for job_id in ("job-1", "job-2"):
+            index.add(job_id, "kokoro", "af_heart", 100)
+            index.set_output(job_id, 5.0, 1024)
+        index.add("job-3", "qwen3", None, 100)
+        index.set_output("job-3", None, 1024)
+
+        # Act
+        index.record_rate("job-1", 1.0)
+        index.record_rate("job-2", 3.0)
+        index.record_rate("job-3", 2.0)
+
+        # Assert
+        rate = index.rates()[("kokoro", "af_heart")]
+        assert rate["audio_per_char"] == pytest.approx(0.05)
+        # The second sample weighs 1/2 until RATE_SMOOTHING takes over
+        assert rate["rtf"] == pytest.approx(0.4)
+        assert rate["samples"] == 2
+        assert ("qwen3", None) not in index.rates()
+
+    def test_pending_characters(self, index):
+        # Arrange
+        index.add("job-1", "kokoro", "af_heart", 10)
+        index.add("job-2", "kokoro", "af_heart", 20)
+        index.add("job-3", "qwen3", None, 30)
+        index.add("job-4", "qwen3", None, 40)
+        index.set_status("job-4", RUNNING)
+        created_at = {
+            job["job_id"]: job["created_at"] for job in index.list_jobs(10)[0]
+        }
+
+        # Act
+        everything = index.pending_characters()
+        ahead = index.pending_characters(before=created_at["job-3"])
+
+        # Assert
+        assert everything == {("kokoro", "af_heart"): 30, ("qwen3", None): 30}
+        assert ahead == {("kokoro", "af_heart"): 30}
+
+    def test_client_filter(self, huey, index, echo_task):
+        # Arrange
+        index.enqueue(huey, [(echo_task.s("a"), "kokoro", "af_heart", 10)], "feed")
+        index.enqueue_document(
+            huey, "doc", [(echo_task.s("b"), "kokoro", "af_heart", 20)], ["B"], "feed"
+        )
+        (other,) = index.enqueue(huey, [(echo_task.s("c"), "qwen3", None, 30)], "app")
+        index.set_status(other, RUNNING)
+
+        # Act
+        feed_pending = index.pending_characters(client="feed")
+        app_pending = index.pending_characters(client="app")
+        app_running = index.running_jobs(client="app")
+
+        # Assert
+        assert feed_pending == {("kokoro", "af_heart"): 30}
+        assert app_pending == {}
+        assert [job["job_id"] for job in app_running] == [other]
+        assert index.running_jobs(client="feed") == []
+
+    def test_running_jobs_and_job(self, index):
+        # Arrange
+        index.add("job-1", "kokoro", "af_heart", 10)
+        index.add("job-2", "qwen3", None, 20)
+
+        # Act
+        index.set_status("job-2", RUNNING)
+
+        # Assert
+        (running,) = index.running_jobs()
+        assert running["job_id"] == "job-2"
+        assert (running["model"], running["voice"], running["characters"]) == (
+            "qwen3",
+            None,
+            20,
+        )
+        assert running["started_at"] is not None
+        assert index.job("job-2")["started_at"] == running["started_at"]
+        assert index.job("job-1")["status"] == PENDING
+        assert index.job("job-1")["started_at"] is None
+        assert index.job("missing") is None
+
+    def test_backend_selection(self, huey, index):
+        expected = SqliteJobIndex if isinstance(huey, SqliteHuey) else RedisJobIndex
+        assert isinstance(index, expected)
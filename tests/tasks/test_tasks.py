@@ -0,0 +1,306 @@
+import time
+from unittest.mock import call, patch
+
+import pytest
+
+from flasktts.tasks import tasks
+from flasktts.tasks.jobs import COMPLETED, FAILED, PENDING, RUNNING
+from flasktts.tts import memory
+
+
+@pytest.fixture
+def mock_jobs():
+    with patch("flasktts.tasks.tasks.jobs") as mock:
+        mock.statuses.return_value = {}
+        yield mock
+
+
+@pytest.fixture
+def mock_huey():
+    with patch("flasktts.tasks.tasks.huey") as mock:
+        yield mock
+
+
+@pytest.fixture
+def mock_cleanup():
+    with patch("flasktts.tasks.tasks.cleanup_task") as mock:
+        yield mock
+
+
+def chapter_task():
+    return tasks.kokoro_tts_task.s("Chapter text.", "af_heart")
+
+
+def test_last_chapter_enqueues_stitching(mock_jobs, mock_huey, mock_cleanup):
+    # Arrange
+    task = chapter_task()
+    mock_jobs.parent_of.return_value = "doc-1"
+    mock_jobs.chapter_finished.return_value = True
+
+    # Act
+    tasks.task_complete(None, task)
+
+    # Assert
+    mock_jobs.set_status.assert_called_once_with(task.id, COMPLETED)
+    mock_jobs.chapter_finished.assert_called_once_with("doc-1")
+    (stitch,) = mock_huey.enqueue.call_args.args
+    assert isinstance(stitch, tasks.stitch_document_task.task_class)
+    assert stitch.id == "doc-1"
+    mock_cleanup.schedule.assert_not_called()
+
+
+def test_other_chapters_wait(mock_jobs, mock_huey, mock_cleanup):
+    # Arrange
+    mock_jobs.parent_of.return_value = "doc-1"
+    mock_jobs.chapter_finished.return_value = False
+
+    # Act
+    tasks.task_complete(None, chapter_task())
+
+    # Assert
+    mock_huey.enqueue.assert_not_called()
+    mock_cleanup.schedule.assert_not_called()
+
+
+def test_plain_job_is_left_to_retention(mock_jobs, mock_huey, mock_cleanup):
+    # Arrange
+    task = chapter_task()
+    mock_jobs.parent_of.return_value = None
+
+    # Act
+    tasks.task_complete(None, task)
+
+    # Assert
+    mock_jobs.chapter_finished.assert_not_called()
+    mock_cleanup.schedule.assert_not_called()
+
+
+def test_first_chapter_starts_document(mock_jobs, mock_huey):
+    # Arrange
+    task = chapter_task()
+    mock_jobs.parent_of.return_value = "doc-1"
+
+    # Act
+    tasks.task_executing(None, task)
+
+    # Assert
+    mock_jobs.set_status.assert_any_call(task.id, RUNNING)
+    mock_jobs.set_status.assert_any_call("doc-1", RUNNING, unless=FAILED)
+
+
+def test_failed_chapter_fails_document(mock_jobs, mock_huey, mock_cleanup):
+    # Arrange
+    task = chapter_task()
+    mock_jobs.parent_of.return_value = "doc-1"
+    mock_jobs.document.return_value = {
+        "chapter_jobs": [
+            {"job_id": task.id, "status": FAILED},
+            {"job_id": "chapter-2", "status": RUNNING},
+            {"job_id": "chapter-3", "status": PENDING},
+        ]
+    }
+
+    # Act
+    tasks.task_error(None, task, Exception("boom"))
+
+    # Assert
+    mock_jobs.set_status.assert_any_call("doc-1", FAILED)
+    mock_huey.revoke_by_id.assert_called_once_with("chapter-3")
+    mock_cleanup.schedule.assert_not_called()
+
+
+@pytest.fixture
+def mock_cleanup_job():
+    with patch("flasktts.tasks.tasks._cleanup_job") as mock:
+        yield mock
+
+
+def lru(*jobs):
+    """least_recently_used results, jobs are (job_id, age, output_bytes)"""
+    now = time.time()
+    return [
+        {"job_id": job_id, "accessed_at": now - age, "output_bytes": size}
+        for job_id, age, size in jobs
+    ]
+
+
+def test_evict_expired_jobs(mock_jobs, mock_cleanup_job):
+    # Arrange
+    mock_jobs.stored_bytes.return_value = 300
+    mock_jobs.least_recently_used.side_effect = [
+        lru(("old-1", 500, 100), ("old-2", 400, 100), ("new", 10, 100)),
+    ]
+
+    # Act
+    evicted = tasks.evict_jobs(max_age=60, max_bytes=0)
+
+    # Assert
+    assert evicted == 2
+    assert mock_cleanup_job.call_args_list == [call("old-1"), call("old-2")]
+
+
+def test_evict_least_recently_used_over_quota(mock_jobs, mock_cleanup_job):
+    # Arrange
+    mock_jobs.stored_bytes.return_value = 1000
+    mock_jobs.least_recently_used.side_effect = [
+        lru(("a", 30, 400), ("b", 20, 400)),
+        lru(("c", 10, 200)),
+    ]
+
+    # Act
+    evicted = tasks.evict_jobs(max_age=3600, max_bytes=500, batch=2)
+
+    # Assert
+    assert evicted == 2
+    assert mock_cleanup_job.call_args_list == [call("a"), call("b")]
+
+
+def test_evict_nothing_when_empty(mock_jobs, mock_cleanup_job):
+    # Arrange
+    mock_jobs.stored_bytes.return_value = 0
+    mock_jobs.least_recently_used.return_value = []
+
+    # Act / Assert
+    assert tasks.evict_jobs(max_age=0, max_bytes=1) == 0
+    mock_cleanup_job.assert_not_called()
+
+
+@pytest.fixture
+def mock_store():
+    with patch("flasktts.tasks.tasks._store_output") as mock:
+        mock.side_effect = lambda task_id, path, peak_memory=None: f"{task_id}.mp3"
+        yield mock
+
+
+def short_job(text="Short.", voice="af_heart"):
+    return tasks.kokoro_tts_task.s(text, voice)
+
+
+def test_batchable():
+    task = short_job()
+    with patch("flasktts.tasks.tasks.huey") as mock_huey:
+        mock_huey.is_revoked.return_value = False
+        assert tasks._batchable(task, short_job("Other."))
+        assert not tasks._batchable(task, short_job(voice="bf_emma"))
+        assert not tasks._batchable(task, short_job("Long. " * 200))
+        assert not tasks._batchable(task, tasks.qwen3_tts_task.s("Short."))
+
+
+def test_batch_runs_claimed_jobs(mock_jobs, mock_huey, mock_store):
+    # Arrange
+    task, companion = short_job(), short_job("Other.")
+    mock_huey.immediate = False
+    mock_huey.is_revoked.return_value = False
+    mock_jobs.claim.return_value = [companion]
+    mock_jobs.parent_of.return_value = None
+
+    def synth_batch(batch):
+        return [f"{job.id}-wav" for job in batch]
+
+    # Act
+    with patch.object(tasks.Config, "MICROBATCH_MAX_JOBS", 4):
+        key = tasks._run_batch(task, None, synth_batch, lambda output, job: output)
+
+    # Assert
+    assert key == f"{task.id}.mp3"
+    assert mock_jobs.claim.call_args.args[2] == 3
+    mock_store.assert_any_call(companion.id, f"{companion.id}-wav", None)
+    mock_huey.put_result.assert_called_once_with(companion.id, f"{companion.id}.mp3")
+    mock_jobs.set_status.assert_any_call(companion.id, RUNNING)
+    mock_jobs.set_status.assert_any_call(companion.id, COMPLETED)
+    # Both jobs are charged half of the batch
+    (first, share), (second, other_share) = [
+        call.args for call in mock_jobs.record_rate.call_args_list
+    ]
+    assert (first, second) == (task.id, companion.id)
+    assert share == other_share
+
+
+def test_batch_peak_memory_is_shared(mock_jobs, mock_huey, mock_store):
+    # Arrange
+    task, companion = short_job(), short_job("Other.")
+    mock_huey.immediate = False
+    mock_huey.is_revoked.return_value = False
+    mock_jobs.claim.return_value = [companion]
+    mock_jobs.parent_of.return_value = None
+
+    def synth_batch(batch):
+        with memory.inference_peak("cpu"):
+            return [f"{job.id}-wav" for job in batch]
+
+    # Act
+    with patch.object(tasks.Config, "MICROBATCH_MAX_JOBS", 2):
+        tasks._run_batch(task, None, synth_batch, lambda output, job: output)
+
+    # Assert
+    peaks = {call.args[0]: call.args[2] for call in mock_store.call_args_list}
+    assert peaks[task.id] == peaks[companion.id] > 0
+
+
+def test_failed_batch_requeues_claimed_jobs(mock_jobs, mock_huey, mock_store):
+    # Arrange
+    task, companion = short_job(), short_job("Other.")
+    mock_huey.immediate = False
+    mock_huey.is_revoked.return_value = False
+    mock_jobs.claim.return_value = [companion]
+
+    def synth_batch(batch):
+        raise RuntimeError("bad input")
+
+    # Act
+    with patch.object(tasks.Config, "MICROBATCH_MAX_JOBS", 2):
+        key = tasks._run_batch(
+            task, lambda job: "alone-wav", synth_batch, lambda output, job: output
+        )
+
+    # Assert
+    assert key == f"{task.id}.mp3"
+    mock_store.assert_called_once_with(task.id, "alone-wav", None)
+    mock_jobs.set_status.assert_any_call(companion.id, PENDING)
+    mock_huey.enqueue.assert_called_once_with(companion)
+    (recorded,) = mock_jobs.record_rate.call_args_list
+    assert recorded.args[0] == task.id
+
+
+def test_batching_disabled(mock_jobs, mock_huey, mock_store):
+    # Arrange
+    mock_huey.immediate = False
+
+    # Act
+    with patch.object(tasks.Config, "MICROBATCH_MAX_JOBS", 1):
+        tasks._run_batch(short_job(), lambda job: "wav", None, lambda o, job: o)
+
+    # Assert
+    mock_jobs.claim.assert_not_called()
+
+
+def test_running_jobs_are_recorded_per_worker(mock_huey):
+    # Arrange
+    recorded = []
+    mock_huey.put.side_effect = lambda key, value: recorded.append(value)
+
+    # Act
+    with tasks._running_jobs("b"):
+        with tasks._running_jobs("a", "c"):
+            pass
+
+    # Assert
+    assert recorded == [["b"], ["a", "b", "c"], ["b"]]
+    mock_huey.get.assert_called_once_with(tasks.RUNNING_KEY, peek=False)
+
+
+def test_startup_revokes_running_jobs(mock_jobs, mock_huey):
+    # Arrange
+    mock_huey.pending.return_value = []
+    mock_huey.all_results.return_value = {}
+    mock_huey.get.return_value = ["job-1", "job-2"]
+
+    # Act
+    with patch.object(tasks, "_started", False):
+        tasks.startup()
+        # Another worker thread's hook
+        tasks.startup()
+
+    # Assert
+    assert mock_huey.revoke_by_id.call_args_list == [call("job-1"), call("job-2")]
+    mock_jobs.delete.assert_has_calls([call("job-1"), call("job-2")])
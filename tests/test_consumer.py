@@ -0,0 +1,43 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from flasktts import consumer
+
+
+def test_threads_by_default():
+    with (
+        patch.object(consumer.Config, "WORKER_PROCESSES", 1),
+        patch.object(consumer.Config, "WORKER_THREADS", 3),
+    ):
+        config = consumer.consumer_config()
+
+    assert (config.workers, config.worker_type) == (3, "thread")
+
+
+def test_worker_processes():
+    with (
+        patch.object(consumer.Config, "WORKER_PROCESSES", 4),
+        patch.object(consumer.Config, "WORKER_THREADS", 3),
+    ):
+        config = consumer.consumer_config()
+
+    assert (config.workers, config.worker_type) == (4, "process")
+
+
+def test_preload_engines():
+    # Arrange
+    kokoro = MagicMock()
+
+    # Act
+    with patch.dict(consumer.ENGINES, {"kokoro": kokoro}):
+        seconds = consumer.preload_engines(["kokoro"])
+
+    # Assert
+    kokoro.get_instance.assert_called_once_with()
+    assert list(seconds) == ["kokoro"]
+
+
+def test_preload_rejects_unknown_engines():
+    with pytest.raises(ValueError, match="tacotron"):
+        consumer.preload_engines(["kokoro", "tacotron"])
@@ -0,0 +1,107 @@
+import io
+import json
+import threading
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from flasktts import speak
+
+
+class FakeKokoro:
+    """Half a second of audio per chunk, a chunk per sentence"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def chunks(self, text):
+        return [chunk for chunk in text.split(".") if chunk.strip()]
+
+    def generate(self, chunks, voice, speed=1):
+        self.calls.append((chunks, voice, speed))
+        if self.fail:
+            raise RuntimeError("device on fire")
+        for _ in chunks:
+            yield np.full(speak.SAMPLE_RATE // 2, 0.1, dtype=np.float32)
+
+
+@pytest.fixture
+def engine():
+    engine = FakeKokoro()
+    with patch.object(speak.KokoroTTSHighlander, "get_instance", return_value=engine):
+        yield engine
+
+
+@pytest.fixture
+def server(engine):
+    server = speak.make_server("127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/speak"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, body):
+    request = urllib.request.Request(url, data=body, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.headers.get_content_type(), response.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.headers.get_content_type(), exc.read()
+
+
+def test_synthesize_wav_in_memory(engine):
+    # Act
+    wav = speak.synthesize("One. Two.", voice="am_adam", rate=1.5)
+
+    # Assert
+    audio, sample_rate = sf.read(io.BytesIO(wav))
+    assert sample_rate == speak.SAMPLE_RATE
+    assert len(audio) == speak.SAMPLE_RATE
+    assert engine.calls == [(["One", " Two"], "am_adam", 1.5)]
+
+
+def test_synthesize_mp3(engine):
+    with patch.object(speak, "encode_mp3", return_value=b"ID3") as mock_encode:
+        mp3 = speak.synthesize("One.", fmt="mp3")
+
+    assert mp3 == b"ID3"
+    audio, sample_rate = mock_encode.call_args.args
+    assert (len(audio), sample_rate) == (speak.SAMPLE_RATE // 2, speak.SAMPLE_RATE)
+
+
+def test_server_answers_with_audio(server, engine):
+    # Act
+    status, content_type, body = post(
+        server, json.dumps({"text": "Hello.", "voice": None}).encode()
+    )
+
+    # Assert
+    assert (status, content_type) == (200, "audio/wav")
+    assert body.startswith(b"RIFF")
+    assert engine.calls == [(["Hello"], speak.DEFAULT_VOICE, 1.0)]
+
+
+def test_server_rejects_invalid_requests(server, engine):
+    assert post(server, b"not json")[0] == 400
+    assert post(server, json.dumps({"voice": "af_heart"}).encode())[0] == 400
+    assert post(server, json.dumps({"text": "Hi.", "format": "ogg"}).encode())[0] == 400
+    assert engine.calls == []
+
+
+def test_server_reports_synthesis_errors(server, engine):
+    # Arrange
+    engine.fail = True
+
+    # Act
+    status, _, body = post(server, json.dumps({"text": "Hello."}).encode())
+
+    # Assert
+    assert status == 500
+    assert b"device on fire" in body
@@ -0,0 +1,49 @@
+from unittest.mock import patch
+
+from flasktts import worker
+from flasktts.tasks.jobs import gpu_lock_name
+from flasktts.tts import device
+
+
+class TestWorkerLauncher:
+    def test_devices_from_config(self):
+        with patch.object(device.Config, "WORKER_DEVICES", "cuda:0, cuda:1"):
+            assert device.worker_devices() == ["cuda:0", "cuda:1"]
+
+    def test_auto_devices_without_cuda(self):
+        with (
+            patch.object(device.Config, "WORKER_DEVICES", "auto"),
+            patch("torch.cuda.is_available", return_value=False),
+        ):
+            assert device.worker_devices() == ["cpu"]
+
+    def test_cuda_worker_env_is_pinned(self, monkeypatch):
+        monkeypatch.delenv("CUDA_VISIBLE_DEVICES", raising=False)
+        with patch.object(device.Config, "WORKER_NAME", "node1"):
+            env = worker.worker_env("cuda:1")
+
+        assert env["WORKER_NAME"] == "node1-cuda1"
+        assert env["CUDA_VISIBLE_DEVICES"] == "1"
+        assert env["TTS_DEVICE"] == "cuda"
+
+    def test_cuda_worker_env_respects_visible_devices(self, monkeypatch):
+        monkeypatch.setenv("CUDA_VISIBLE_DEVICES", "2,3")
+        with patch.object(device.Config, "WORKER_NAME", ""):
+            env = worker.worker_env("cuda:1")
+
+        assert env["WORKER_NAME"] == "cuda1"
+        assert env["CUDA_VISIBLE_DEVICES"] == "3"
+
+    def test_workers_have_distinct_locks(self):
+        names = {device.device_worker_name(d) for d in ("cuda:0", "cuda:1")}
+        assert len({gpu_lock_name(name) for name in names}) == 2
+
+    def test_default_worker_name_is_the_host(self):
+        with patch.object(device.Config, "WORKER_NAME", "gpu-host-7"):
+            assert device.device_worker_name("cuda:0") == "gpu-host-7-cuda0"
+
+    def test_first_consumer_alone_speaks(self, monkeypatch):
+        monkeypatch.setenv("SPEAK_PORT", "5002")
+
+        assert worker.worker_env("cuda:0")["SPEAK_PORT"] == "5002"
+        assert worker.worker_env("cuda:1", speak=False)["SPEAK_PORT"] == "0"
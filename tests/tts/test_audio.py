@@ -0,0 +1,60 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from flasktts.tts.audio import WavWriter
+
+
+def test_chunks_are_appended_in_order(tmp_path):
+    # Arrange
+    path = str(tmp_path / "out.wav")
+    chunks = [np.full(100, 0.25), np.full(50, -0.5), np.full(10, 2.0)]
+
+    # Act
+    with WavWriter(path) as writer:
+        for chunk in chunks:
+            writer.write(chunk, 24000)
+
+    # Assert
+    audio, sr = sf.read(path)
+    assert sr == 24000
+    assert writer.duration == pytest.approx(160 / 24000)
+    assert len(audio) == 160
+    assert audio[:100] == pytest.approx(0.25, abs=1e-4)
+    assert audio[100:150] == pytest.approx(-0.5, abs=1e-4)
+    # Out of range samples are clipped, not wrapped around
+    assert audio[150:] == pytest.approx(1.0, abs=1e-4)
+    assert sf.info(path).subtype == "PCM_16"
+
+
+def test_sample_rate_must_not_change(tmp_path):
+    # Arrange
+    writer = WavWriter(str(tmp_path / "out.wav"))
+    writer.write(np.zeros(10), 24000)
+
+    # Act / Assert
+    with pytest.raises(ValueError):
+        writer.write(np.zeros(10), 16000)
+    writer.close()
+
+
+def test_memory_does_not_grow_with_length(tmp_path):
+    # Arrange
+    chunk = np.zeros(24000 * 10, dtype=np.float32)  # 10 s, ~1 MB
+
+    def peak(chunks):
+        tracemalloc.start()
+        with WavWriter(str(tmp_path / f"{chunks}.wav"), 24000) as writer:
+            for _ in range(chunks):
+                writer.write(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return peak
+
+    # Act
+    short, long = peak(2), peak(50)
+
+    # Assert
+    assert long < 2 * short
@@ -0,0 +1,115 @@
+import io
+import zipfile
+from urllib.parse import unquote
+
+import pytest
+
+from flasktts.tts.document import (
+    Chapter,
+    detect_format,
+    html_chapters,
+    markdown_chapters,
+    split_chapters,
+)
+
+
+def make_epub(documents):
+    """EPUB with the given (file name, XHTML) documents as its spine."""
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w") as epub:
+        epub.writestr("mimetype", "application/epub+zip")
+        epub.writestr(
+            "META-INF/container.xml",
+            '<container xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf"/></rootfiles>'
+            "</container>",
+        )
+        items = "".join(
+            f'<item id="d{i}" href="{name}"/>' for i, (name, _) in enumerate(documents)
+        )
+        spine = "".join(f'<itemref idref="d{i}"/>' for i in range(len(documents)))
+        epub.writestr(
+            "OEBPS/content.opf",
+            '<package xmlns="http://www.idpf.org/2007/opf">'
+            f"<manifest>{items}</manifest><spine>{spine}</spine></package>",
+        )
+        for name, html in documents:
+            # Manifest hrefs are URL encoded, archive names are not
+            epub.writestr(f"OEBPS/{unquote(name)}", html)
+    return data.getvalue()
+
+
+def test_markdown_chapters():
+    # Arrange
+    text = (
+        "Preface with a [link](http://example.com).\n\n"
+        "# Part One\n\n"
+        "## Chapter 1\n\n"
+        "Some **bold** text,\nwrapped.\n\n"
+        "```\ncode()\n```\n\n"
+        "- first\n- second\n\n"
+        "### Section\n\n"
+        "More.\n"
+    )
+
+    # Act
+    chapters = markdown_chapters(text)
+
+    # Assert
+    assert chapters == [
+        Chapter("", "Preface with a link."),
+        Chapter(
+            "Chapter 1",
+            "Part One\nChapter 1\nSome bold text, wrapped.\nfirst\nsecond\nSection\nMore.",
+        ),
+    ]
+
+
+def test_html_chapters():
+    # Arrange
+    html = (
+        "<html><head><title>Book</title><style>p {}</style></head><body>"
+        "<h1>One <em>Start</em></h1><p>Hello<br>world &amp; all</p>"
+        "<script>ignored()</script><h2>Two</h2><div>Second</div></body></html>"
+    )
+
+    # Act
+    chapters = html_chapters(html)
+
+    # Assert
+    assert chapters == [
+        Chapter("One Start", "One Start\nHello\nworld & all"),
+        Chapter("Two", "Two\nSecond"),
+    ]
+
+
+def test_epub_chapters_follow_spine():
+    # Arrange
+    epub = make_epub(
+        [
+            ("cover.xhtml", "<html><body><img src='c.jpg'/></body></html>"),
+            ("ch2.xhtml", "<html><body><h1>Two</h1><p>Second.</p></body></html>"),
+            ("ch1%20a.xhtml", "<html><body><p>No heading.</p></body></html>"),
+        ]
+    )
+
+    # Act
+    chapters = split_chapters(epub, "epub")
+
+    # Assert
+    assert chapters == [Chapter("Two", "Two\nSecond."), Chapter("", "No heading.")]
+
+
+def test_unreadable_documents():
+    with pytest.raises(ValueError):
+        split_chapters(b"not a zip", "epub")
+    with pytest.raises(ValueError):
+        split_chapters(b"\xff\xfe\xfa", "markdown")
+
+
+def test_detect_format():
+    assert detect_format("book.EPUB") == "epub"
+    assert detect_format("notes.md") == "markdown"
+    assert detect_format("page.htm") == "html"
+    assert detect_format("data.bin") is None
+    assert detect_format(None) is None
@@ -0,0 +1,54 @@
+import threading
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+import torch
+
+from flasktts.tts.kokoroonnx import KokoroOnnxTTS
+
+
+@pytest.fixture
+def tts():
+    tts = KokoroOnnxTTS.__new__(KokoroOnnxTTS)
+    tts.frontend_lock = threading.Lock()
+    tts.vocab = {"h": 1, "ə": 2, "l": 3, "O": 4}
+    tts.session = MagicMock()
+    tts.session.run.return_value = [np.zeros(240, dtype=np.float32)]
+    return tts
+
+
+def test_infer_frames_tokens_like_kmodel(tts):
+    # Arrange
+    pack = torch.arange(510 * 256, dtype=torch.float32).reshape(510, 1, 256)
+
+    # Act
+    audio = tts.infer("hə lO", pack, speed=1.2)
+
+    # Assert
+    feeds = tts.session.run.call_args.args[1]
+    # Unknown symbols (the space) are dropped, 0 pads both ends
+    assert feeds["input_ids"].tolist() == [[0, 1, 2, 3, 4, 0]]
+    assert feeds["input_ids"].dtype == np.int64
+    # The style vector is picked by phoneme count
+    assert np.array_equal(feeds["ref_s"], pack[4].numpy())
+    assert feeds["speed"].tolist() == pytest.approx([1.2])
+    assert audio.shape == (240,)
+
+
+def test_generate_reuses_pipeline_g2p_and_voice(tts):
+    # Arrange
+    pack = torch.zeros(510, 1, 256)
+    tts.pipeline = MagicMock()
+    tts.pipeline.load_voice.return_value = pack
+    tts.pipeline.return_value = [MagicMock(phonemes="hə"), MagicMock(phonemes="lO")]
+    tts.g2p_pipeline = tts.pipeline
+
+    # Act
+    parts = list(tts.generate(["Hello.", "Low."], "af_heart"))
+
+    # Assert
+    assert len(parts) == 2
+    tts.pipeline.load_voice.assert_called_once_with("af_heart")
+    assert tts.pipeline.call_args.args[0] == "Hello.\nLow."
+    assert tts.session.run.call_count == 2
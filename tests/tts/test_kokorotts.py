@@ -0,0 +1,168 @@
+import os
+import threading
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+import torch
+
+from flasktts.tts.kokorotts import KokoroTTS, forward_batch
+
+
+@pytest.fixture(scope="module")
+def tiny_kmodel(tmp_path_factory):
+    """Randomly initialized KModel, small where the architecture allows it."""
+    kokoro = pytest.importorskip("kokoro")
+    config = {
+        "istftnet": {
+            "upsample_kernel_sizes": [20, 12],
+            "upsample_rates": [10, 6],
+            "gen_istft_hop_size": 5,
+            "gen_istft_n_fft": 20,
+            "resblock_dilation_sizes": [[1, 3, 5]],
+            "resblock_kernel_sizes": [3],
+            "upsample_initial_channel": 512,
+        },
+        "dim_in": 64,
+        "dropout": 0.2,
+        # The decoder's input width is fixed at 512
+        "hidden_dim": 512,
+        "max_conv_dim": 512,
+        "max_dur": 4,
+        "multispeaker": True,
+        "n_layer": 1,
+        "n_mels": 80,
+        "n_token": 178,
+        "style_dim": 128,
+        "text_encoder_kernel_size": 5,
+        "plbert": {
+            "hidden_size": 32,
+            "num_attention_heads": 2,
+            "intermediate_size": 64,
+            "max_position_embeddings": 512,
+            "num_hidden_layers": 1,
+            "dropout": 0.1,
+        },
+        "vocab": {symbol: i + 1 for i, symbol in enumerate("abcdefghij")},
+    }
+    weights = tmp_path_factory.mktemp("kokoro") / "empty.pth"
+    torch.save({}, weights)
+    return kokoro.KModel("tiny", config=config, model=str(weights)).eval()
+
+
+def test_forward_batch_matches_unbatched(tiny_kmodel):
+    # Arrange
+    torch.manual_seed(0)
+    input_ids = [[1, 2, 3, 4, 5], [6, 7], [1, 9, 8, 7, 6, 5, 4, 3]]
+    ref_s = torch.randn(3, 256)
+    speed = torch.tensor([1.0, 1.5, 0.8])
+
+    # Act
+    with torch.no_grad():
+        # The decoder adds noise, draw the same for both
+        torch.manual_seed(1)
+        batched = forward_batch(tiny_kmodel, input_ids, ref_s, speed)
+        torch.manual_seed(1)
+        expected = [
+            tiny_kmodel.forward_with_tokens(
+                torch.LongTensor([[0, *ids, 0]]),
+                ref_s[row : row + 1],
+                float(speed[row]),
+            )[0]
+            for row, ids in enumerate(input_ids)
+        ]
+
+    # Assert
+    for audio, reference in zip(batched, expected):
+        assert audio.shape == reference.shape
+        assert torch.allclose(audio, reference, atol=1e-4)
+
+
+def test_synth_batch_splits_audio_per_job(tmp_path):
+    # Arrange
+    tts = KokoroTTS.__new__(KokoroTTS)
+    tts.output_dir = str(tmp_path)
+    tts.frontend_lock = threading.Lock()
+    tts.chunks = lambda text: text.split("|")
+    tts.phonemize = lambda chunks: [
+        MagicMock(graphemes=chunk, phonemes=chunk.lower()) for chunk in chunks
+    ]
+    tts.pipeline = MagicMock()
+    tts.infer_batch = MagicMock(
+        side_effect=lambda phonemes, pack, speeds: [
+            np.zeros(100 * len(ps), dtype=np.float32) for ps in phonemes
+        ]
+    )
+
+    # Act
+    paths = tts.synth_batch(["A|BB", "CCC"], ["job-1", "job-2"], "af_heart", [1.0, 1.2])
+
+    # Assert
+    phonemes, _, speeds = tts.infer_batch.call_args.args
+    assert phonemes == ["a", "bb", "ccc"]
+    assert speeds == [1.0, 1.0, 1.2]
+    assert paths == [str(tmp_path / "job-1"), str(tmp_path / "job-2")]
+    assert sorted(os.listdir(paths[0])) == ["00000.wav", "00001.wav"]
+    assert os.listdir(paths[1]) == ["00000.wav"]
+
+
+def test_synth_text_streams_chunks_to_writer(tmp_path):
+    # Arrange
+    tts = KokoroTTS.__new__(KokoroTTS)
+    tts.output_dir = str(tmp_path)
+    tts.chunks = lambda text: text.split("|")
+    tts.generate = lambda chunks, voice, speed, timeline=None: (
+        np.full(10 * len(chunk), 0.5, dtype=np.float32) for chunk in chunks
+    )
+    writer = MagicMock(path=str(tmp_path / "job.mp3"))
+
+    # Act
+    path = tts.synth_text("A|BB", "job", "af_heart", writer=writer)
+
+    # Assert
+    assert path == writer.path
+    assert [len(c.args[0]) for c in writer.write.call_args_list] == [10, 20]
+    writer.close.assert_not_called()
+    assert os.listdir(tmp_path) == []
+
+
+def test_chunk_out_of_memory_is_generated_in_two(tmp_path):
+    # Arrange
+    tts = KokoroTTS.__new__(KokoroTTS)
+    tts.pipeline = MagicMock()
+    tts.pipeline.model.device = torch.device("cpu")
+    tts.frontend_lock = threading.Lock()
+    tts.optimizer = MagicMock()
+    tts.chunk_results = lambda chunks: (
+        MagicMock(graphemes=chunk, phonemes=chunk) for chunk in chunks
+    )
+    tts.load_voice = lambda voice: torch.zeros(510, 1, 256)
+
+    def infer(model, phonemes, pack, speed):
+        if len(phonemes) > 10:
+            raise torch.cuda.OutOfMemoryError("CUDA out of memory")
+        return MagicMock(audio=phonemes, pred_dur=None)
+
+    # Act
+    with patch("flasktts.tts.kokorotts.KPipeline.infer", side_effect=infer):
+        parts = list(tts.generate(["hə lO wɜɹld", "baɪ"], "af_heart"))
+
+    # Assert
+    assert parts == ["hə lO", "wɜɹld", "baɪ"]
+
+
+def test_blended_voices_come_from_the_cache():
+    # Arrange
+    tts = KokoroTTS.__new__(KokoroTTS)
+    tts.frontend_lock = threading.Lock()
+    tts.pipeline = MagicMock()
+    tts.blends = MagicMock()
+
+    # Act
+    blend = tts.load_voice("af_heart:0.7,af_bella:0.3")
+    preset = tts.load_voice("af_heart")
+
+    # Assert
+    assert blend is tts.blends.get.return_value
+    tts.blends.get.assert_called_once_with("af_heart:0.7,af_bella:0.3")
+    assert preset is tts.pipeline.load_voice.return_value
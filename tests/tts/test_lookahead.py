@@ -0,0 +1,101 @@
+import threading
+import time
+
+import pytest
+
+from flasktts.tts.lookahead import prefetch
+
+
+class Producer:
+    """Items 0..count-1, noting how many were produced and on which thread"""
+
+    def __init__(self, count, fail_at=None):
+        self.count = count
+        self.fail_at = fail_at
+        self.produced = 0
+        self.threads = set()
+
+    def __iter__(self):
+        for item in range(self.count):
+            if item == self.fail_at:
+                raise ValueError(f"bad chunk {item}")
+            self.threads.add(threading.current_thread().name)
+            self.produced += 1
+            yield item
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_items_come_in_order_from_the_frontend_thread():
+    # Arrange
+    producer = Producer(10)
+
+    # Act
+    items = list(prefetch(iter(producer), depth=2))
+
+    # Assert
+    assert items == list(range(10))
+    assert producer.threads == {"frontend"}
+
+
+def test_producer_stays_within_depth():
+    # Arrange
+    producer = Producer(10)
+    items = prefetch(iter(producer), depth=2)
+
+    # Act
+    next(items)
+
+    # Assert
+    # Two queued and one waiting for room
+    assert wait_for(lambda: producer.produced == 4)
+    time.sleep(0.2)
+    assert producer.produced == 4
+    items.close()
+
+
+def test_error_is_raised_in_place():
+    # Arrange
+    items = prefetch(iter(Producer(5, fail_at=3)), depth=2)
+
+    # Act
+    received = []
+    with pytest.raises(ValueError, match="bad chunk 3"):
+        for item in items:
+            received.append(item)
+
+    # Assert
+    assert received == [0, 1, 2]
+
+
+def test_closing_stops_the_producer():
+    # Arrange
+    producer = Producer(1000)
+    items = prefetch(iter(producer), depth=1)
+    next(items)
+
+    # Act
+    items.close()
+
+    # Assert
+    assert wait_for(
+        lambda: not any(t.name == "frontend" for t in threading.enumerate())
+    )
+    assert producer.produced < 10
+
+
+def test_depth_zero_runs_inline():
+    # Arrange
+    producer = Producer(3)
+
+    # Act
+    items = list(prefetch(iter(producer), depth=0))
+
+    # Assert
+    assert items == [0, 1, 2]
+    assert producer.threads == {threading.current_thread().name}
@@ -0,0 +1,87 @@
+from unittest.mock import patch
+
+import pytest
+import torch
+
+from flasktts.tts import memory
+
+
+def oom(work):
+    raise torch.cuda.OutOfMemoryError("CUDA out of memory. Tried to allocate 2 GiB")
+
+
+def test_release_only_near_threshold():
+    # Arrange
+    with (
+        patch.object(memory.Config, "MEMORY_RELEASE_FRACTION", 0.9),
+        patch.object(memory, "free_memory") as mock_free,
+    ):
+        # Act
+        with patch.object(memory, "used_memory", return_value=(80, 100)):
+            below = memory.release_if_needed("cpu")
+        with patch.object(memory, "used_memory", return_value=(95, 100)):
+            above = memory.release_if_needed("cpu")
+
+    # Assert
+    assert (below, above) == (False, True)
+    mock_free.assert_called_once()
+
+
+def test_out_of_memory_errors():
+    assert memory.is_out_of_memory(torch.cuda.OutOfMemoryError("CUDA out of memory"))
+    assert memory.is_out_of_memory(
+        RuntimeError(
+            "[enforce fail at alloc_cpu.cpp] DefaultCPUAllocator: "
+            "can't allocate memory: you tried to allocate 1 GB"
+        )
+    )
+    assert memory.is_out_of_memory(MemoryError())
+    assert not memory.is_out_of_memory(RuntimeError("shape mismatch"))
+
+
+def test_retry_smaller_splits_until_it_fits():
+    # Arrange
+    def run(rows):
+        if len(rows) > 2:
+            oom(rows)
+        return sum(rows)
+
+    # Act
+    with patch.object(memory, "free_memory") as mock_free:
+        results = memory.retry_smaller(run, [1, 2, 3, 4, 5], memory.halves)
+
+    # Assert
+    # [1, 2] fits, [3, 4, 5] is split again into [3] and [4, 5]
+    assert results == [3, 3, 9]
+    assert mock_free.call_count == 2
+
+
+def test_retry_smaller_gives_up_on_what_cannot_be_split():
+    with patch.object(memory, "free_memory"):
+        with pytest.raises(torch.cuda.OutOfMemoryError):
+            memory.retry_smaller(oom, [1], memory.halves)
+
+
+def test_retry_smaller_raises_other_errors():
+    def run(rows):
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        memory.retry_smaller(run, [1, 2], memory.halves)
+
+
+def test_job_peak_collects_inference_peaks():
+    # Act
+    with memory.job_peak() as peak:
+        with memory.inference_peak("cpu"):
+            pass
+        with memory.job_peak() as inner:
+            pass
+        with memory.inference_peak("cpu"):
+            pass
+    with memory.inference_peak("cpu"):
+        pass
+
+    # Assert
+    assert peak.bytes > 0
+    assert inner.bytes is None
@@ -0,0 +1,117 @@
+import pytest
+import torch
+from torch import nn
+
+from flasktts.tts.optimize import InferenceOptimizer, parse_optimizations
+
+
+class TinyStyleTTS(nn.Module):
+    """Same submodule layout as the StyleTTS2-family models."""
+
+    def __init__(self):
+        super().__init__()
+        self.bert = nn.Linear(8, 8)
+        self.bert_encoder = nn.Linear(8, 8)
+        self.predictor = nn.LSTM(8, 8, batch_first=True)
+        # StyleTTS2 decoders use the old-style weight_norm, which can't be copied
+        self.decoder = nn.Sequential(
+            nn.Linear(8, 8), nn.utils.weight_norm(nn.Conv1d(5, 5, 1))
+        )
+
+    def forward(self, x):
+        x = self.bert_encoder(self.bert(x))
+        self.predictor.flatten_parameters()
+        x, _ = self.predictor(x)
+        return self.decoder(x)
+
+
+def test_parse_optimizations():
+    assert parse_optimizations("") == frozenset()
+    assert parse_optimizations(None) == frozenset()
+    assert parse_optimizations("cpu, bf16") == {"inference_mode", "int8", "bf16"}
+    with pytest.raises(ValueError):
+        parse_optimizations("fp4")
+
+
+def test_default_is_plain_fp32():
+    # Arrange
+    model = TinyStyleTTS()
+    optimizer = InferenceOptimizer("", torch.device("cpu"))
+
+    # Act
+    optimizer.optimize_styletts(model)
+    with optimizer.inference():
+        out = model(torch.randn(1, 5, 8))
+
+    # Assert
+    assert type(model.decoder[0]) is nn.Linear
+    assert out.dtype == torch.float32
+    assert not torch.is_inference(out)
+
+
+def test_optimized_model_matches_fp32():
+    # Arrange
+    torch.manual_seed(0)
+    reference = TinyStyleTTS()
+    model = TinyStyleTTS()
+    model.load_state_dict(reference.state_dict())
+    optimizer = InferenceOptimizer("cpu,bf16", torch.device("cpu"))
+    x = torch.randn(1, 5, 8)
+
+    # Act
+    optimizer.optimize_styletts(model)
+    with optimizer.inference():
+        out = model(x)
+    with torch.no_grad():
+        expected = reference(x)
+
+    # Assert
+    assert isinstance(model.predictor, torch.ao.nn.quantized.dynamic.LSTM)
+    assert isinstance(model.decoder[0], torch.ao.nn.quantized.dynamic.Linear)
+    assert torch.is_inference(out)
+    assert out.dtype == torch.float32
+    assert torch.allclose(out, expected, atol=0.1)
+
+
+def test_autocast_wrapper_keeps_module_attributes():
+    # Arrange
+    optimizer = InferenceOptimizer("bf16", torch.device("cpu"))
+    module = nn.Linear(4, 4)
+
+    # Act
+    wrapped = optimizer.autocast(module)
+
+    # Assert
+    assert wrapped.in_features == 4
+    assert wrapped.weight is module.weight
+    assert wrapped(torch.randn(2, 4)).dtype == torch.float32
+
+
+def test_unsupported_optimizations_are_dropped():
+    # Arrange / Act
+    cuda = InferenceOptimizer("int8,bf16", torch.device("cuda"))
+    limited = InferenceOptimizer(
+        "compile,bf16", torch.device("cpu"), supported=("bf16",)
+    )
+
+    # Assert
+    assert "int8" not in cuda
+    assert "bf16" in cuda
+    assert limited.enabled == {"bf16"}
+
+
+def test_quantize_kokoro_predictor():
+    # Arrange
+    modules = pytest.importorskip("kokoro.modules")
+    predictor = modules.ProsodyPredictor(
+        style_dim=16, d_hid=32, nlayers=2, max_dur=50, dropout=0.2
+    ).eval()
+    optimizer = InferenceOptimizer("int8", torch.device("cpu"))
+
+    # Act
+    predictor = optimizer.quantize(predictor)
+    with optimizer.inference():
+        x, _ = predictor.lstm(torch.randn(1, 5, 32 + 16))
+
+    # Assert
+    assert x.shape == (1, 5, 32)
@@ -0,0 +1,60 @@
+from flasktts.tts.segment import segment_text, split_sentences
+
+TEXT = (
+    "The sky above the port was the color of television, tuned to a dead "
+    "channel. \"It's not like I'm using,\" Case heard someone say, as he "
+    "shouldered his way through the crowd around the door of the Chat. It was a "
+    "Sprawl voice and a Sprawl joke.\n\nThe Chatsubo was a bar for professional "
+    "expatriates; you could drink there for a week and never hear two words in "
+    "Japanese."
+)
+
+
+def _words(text):
+    return text.split()
+
+
+class TestSegmentText:
+    def test_no_text_is_lost(self):
+        chunks = segment_text(TEXT, 120, 160)
+        assert _words(" ".join(chunks)) == _words(TEXT)
+
+    def test_chunks_respect_max(self):
+        for max_len in (20, 50, 160):
+            chunks = segment_text(TEXT, max_len, max_len)
+            assert all(len(chunk) <= max_len for chunk in chunks)
+
+    def test_sentences_are_packed_to_target(self):
+        chunks = segment_text(TEXT, 500, 600)
+        # One chunk per paragraph
+        assert len(chunks) == 2
+        assert chunks[1].startswith("The Chatsubo")
+
+    def test_long_sentence_split_at_clauses(self):
+        sentence = "first clause, second clause, third clause, fourth clause."
+        chunks = segment_text(sentence, 30, 30)
+        assert chunks == [
+            "first clause, second clause,",
+            "third clause, fourth clause.",
+        ]
+
+    def test_unbreakable_word_is_cut(self):
+        chunks = segment_text("x" * 100, 30, 30)
+        assert all(len(chunk) <= 30 for chunk in chunks)
+        assert "".join(chunks) == "x" * 100
+
+    def test_custom_length_function(self):
+        chunks = segment_text(TEXT, 10, 12, length=lambda s: len(s.split()))
+        assert all(len(chunk.split()) <= 12 for chunk in chunks)
+        assert _words(" ".join(chunks)) == _words(TEXT)
+
+    def test_empty_text(self):
+        assert segment_text("  \n ", 100, 200) == []
+
+
+def test_split_sentences_keeps_quotes():
+    assert split_sentences('He said "hi." Then he left! Why?') == [
+        'He said "hi."',
+        "Then he left!",
+        "Why?",
+    ]
@@ -0,0 +1,47 @@
+import threading
+
+import torch
+
+from flasktts.tts.device import device_lock
+from flasktts.tts.session import SynthesisSession
+
+
+def test_seed_reproduces_noise():
+    # Arrange
+    first, second = SynthesisSession("a", seed=7), SynthesisSession("b", seed=7)
+
+    # Act
+    torch.randn(10)  # the global generator doesn't affect sessions
+    noise = first.randn(1, 1, 256)
+
+    # Assert
+    assert torch.equal(noise, second.randn(1, 1, 256))
+    assert not torch.equal(noise, first.randn(1, 1, 256))
+
+
+def test_sessions_draw_independently_across_threads():
+    # Arrange
+    sessions = [SynthesisSession(f"job-{i}", seed=i) for i in range(4)]
+    results = [None] * 4
+
+    def draw(session):
+        return torch.cat([session.randn(1, 8) for _ in range(50)])
+
+    def run(i):
+        results[i] = draw(sessions[i])
+
+    # Act
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Assert
+    for i, result in enumerate(results):
+        assert torch.equal(result, draw(SynthesisSession("", seed=i)))
+
+
+def test_device_lock_is_shared_per_device():
+    assert device_lock("cpu") is device_lock(torch.device("cpu"))
+    assert device_lock("cuda:0") is not device_lock("cuda:1")
@@ -0,0 +1,98 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from flasktts.tts import style2tts
+from flasktts.tts.session import SynthesisSession
+
+
+def test_long_chunk_is_split_without_extra_periods():
+    # Arrange
+    tts = style2tts.Style2TTS.__new__(style2tts.Style2TTS)
+    tts.device = "cpu"
+    # One token per character
+    tts.tokenize = lambda text: [0] + [ord(c) for c in text]
+    tts.long_form_inference = MagicMock(return_value=(np.zeros(1), None))
+    chunk = ", ".join(["word"] * 200)
+
+    # Act
+    wavs = list(tts.tts_chunks([chunk], SynthesisSession("job")))
+
+    # Assert
+    spoken = [
+        "".join(chr(t) for t in call.args[0][1:])
+        for call in tts.long_form_inference.call_args_list
+    ]
+    assert len(wavs) == len(spoken) > 1
+    assert all(len(text) < style2tts.MAX_TOKENS for text in spoken)
+    # Only the end of the original chunk gets a period
+    assert not any(text.endswith(".") for text in spoken[:-1])
+    assert spoken[-1].endswith(".")
+    assert " ".join(spoken) == chunk + "."
+
+
+def test_synth_text_streams_chunks_to_wav(tmp_path):
+    # Arrange
+    tts = style2tts.Style2TTS.__new__(style2tts.Style2TTS)
+    tts.output_dir = str(tmp_path)
+    tts.sample_rate = 24000
+    tts.preroll = "Preroll."
+    tts.tts_chunks = lambda chunks, session, timeline=None: (
+        np.full(1000, 0.5) for _ in chunks
+    )
+
+    # Act
+    path = tts.synth_text("One. Two.", "job")
+
+    # Assert
+    audio, sr = sf.read(path)
+    assert sr == 24000
+    assert len(audio) == 2000
+    assert audio == pytest.approx(0.5, abs=1e-4)
+
+
+def test_synth_text_streams_chunks_to_writer(tmp_path):
+    # Arrange
+    tts = style2tts.Style2TTS.__new__(style2tts.Style2TTS)
+    tts.output_dir = str(tmp_path)
+    tts.sample_rate = 24000
+    tts.preroll = "Preroll."
+    tts.tts_chunks = lambda chunks, session, timeline=None: (
+        np.full(1000, 0.5) for _ in chunks
+    )
+    writer = MagicMock(path=str(tmp_path / "job.mp3"))
+
+    # Act
+    path = tts.synth_text("One. Two.", "job", writer=writer)
+
+    # Assert
+    assert path == writer.path
+    assert writer.write.call_count == 2
+    assert writer.write.call_args.args[1] == 24000
+    writer.close.assert_not_called()
+
+
+def test_style_is_carried_per_session():
+    # Arrange
+    tts = style2tts.Style2TTS.__new__(style2tts.Style2TTS)
+    tts.device = "cpu"
+    tts.tokenize = lambda text: [0, 1, 2]
+    tts.long_form_inference = MagicMock(
+        side_effect=lambda tokens, s_prev, noise: (
+            np.zeros(1),
+            (s_prev or 0) + 1,
+        )
+    )
+    first, second = SynthesisSession("a"), SynthesisSession("b")
+
+    # Act
+    list(tts.tts_chunks(["One.", "Two."], first))
+    list(tts.tts_chunks(["Three."], second))
+
+    # Assert
+    assert first.style == 2
+    assert second.style == 1
+    s_prevs = [call.args[1] for call in tts.long_form_inference.call_args_list]
+    assert s_prevs == [None, 1, None]
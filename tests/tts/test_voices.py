@@ -0,0 +1,111 @@
+import pytest
+import torch
+
+from flasktts.tts import voices
+
+
+class Presets:
+    """Voice packs filled with a value per preset, counting loads"""
+
+    VALUES = {"af_heart": 1.0, "af_bella": 2.0, "am_adam": 3.0}
+
+    def __init__(self):
+        self.loads = []
+
+    def __call__(self, preset):
+        self.loads.append(preset)
+        return torch.full((510, 1, 256), self.VALUES[preset])
+
+
+def test_same_mix_same_key():
+    assert (
+        voices.normalize("af_heart:0.7,af_bella:0.3")
+        == voices.normalize(" af_bella:3 , af_heart:7 ")
+        == voices.normalize("af_heart:0.35,af_bella:0.3,af_heart:0.35")
+        == "af_bella:0.3,af_heart:0.7"
+    )
+    assert voices.normalize("af_heart,af_bella") == "af_bella:0.5,af_heart:0.5"
+    assert voices.normalize("af_heart:2") == "af_heart"
+
+
+@pytest.mark.parametrize(
+    "recipe", ["af_heart:abc", "af_heart:-1,af_bella", "../secrets:1", ",", "x:1"]
+)
+def test_malformed_recipes(recipe):
+    with pytest.raises(ValueError):
+        voices.normalize(recipe)
+
+
+def test_blend_is_computed_once():
+    # Arrange
+    presets = Presets()
+    cache = voices.VoiceCache(presets, size=4)
+
+    # Act
+    pack = cache.get("af_heart:0.75,af_bella:0.25")
+    again = cache.get("af_bella:1,af_heart:3")
+
+    # Assert
+    assert again is pack
+    assert torch.allclose(pack, torch.full((510, 1, 256), 1.25))
+    assert sorted(presets.loads) == ["af_bella", "af_heart"]
+
+
+def test_least_recently_used_blend_is_evicted():
+    # Arrange
+    presets = Presets()
+    cache = voices.VoiceCache(presets, size=2)
+    cache.get("af_heart,af_bella")
+    cache.get("af_heart,am_adam")
+
+    # Act
+    cache.get("af_heart,af_bella")
+    cache.get("af_bella,am_adam")
+    presets.loads.clear()
+    cache.get("af_heart,af_bella")
+    cache.get("af_heart,am_adam")
+
+    # Assert
+    # af_heart,am_adam was the least recently used, so it is mixed again
+    assert sorted(presets.loads) == ["af_heart", "am_adam"]
+
+
+def test_blends_persist_across_caches(tmp_path):
+    # Arrange
+    voices.VoiceCache(Presets(), size=2, directory=str(tmp_path)).get(
+        "af_heart:0.5,am_adam:0.5"
+    )
+    presets = Presets()
+
+    # Act
+    cache = voices.VoiceCache(presets, size=2, directory=str(tmp_path))
+    pack = cache.get("am_adam,af_heart")
+
+    # Assert
+    assert presets.loads == []
+    assert torch.allclose(pack, torch.full((510, 1, 256), 2.0))
+
+
+def test_named_voices(tmp_path):
+    # Arrange
+    named = voices.NamedVoices(str(tmp_path / "voices"))
+
+    # Act
+    recipe = named.define("narrator", "af_heart:7,af_bella:3")
+
+    # Assert
+    assert recipe == "af_bella:0.3,af_heart:0.7"
+    assert named.resolve("narrator") == recipe
+    assert named.resolve("af_heart:7,af_bella:3") == recipe
+    assert named.resolve("af_heart") == "af_heart"
+    assert named.resolve(None) is None
+    assert named.all() == {"narrator": recipe}
+    assert named.delete("narrator")
+    assert not named.delete("narrator")
+    assert named.resolve("narrator") == "narrator"
+
+
+@pytest.mark.parametrize("name", ["af_heart", "../up", "with space", ""])
+def test_invalid_voice_names(tmp_path, name):
+    with pytest.raises(ValueError):
+        voices.NamedVoices(str(tmp_path)).define(name, "af_heart,af_bella")